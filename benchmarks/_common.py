@@ -0,0 +1,102 @@
+"""
+Shared helpers for the in-process benchmarks.
+
+The apps are imported from their project folders and pointed at throwaway
+SQLite files, so nothing here touches the development databases.
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FASTAPI_PROJECT = os.path.join(ROOT, "fast_api", "mini_project")
+FLASK_PROJECT = os.path.join(ROOT, "rest_api")
+
+
+def load_fastapi_app(workdir=None):
+    """Import the FastAPI mini project with its database inside workdir"""
+    workdir = workdir or tempfile.mkdtemp(prefix="bench-fastapi-")
+    # connection.py uses a relative ./app.db path
+    os.chdir(workdir)
+    os.environ["AUTH_EVENTS_PATH"] = os.path.join(workdir, "auth-events.log")
+    if FASTAPI_PROJECT not in sys.path:
+        sys.path.insert(0, FASTAPI_PROJECT)
+    from app.main import app
+    from app.database import async_engine
+
+    async_engine.echo = False
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    return app
+
+
+def load_flask_app(workdir=None):
+    """Import the enhanced Flask app with its database inside workdir"""
+    workdir = workdir or tempfile.mkdtemp(prefix="bench-flask-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "users.db")
+    os.environ["AUTH_EVENTS_PATH"] = os.path.join(workdir, "auth-events.log")
+    if FLASK_PROJECT not in sys.path:
+        sys.path.insert(0, FLASK_PROJECT)
+    import app_enhanced
+
+    with app_enhanced.app.app_context():
+        app_enhanced.db.create_all()
+    return app_enhanced
+
+
+def sqlite_path(engine_url):
+    """Filesystem path of a sqlite:/// or sqlite+aiosqlite:/// URL"""
+    return engine_url.split(":///", 1)[1]
+
+
+def seed_users(db_path, table, rows, columns, row_factory, batch_size=50000):
+    """Bulk insert synthetic users straight through sqlite3"""
+    import sqlite3
+
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({placeholders})'
+    conn = sqlite3.connect(db_path)
+    try:
+        for start in range(1, rows + 1, batch_size):
+            stop = min(rows + 1, start + batch_size)
+            conn.executemany(sql, (row_factory(i) for i in range(start, stop)))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def clear_users(db_path, table):
+    """Delete every row of a users table (search index triggers clean up after them)"""
+    import sqlite3
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute(f'DELETE FROM "{table}"')
+    finally:
+        conn.close()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples_ms):
+    """Summarise latencies in milliseconds"""
+    return {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def print_report(report):
+    print(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,141 @@
+"""
+Fetching a list of users one GET /users/{id} at a time against GET /users/batch.
+
+For --ids users it times, and counts the SELECT statements of, one
+request per id in turn, one request per id all at once (FastAPI with the
+UserLoader on and off), and a single GET /users/batch?ids=...:
+
+    python benchmarks/batch_get.py --rows 100000 --ids 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import event
+
+from _common import load_fastapi_app, load_flask_app, print_report, seed_users, sqlite_path
+
+NOW = "2025-01-01 00:00:00"
+
+
+class SelectCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+
+async def measure_async(counter, call, repeat):
+    samples, selects = [], []
+    for _ in range(repeat):
+        before = counter.count
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+        selects.append(counter.count - before)
+    return {"ms": round(statistics.median(samples), 2), "selects": max(selects)}
+
+
+def measure(counter, call, repeat):
+    samples, selects = [], []
+    for _ in range(repeat):
+        before = counter.count
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+        selects.append(counter.count - before)
+    return {"ms": round(statistics.median(samples), 2), "selects": max(selects)}
+
+
+async def bench_fastapi(rows, ids, repeat):
+    import httpx
+
+    app = load_fastapi_app()
+    from app.auth import create_access_token
+    from app.database import async_engine
+    import app.database.crud as crud
+
+    counter = SelectCounter(async_engine.sync_engine)
+    user_ids = [1 + i * (rows // ids) for i in range(ids)]
+    async with app.router.lifespan_context(app):
+        seed_users(
+            sqlite_path(str(async_engine.url)), "users", rows,
+            ("id", "name", "email", "age", "hashed_password", "is_active", "created_at"),
+            lambda i: (i, f"User {i}", f"user{i}@example.com", 30, "x", 1, NOW),
+        )
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user1@example.com'})}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            async def get(user_id):
+                response = await client.get(f"/users/{user_id}")
+                assert response.status_code == 200, response.text
+
+            async def one_by_one():
+                for user_id in user_ids:
+                    await get(user_id)
+
+            async def all_at_once():
+                await asyncio.gather(*(get(user_id) for user_id in user_ids))
+
+            async def batch():
+                response = await client.get("/users/batch", params={"ids": ",".join(map(str, user_ids))})
+                assert response.status_code == 200 and not response.json()["missing"], response.text
+
+            # Fills the principal cache, so auth runs no query below
+            await get(1)
+            report = {}
+            for loader in (False, True):
+                crud.USER_LOADER_ENABLED = loader
+                suffix = "loader" if loader else "no_loader"
+                report[f"one_by_one_{suffix}"] = await measure_async(counter, one_by_one, repeat)
+                report[f"concurrent_{suffix}"] = await measure_async(counter, all_at_once, repeat)
+            report["batch"] = await measure_async(counter, batch, repeat)
+            return report
+
+
+def bench_flask(rows, ids, repeat):
+    module = load_flask_app()
+    with module.app.app_context():
+        db_path = module.db.engine.url.database
+        counter = SelectCounter(module.db.engine)
+    seed_users(
+        db_path, module.User.__tablename__, rows,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        lambda i: (i, f"User {i}", f"user{i}@example.com", NOW, NOW, 1),
+    )
+    user_ids = [1 + i * (rows // ids) for i in range(ids)]
+    client = module.app.test_client()
+
+    def one_by_one():
+        for user_id in user_ids:
+            response = client.get(f"/users/{user_id}")
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+    def batch():
+        response = client.get("/users/batch", query_string={"ids": ",".join(map(str, user_ids))})
+        assert response.status_code == 200 and not response.get_json()["meta"]["missing"]
+
+    return {"one_by_one": measure(counter, one_by_one, repeat), "batch": measure(counter, batch, repeat)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--ids", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print_report({
+        "rows": args.rows,
+        "ids": args.ids,
+        "fastapi": asyncio.run(bench_fastapi(args.rows, args.ids, args.repeat)),
+        "flask": bench_flask(args.rows, args.ids, args.repeat),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+In-process load and latency harness for both apps.
+
+The FastAPI app is driven through an ASGI transport and the Flask app
+through its WSGI test client, so no server or network is involved. Each
+scenario runs a fixed number of requests at the given concurrency against
+a freshly seeded SQLite database and reports throughput and latency
+percentiles as JSON:
+
+    python benchmarks/harness.py --requests 500 --concurrency 16 --output run.json
+
+Compare against an earlier run and fail on regressions:
+
+    python benchmarks/harness.py --baseline run.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import latency_summary, load_fastapi_app, load_flask_app, print_report, seed_users, sqlite_path
+
+SCENARIOS = ("register", "login", "list", "get", "update", "delete", "mixed")
+MIXED_WEIGHTS = {"get": 50, "list": 25, "update": 15, "login": 5, "register": 5}
+PASSWORD = "benchpassword"
+SEED_TIMESTAMP = "2025-01-01 00:00:00"
+
+
+class Target:
+    """Builds the request for one scenario iteration"""
+
+    name = ""
+
+    def __init__(self, users):
+        self.users = users
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def next_index(self):
+        # Unique per request, so register and delete never collide
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def build(self, scenario, rng):
+        if scenario == "mixed":
+            scenario = rng.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+        return getattr(self, f"build_{scenario}")(rng)
+
+
+class FastAPITarget(Target):
+    name = "fastapi"
+
+    async def __aenter__(self):
+        import httpx
+
+        self.app = load_fastapi_app()
+        from app.auth import create_access_token, get_password_hash
+        from app.database import async_engine
+
+        self._lifespan = self.app.router.lifespan_context(self.app)
+        await self._lifespan.__aenter__()
+        hashed = get_password_hash(PASSWORD)
+        seed_users(
+            sqlite_path(str(async_engine.url)), "users", self.users,
+            ("id", "name", "email", "age", "hashed_password", "is_active", "created_at"),
+            lambda i: (i, f"User {i}", f"user{i}@example.com", 30, hashed, 1, SEED_TIMESTAMP),
+        )
+        self.create_access_token = create_access_token
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://bench")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self._lifespan.__aexit__(*exc)
+
+    def auth(self, user_id):
+        token = self.create_access_token({"sub": f"user{user_id}@example.com"})
+        return {"Authorization": f"Bearer {token}"}
+
+    async def send(self, request):
+        method, path, kwargs = request
+        response = await self.client.request(method, path, **kwargs)
+        return response.status_code
+
+    def build_register(self, rng):
+        i = self.next_index()
+        return "POST", "/auth/register", {"json": {
+            "name": f"New {i}", "email": f"new{i}@example.com", "password": PASSWORD}}
+
+    def build_login(self, rng):
+        user_id = rng.randint(1, self.users)
+        return "POST", "/auth/login", {"data": {"username": f"user{user_id}@example.com", "password": PASSWORD}}
+
+    def build_list(self, rng):
+        return "GET", "/users/?limit=100", {"headers": self.auth(1)}
+
+    def build_get(self, rng):
+        return "GET", f"/users/{rng.randint(1, self.users)}", {"headers": self.auth(1)}
+
+    def build_update(self, rng):
+        user_id = rng.randint(1, self.users // 2)
+        return "PUT", f"/users/{user_id}", {"headers": self.auth(user_id), "json": {"age": rng.randint(18, 90)}}
+
+    def build_delete(self, rng):
+        # Deletes consume the upper half of the seeded ids, one per request
+        user_id = self.users // 2 + self.next_index()
+        return "DELETE", f"/users/{user_id}", {"headers": self.auth(user_id)}
+
+
+class FlaskTarget(Target):
+    name = "flask"
+
+    def __enter__(self):
+        from werkzeug.security import generate_password_hash
+
+        self.module = load_flask_app()
+        with self.module.app.app_context():
+            db_path = self.module.db.engine.url.database
+        hashed = generate_password_hash(PASSWORD)
+        seed_users(
+            db_path, self.module.User.__tablename__, self.users,
+            ("id", "name", "email", "password_hash", "created_at", "updated_at", "is_active"),
+            lambda i: (i, f"User {i}", f"user{i}@example.com", hashed, SEED_TIMESTAMP, SEED_TIMESTAMP, 1),
+        )
+        self._local = threading.local()
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def send(self, request):
+        # One test client per worker thread
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.module.app.test_client()
+        method, path, kwargs = request
+        return client.open(path, method=method, **kwargs).status_code
+
+    def build_register(self, rng):
+        i = self.next_index()
+        return "POST", "/auth/register", {"json": {
+            "name": f"New {i}", "email": f"new{i}@example.com", "password": PASSWORD}}
+
+    def build_login(self, rng):
+        user_id = rng.randint(1, self.users)
+        return "POST", "/auth/login", {"json": {"email": f"user{user_id}@example.com", "password": PASSWORD}}
+
+    def build_list(self, rng):
+        return "GET", "/users?per_page=100", {}
+
+    def build_get(self, rng):
+        return "GET", f"/users/{rng.randint(1, self.users)}", {}
+
+    def build_update(self, rng):
+        user_id = rng.randint(1, self.users // 2)
+        return "PUT", f"/users/{user_id}", {"json": {"name": f"Updated {rng.randint(1, 10**6)}"}}
+
+    def build_delete(self, rng):
+        user_id = self.users // 2 + self.next_index()
+        return "DELETE", f"/users/{user_id}", {}
+
+
+def summarise(samples, statuses, elapsed):
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    summary = latency_summary(samples)
+    summary.update({
+        "requests": len(samples),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+    })
+    return summary
+
+
+async def run_async(target, scenario, requests, concurrency, seed):
+    rng = random.Random(seed)
+    samples, statuses = [], {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            request = target.build(scenario, rng)
+            started = time.perf_counter()
+            status = await target.send(request)
+            samples.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarise(samples, statuses, time.perf_counter() - started)
+
+
+def run_threads(target, scenario, requests, concurrency, seed):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    samples, statuses = [], {}
+    results_lock = threading.Lock()
+
+    def one(_):
+        with rng_lock:
+            request = target.build(scenario, rng)
+        started = time.perf_counter()
+        status = target.send(request)
+        elapsed = (time.perf_counter() - started) * 1000
+        with results_lock:
+            samples.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    return summarise(samples, statuses, time.perf_counter() - started)
+
+
+async def run_fastapi(args):
+    results = {}
+    async with FastAPITarget(args.users) as target:
+        for scenario in args.scenarios:
+            results[scenario] = await run_async(target, scenario, args.requests, args.concurrency, args.seed)
+    return results
+
+
+def run_flask(args):
+    results = {}
+    with FlaskTarget(args.users) as target:
+        for scenario in args.scenarios:
+            results[scenario] = run_threads(target, scenario, args.requests, args.concurrency, args.seed)
+    return results
+
+
+def find_regressions(report, baseline, tolerance):
+    """Scenarios whose p95 rose or throughput fell by more than tolerance"""
+    regressions = []
+    for app_name, scenarios in report["results"].items():
+        for scenario, current in scenarios.items():
+            previous = baseline.get("results", {}).get(app_name, {}).get(scenario)
+            if not previous:
+                continue
+            if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{app_name}/{scenario}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+            if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{app_name}/{scenario}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", nargs="+", choices=("fastapi", "flask"), default=["fastapi", "flask"])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=10000, help="seeded users")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    if "delete" in args.scenarios and args.requests > args.users // 2:
+        parser.error("delete needs --users of at least twice --requests")
+
+    report = {
+        "config": {key: getattr(args, key) for key in ("requests", "concurrency", "users", "seed")},
+        "results": {},
+    }
+    if "fastapi" in args.apps:
+        report["results"]["fastapi"] = asyncio.run(run_fastapi(args))
+    if "flask" in args.apps:
+        report["results"]["flask"] = run_flask(args)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            report["regressions"] = find_regressions(report, json.load(handle), args.tolerance)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+    print_report(report)
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
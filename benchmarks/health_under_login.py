@@ -0,0 +1,80 @@
+"""
+p99 latency of GET /health while POST /auth/login runs under load.
+
+Run once per executor mode to compare bcrypt on the event loop with the
+password hashing pool:
+
+    PASSWORD_HASH_EXECUTOR=inline python benchmarks/health_under_login.py
+    PASSWORD_HASH_EXECUTOR=thread python benchmarks/health_under_login.py
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from _common import latency_summary, load_fastapi_app, print_report
+
+
+async def run(logins, concurrency, health_interval):
+    import httpx
+
+    app = load_fastapi_app()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/auth/register", json={
+                "name": "Bench", "email": "bench@example.com", "password": "benchpassword",
+            })
+
+            done = asyncio.Event()
+            login_status = {}
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def login():
+                async with semaphore:
+                    response = await client.post("/auth/login", data={
+                        "username": "bench@example.com", "password": "benchpassword",
+                    })
+                    login_status[response.status_code] = login_status.get(response.status_code, 0) + 1
+
+            async def poll_health():
+                # Latency is measured from the intended send time, so a blocked
+                # event loop shows up even when the probe could not be sent
+                samples = []
+                intended = time.perf_counter()
+                while not done.is_set():
+                    await client.get("/health")
+                    finished = time.perf_counter()
+                    samples.append((finished - intended) * 1000)
+                    intended = max(intended + health_interval, finished)
+                    await asyncio.sleep(max(0.0, intended - time.perf_counter()))
+                return samples
+
+            health_task = asyncio.create_task(poll_health())
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+            done.set()
+            health_samples = await health_task
+
+    return {
+        "executor": os.getenv("PASSWORD_HASH_EXECUTOR", "thread"),
+        "logins": logins,
+        "concurrency": concurrency,
+        "login_seconds": round(elapsed, 3),
+        "login_status": login_status,
+        "health": latency_summary(health_samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--health-interval", type=float, default=0.005)
+    args = parser.parse_args()
+    print_report(asyncio.run(run(args.logins, args.concurrency, args.health_interval)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Microbenchmark of user list serialization, standard path against fast path.
+
+Builds one page of in-memory User objects per app and times only the
+serialization step:
+
+    python benchmarks/json_serialization.py --rows 1000
+"""
+import argparse
+import datetime
+import json
+import statistics
+import time
+
+from _common import load_fastapi_app, load_flask_app, print_report
+
+
+def median_ms(func, repeat):
+    func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def make_users(model, rows, **extra):
+    now = datetime.datetime(2025, 1, 1, 12, 0, 0, 123456)
+    return [
+        model(id=i, name=f"User {i}", email=f"user{i}@example.com",
+              is_active=True, created_at=now, updated_at=now, **extra)
+        for i in range(1, rows + 1)
+    ]
+
+
+def bench_fastapi(rows, repeat):
+    load_fastapi_app()
+    from typing import List
+    from pydantic import TypeAdapter
+    from app import responses
+    from app.models.schemas import UserResponse
+    from app.models.user import User
+
+    users = make_users(User, rows, age=30, hashed_password="x")
+    adapter = TypeAdapter(List[UserResponse])
+
+    def standard():
+        # What response_model does: validate, dump to JSON types, stdlib encode
+        validated = adapter.validate_python(users, from_attributes=True)
+        json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False,
+                   allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def fast():
+        responses.dumps(responses.user_rows(users))
+
+    orjson = responses.orjson
+
+    def fast_stdlib():
+        responses.orjson = None
+        try:
+            responses.dumps(responses.user_rows(users))
+        finally:
+            responses.orjson = orjson
+
+    return {
+        "standard_ms": median_ms(standard, repeat),
+        "fast_ms": median_ms(fast, repeat),
+        "fast_stdlib_ms": median_ms(fast_stdlib, repeat),
+        "orjson": orjson is not None,
+    }
+
+
+def bench_flask(rows, repeat):
+    module = load_flask_app()
+    users = make_users(module.User, rows)
+    meta = {"page": 1, "per_page": rows}
+
+    def standard():
+        module.app.config["FAST_JSON_RESPONSES"] = False
+        module.create_users_response(users, meta)[0].get_data()
+
+    def fast():
+        module.app.config["FAST_JSON_RESPONSES"] = True
+        module.create_users_response(users, meta)[0].get_data()
+
+    with module.app.app_context():
+        return {
+            "standard_ms": median_ms(standard, repeat),
+            "fast_ms": median_ms(fast, repeat),
+            "orjson": module.orjson is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    print_report({
+        "rows": args.rows,
+        "fastapi": bench_fastapi(args.rows, args.repeat),
+        "flask": bench_flask(args.rows, args.repeat),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Microbenchmark of bearer token verification per request, with and without
+the verified-claims cache.
+
+Times only the verification step, reusing one token the way clients do:
+
+    python benchmarks/jwt_verification.py --repeat 20000
+"""
+import argparse
+import time
+
+from _common import load_fastapi_app, load_flask_app, print_report
+
+
+def per_call_us(func, repeat):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - started) / repeat * 1e6, 2)
+
+
+def bench_fastapi(repeat):
+    load_fastapi_app()
+    from fastapi import HTTPException
+    from app.auth import create_access_token, decode_access_token, token_cache
+
+    token = create_access_token({"sub": "bench@example.com"})
+    exc = HTTPException(status_code=401)
+    max_size = token_cache.max_size
+
+    def verify():
+        decode_access_token(token, exc)
+
+    token_cache.max_size = 0
+    uncached = per_call_us(verify, repeat)
+    token_cache.max_size = max_size
+    cached = per_call_us(verify, repeat)
+    return {"uncached_us": uncached, "cached_us": cached}
+
+
+def bench_flask(repeat):
+    module = load_flask_app()
+    from flask_jwt_extended import create_access_token
+
+    cache = module.jwt_claims_cache
+    max_size = cache.max_size
+    with module.app.app_context():
+        token = create_access_token(identity=1)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def verify():
+        module.get_optional_jwt_identity()
+
+    # One request context for every call, so only verification is timed
+    with module.app.test_request_context("/users", headers=headers):
+        cache.max_size = 0
+        uncached = per_call_us(verify, repeat)
+        cache.max_size = max_size
+        cached = per_call_us(verify, repeat)
+    return {"uncached_us": uncached, "cached_us": cached}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+    print_report({
+        "repeat": args.repeat,
+        "fastapi": bench_fastapi(args.repeat),
+        "flask": bench_flask(args.repeat),
+    })
+
+
+if __name__ == "__main__":
+    main()
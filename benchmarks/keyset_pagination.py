@@ -0,0 +1,112 @@
+"""
+Page-N latency of the users listing: offset paging against keyset cursors.
+
+Seeds both apps with the same number of rows, then times fetching one deep
+page through each mode:
+
+    python benchmarks/keyset_pagination.py --rows 1000000 --page 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from _common import load_fastapi_app, load_flask_app, print_report, seed_users, sqlite_path
+
+NOW = "2025-01-01 00:00:00"
+
+
+def time_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+async def time_async_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+async def bench_fastapi(rows, page, per_page, repeat):
+    import httpx
+
+    app = load_fastapi_app()
+    from app.auth import create_access_token
+    from app.database import async_engine
+    from app.database.pagination import encode_cursor
+
+    async with app.router.lifespan_context(app):
+        seed_users(
+            sqlite_path(str(async_engine.url)), "users", rows,
+            ("id", "name", "email", "age", "hashed_password", "is_active", "created_at"),
+            lambda i: (i, f"User {i}", f"user{i}@example.com", 30, "x", 1, NOW),
+        )
+        token = create_access_token({"sub": "user1@example.com"})
+        headers = {"Authorization": f"Bearer {token}"}
+        skip = (page - 1) * per_page
+        cursor = encode_cursor(skip)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            async def offset():
+                response = await client.get(f"/users/?skip={skip}&limit={per_page}")
+                assert response.status_code == 200, response.text
+
+            async def keyset():
+                response = await client.get(f"/users/?cursor={cursor}&limit={per_page}")
+                assert response.status_code == 200, response.text
+
+            return {
+                "offset_ms": await time_async_calls(offset, repeat),
+                "keyset_ms": await time_async_calls(keyset, repeat),
+            }
+
+
+def bench_flask(rows, page, per_page, repeat):
+    module = load_flask_app()
+    with module.app.app_context():
+        db_path = module.db.engine.url.database
+    seed_users(
+        db_path, module.User.__tablename__, rows,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        lambda i: (i, f"User {i}", f"user{i}@example.com", NOW, NOW, 1),
+    )
+    client = module.app.test_client()
+    cursor = module.encode_cursor((page - 1) * per_page)
+
+    def offset():
+        response = client.get(f"/users?page={page}&per_page={per_page}")
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def keyset():
+        response = client.get(f"/users?cursor={cursor}&per_page={per_page}")
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    return {
+        "offset_ms": time_calls(offset, repeat),
+        "keyset_ms": time_calls(keyset, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = {"rows": args.rows, "page": args.page, "per_page": args.per_page}
+    report["fastapi"] = asyncio.run(bench_fastapi(args.rows, args.page, args.per_page, args.repeat))
+    report["flask"] = bench_flask(args.rows, args.page, args.per_page, args.repeat)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Memory per user and throughput of UserStore against the plain dicts it replaced.
+
+Compares the dict of dicts rest_api/app.py used, the dict of Pydantic
+models fast_api/main2.py used, and UserStore (shared/user_store.py):
+bytes per user (tracemalloc), ops/sec for a get/replace/create/delete
+mix on 1 and --threads threads (the dicts behind one global lock, as
+they would need to be thread-safe, and without one for reference), and
+snapshot write and load time against rebuilding the store user by user:
+
+    python benchmarks/memory_store.py --users 200000 --threads 8
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from _common import ROOT, print_report
+
+sys.path[:0] = [ROOT, os.path.join(ROOT, "fast_api")]
+from main2 import User  # noqa: E402
+from shared.user_store import UserStore  # noqa: E402
+
+FIELDS = ("name", "age", "email")
+
+
+def user_data(i):
+    return {"name": f"User {i}", "age": 20 + i % 50, "email": f"user{i}@example.com"}
+
+
+class DictStore:
+    """The old approach: users[user_id] = value, optionally behind one lock"""
+
+    def __init__(self, wrap=dict, locked=True):
+        self.users = {}
+        self.wrap = wrap
+        self.lock = threading.Lock() if locked else None
+        self.next_id = 1
+
+    def create(self, data):
+        value = self.wrap(data)
+        if self.lock is None:
+            user_id = self.next_id
+            self.next_id += 1
+            self.users[user_id] = value
+            return user_id
+        with self.lock:
+            user_id = self.next_id
+            self.next_id += 1
+            self.users[user_id] = value
+        return user_id
+
+    def get(self, user_id):
+        if self.lock is None:
+            return self.users.get(user_id)
+        with self.lock:
+            return self.users.get(user_id)
+
+    def replace(self, user_id, data):
+        value = self.wrap(data)
+        if self.lock is None:
+            self.users[user_id] = value
+            return
+        with self.lock:
+            if user_id in self.users:
+                self.users[user_id] = value
+
+    def delete(self, user_id):
+        if self.lock is None:
+            return self.users.pop(user_id, None)
+        with self.lock:
+            return self.users.pop(user_id, None)
+
+
+class StoreAdapter:
+    def __init__(self):
+        self.store = UserStore(FIELDS)
+
+    def create(self, data):
+        return self.store.create(data).id
+
+    def get(self, user_id):
+        return self.store.get(user_id)
+
+    def replace(self, user_id, data):
+        self.store.replace(user_id, data)
+
+    def delete(self, user_id):
+        return self.store.delete(user_id)
+
+
+def pydantic_user(data):
+    return User(**data)
+
+
+VARIANTS = {
+    "dict_of_dicts": lambda locked=True: DictStore(dict, locked),
+    "dict_of_pydantic": lambda locked=True: DictStore(pydantic_user, locked),
+    "user_store": lambda locked=True: StoreAdapter(),
+}
+
+
+def fill(store, users):
+    for i in range(users):
+        store.create(user_data(i))
+
+
+def bytes_per_user(make, users):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        store = make()
+        fill(store, users)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return round(used / users, 1)
+
+
+def workload(store, users, ops, seed):
+    """70% get, 20% replace, 5% create, 5% delete"""
+    rng = random.Random(seed)
+    for _ in range(ops):
+        roll = rng.random()
+        user_id = rng.randint(1, users)
+        if roll < 0.70:
+            store.get(user_id)
+        elif roll < 0.90:
+            store.replace(user_id, user_data(user_id))
+        elif roll < 0.95:
+            store.create(user_data(user_id))
+        else:
+            store.delete(user_id)
+
+
+def ops_per_second(store, users, ops, threads):
+    per_thread = ops // threads
+    workers = [threading.Thread(target=workload, args=(store, users, per_thread, seed)) for seed in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return round(per_thread * threads / (time.perf_counter() - started))
+
+
+def snapshot_times(users):
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-store-"), "users.json")
+    store = UserStore(FIELDS)
+    started = time.perf_counter()
+    fill(store, users)
+    rebuild = time.perf_counter() - started
+    started = time.perf_counter()
+    store.snapshot(path)
+    write = time.perf_counter() - started
+    started = time.perf_counter()
+    loaded = UserStore(FIELDS, snapshot_path=path)
+    load = time.perf_counter() - started
+    assert len(loaded) == users
+    return {
+        "users": users,
+        "file_mb": round(os.path.getsize(path) / 1e6, 1),
+        "write_s": round(write, 3),
+        "load_s": round(load, 3),
+        "rebuild_by_create_s": round(rebuild, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--ops", type=int, default=400_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--snapshot-users", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    report = {"users": args.users, "ops": args.ops, "bytes_per_user": {}, "ops_per_sec": {}}
+    for name, make in VARIANTS.items():
+        report["bytes_per_user"][name] = bytes_per_user(make, args.users)
+        for threads in sorted({1, args.threads}):
+            store = make()
+            fill(store, args.users)
+            report["ops_per_sec"][f"{name}_{threads}_threads"] = ops_per_second(store, args.users, args.ops, threads)
+            del store
+    for name in ("dict_of_dicts", "dict_of_pydantic"):
+        store = VARIANTS[name](locked=False)
+        fill(store, args.users)
+        report["ops_per_sec"][f"{name}_unlocked_1_threads"] = ops_per_second(store, args.users, args.ops, 1)
+    report["snapshot"] = snapshot_times(args.snapshot_users)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Microbenchmark of the per-request cost of rate limiting.
+
+Times the token-bucket store on its own (one hot client, many distinct
+clients, and threads contending on one lock against sharded locks), then
+the full check each app runs per request: resolving the client from a
+bearer token plus one bucket hit.
+
+    python benchmarks/rate_limit_overhead.py --repeat 50000
+"""
+import argparse
+import threading
+import time
+
+from _common import load_fastapi_app, load_flask_app, print_report
+
+
+def per_call_us(func, repeat):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - started) / repeat * 1e6, 3)
+
+
+def bench_store(store_class, limit_class, repeat, threads):
+    # Large enough that nothing is rejected; only bookkeeping is timed
+    limit = limit_class(10 ** 9, 1)
+    store = store_class()
+    hot = per_call_us(lambda: store.hit("users.read:sub:hot", limit), repeat)
+
+    keys = [f"users.read:ip:10.0.{i // 256}.{i % 256}" for i in range(repeat)]
+    store = store_class()
+    started = time.perf_counter()
+    for key in keys:
+        store.hit(key, limit)
+    distinct = round((time.perf_counter() - started) / repeat * 1e6, 3)
+
+    contention = {}
+    for shards in (1, 16):
+        store = store_class(shards=shards)
+
+        def worker(worker_id):
+            key = f"users.read:sub:{worker_id}"
+            for _ in range(repeat // threads):
+                store.hit(key, limit)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        contention[f"{shards}_shard_hits_per_s"] = round(repeat // threads * threads / elapsed)
+    return {"hot_key_us": hot, "distinct_keys_us": distinct, f"{threads}_threads": contention}
+
+
+def bench_fastapi(repeat):
+    load_fastapi_app()
+    from starlette.requests import Request
+    from app.auth import create_access_token
+    from app.rate_limit import RateLimit, TokenBucketStore, client_key, rate_limiter
+
+    token = create_access_token({"sub": "bench@example.com"})
+    request = Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/users/1",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 50000),
+    })
+    limit = RateLimit(10 ** 9, 1)
+
+    def check():
+        rate_limiter.hit("users.read:" + client_key(request), limit)
+
+    return {
+        "store": bench_store(TokenBucketStore, RateLimit, repeat, threads=8),
+        "per_request_us": per_call_us(check, repeat),
+    }
+
+
+def bench_flask(repeat):
+    module = load_flask_app()
+    from flask_jwt_extended import create_access_token
+    from shared.rate_limit import RateLimit
+
+    with module.app.app_context():
+        token = create_access_token(identity=1)
+    headers = {"Authorization": f"Bearer {token}"}
+    limit = RateLimit(10 ** 9, 1)
+
+    def check():
+        module.rate_limiter.hit("users.read:" + module.rate_limit_client(), limit)
+
+    # One request context for every call, so only the check is timed
+    with module.app.test_request_context("/users/1", headers=headers):
+        per_request = per_call_us(check, repeat)
+    return {"per_request_us": per_request}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50000)
+    args = parser.parse_args()
+    print_report({
+        "repeat": args.repeat,
+        "fastapi": bench_fastapi(args.repeat),
+        "flask": bench_flask(args.repeat),
+    })
+
+
+if __name__ == "__main__":
+    main()
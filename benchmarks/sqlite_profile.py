@@ -0,0 +1,108 @@
+"""
+Read/write throughput of the async engine under different configurations.
+
+Each variant runs in a child process (engine settings are read at import)
+with concurrent readers and writers going through UserCRUD. By default the
+SQLite profile is compared with stock SQLite:
+
+    python benchmarks/sqlite_profile.py --seconds 5 --concurrency 32
+
+Any environment settings can be compared, e.g. the group-commit queue:
+
+    python benchmarks/sqlite_profile.py --write-ratio 1 --concurrency 64 \
+        --variants WRITE_QUEUE_ENABLED=0 WRITE_QUEUE_ENABLED=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from _common import latency_summary, load_fastapi_app, print_report, seed_users, sqlite_path
+
+DEFAULT_VARIANTS = ("DB_PROFILE=default", "DB_PROFILE=performance")
+
+
+async def run_workload(users, seconds, concurrency, write_ratio):
+    app = load_fastapi_app()
+    from sqlalchemy.exc import OperationalError
+    from app.database import async_engine
+    from app.database.connection import AsyncSessionLocal
+    from app.database.crud import UserCRUD
+    from app.models.schemas import UserUpdate
+
+    async with app.router.lifespan_context(app):
+        seed_users(
+            sqlite_path(str(async_engine.url)), "users", users,
+            ("id", "name", "email", "age", "hashed_password", "is_active", "created_at"),
+            lambda i: (i, f"User {i}", f"user{i}@example.com", 30, "x", 1, "2025-01-01 00:00:00"),
+        )
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        samples = {"reads": [], "writes": []}
+        deadline = time.perf_counter() + seconds
+
+        async def worker(seed):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                user_id = rng.randint(1, users)
+                kind = "writes" if rng.random() < write_ratio else "reads"
+                started = time.perf_counter()
+                try:
+                    async with AsyncSessionLocal() as db:
+                        if kind == "writes":
+                            await UserCRUD.update_user(db, user_id, UserUpdate(age=rng.randint(1, 99)))
+                        else:
+                            await UserCRUD.get_user_by_id(db, user_id)
+                except OperationalError:
+                    counts["errors"] += 1
+                    continue
+                counts[kind] += 1
+                samples[kind].append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    return {
+        "reads_per_second": round(counts["reads"] / seconds, 1),
+        "writes_per_second": round(counts["writes"] / seconds, 1),
+        "errors": counts["errors"],
+        "read_latency": latency_summary(samples["reads"]),
+        "write_latency": latency_summary(samples["writes"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--variants", nargs="+", default=list(DEFAULT_VARIANTS),
+                        help="NAME=VALUE[,NAME=VALUE...] environment per variant")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(run_workload(args.users, args.seconds, args.concurrency, args.write_ratio))
+        print(json.dumps(result))
+        return
+
+    report = {"users": args.users, "seconds": args.seconds,
+              "concurrency": args.concurrency, "write_ratio": args.write_ratio}
+    for variant in args.variants:
+        env = dict(setting.split("=", 1) for setting in variant.split(","))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--users", str(args.users), "--seconds", str(args.seconds),
+             "--concurrency", str(args.concurrency), "--write-ratio", str(args.write_ratio)],
+            env={**os.environ, **env},
+            check=True, capture_output=True, text=True,
+        ).stdout
+        report[variant] = json.loads(output.strip().splitlines()[-1])
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
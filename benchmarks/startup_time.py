@@ -0,0 +1,108 @@
+"""
+Cold start of the FastAPI app: import time and lifespan startup.
+
+Each run is a fresh interpreter under `python -X importtime`, so module
+caches never carry over. It reports the median time to import app.main,
+the slowest imported packages, and the lifespan startup on a new
+database (full schema setup) and on an existing one (schema version
+matches, setup skipped):
+
+    python benchmarks/startup_time.py --runs 7 --budget-ms 1500
+
+Exits non-zero when the median import time is over --budget-ms.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+from _common import FASTAPI_PROJECT, print_report
+
+# Run in the child: import the app, then time one lifespan startup
+CHILD = """
+import asyncio, sys, time
+sys.path.insert(0, {project!r})
+from app.main import app
+
+async def boot():
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        print("lifespan_ms", (time.perf_counter() - started) * 1000)
+
+asyncio.run(boot())
+"""
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) for each `import time:` line"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def run_once(workdir):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(project=FASTAPI_PROJECT)],
+        cwd=workdir, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    rows = parse_importtime(result.stderr)
+    # Lines are printed as each import finishes; anything after app.main came from the lifespan
+    end = next(i for i, (name, _, _, depth) in enumerate(rows) if name == "app.main" and depth == 0)
+    rows = rows[:end + 1]
+    import_ms = rows[-1][2] / 1000
+    lifespan_ms = float(next(line.split()[1] for line in result.stdout.splitlines() if line.startswith("lifespan_ms")))
+    return rows, import_ms, lifespan_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=1500, help="limit for the median import time")
+    parser.add_argument("--top", type=int, default=10, help="packages to list by self time")
+    args = parser.parse_args()
+
+    imports, first_boot, reboot = [], [], []
+    package_us = defaultdict(list)
+    for _ in range(args.runs):
+        workdir = tempfile.mkdtemp(prefix="bench-startup-")
+        rows, import_ms, lifespan_ms = run_once(workdir)
+        imports.append(import_ms)
+        first_boot.append(lifespan_ms)
+        reboot.append(run_once(workdir)[2])
+        totals = defaultdict(int)
+        for name, self_us, _, _ in rows:
+            totals[name.split(".")[0]] += self_us
+        for package, total in totals.items():
+            package_us[package].append(total)
+
+    slowest = sorted(package_us.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+    report = {
+        "runs": args.runs,
+        "import_ms": round(statistics.median(imports), 1),
+        "modules_imported": len(rows),
+        "lifespan_new_db_ms": round(statistics.median(first_boot), 1),
+        "lifespan_existing_db_ms": round(statistics.median(reboot), 1),
+        "slowest_packages_ms": {package: round(statistics.median(us) / 1000, 1) for package, us in slowest},
+        "lazy_not_imported": [
+            name for name in ("jose", "passlib", "cryptography")
+            if not any(row[0] == name for row in rows)
+        ],
+        "budget_ms": args.budget_ms,
+    }
+    report["within_budget"] = report["import_ms"] <= args.budget_ms
+    print_report(report)
+    if not report["within_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Flask listing cost with soft-deleted rows piling up, before and after
+archival compaction, and how long compaction blocks other writers.
+
+Seeds the user table with a share of long-inactive rows, times the
+counted offset listing (ACTIVE_USER_COUNTER=0, so every page counts), a
+cursor page and a broad search, runs compact_users() while a second
+connection keeps updating rows, then times the same requests again:
+
+    python benchmarks/user_archive.py --rows 500000 --inactive 0.6
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import threading
+import time
+
+os.environ.setdefault("ACTIVE_USER_COUNTER", "0")
+
+from _common import latency_summary, load_flask_app, print_report, seed_users
+
+NOW = "2025-01-01 00:00:00"
+
+
+def time_pages(client, module, rows, repeat):
+    def median_ms(path):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(path)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return round(statistics.median(samples), 2)
+
+    return {
+        "offset_page_1_ms": median_ms("/users?page=1&per_page=20"),
+        "offset_deep_page_ms": median_ms(f"/users?page={rows // 40}&per_page=20"),
+        "cursor_page_ms": median_ms(f"/users?cursor={module.encode_cursor(rows // 2)}&per_page=20"),
+        # Matches every user; inactive matches take up the rank window
+        "broad_search_ms": median_ms("/users/search?q=user&per_page=20"),
+    }
+
+
+def storage(db_path, table):
+    """Rows and size of the user table with its indexes (needs SQLite's dbstat table)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        size = conn.execute(
+            "SELECT sum(pgsize) FROM dbstat WHERE name = ? OR name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?)",
+            (table, table),
+        ).fetchone()[0]
+        return {
+            "user_rows": conn.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0],
+            "user_table_mb": round(size / 1e6, 1),
+        }
+    finally:
+        conn.close()
+
+
+def writer(db_path, stop, samples, rows):
+    """Keeps updating active rows through its own connection, recording each write's latency"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    i = 0
+    while not stop.is_set():
+        user_id = 1 + (i * 7919) % rows
+        started = time.perf_counter()
+        conn.execute('UPDATE "user" SET name = ? WHERE id = ? AND is_active = 1', (f"Writer {i}", user_id))
+        samples.append((time.perf_counter() - started) * 1000)
+        i += 1
+        time.sleep(0.001)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--inactive", type=float, default=0.6, help="share of rows soft-deleted long ago")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    module = load_flask_app()
+    table = module.User.__tablename__
+    with module.app.app_context():
+        db_path = module.db.engine.url.database
+    inactive_per_100 = round(args.inactive * 100)
+    seed_users(
+        db_path, table, args.rows,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        lambda i: (i, f"User {i}", f"user{i}@example.com", NOW, NOW, int(i % 100 >= inactive_per_100)),
+    )
+    active = sum(1 for i in range(1, args.rows + 1) if i % 100 >= inactive_per_100)
+    client = module.app.test_client()
+    report = {"rows": args.rows, "inactive_share": inactive_per_100 / 100, "batch_size": args.batch_size}
+    report["before"] = time_pages(client, module, active, args.repeat)
+    report["before"].update(storage(db_path, table))
+
+    stop, samples = threading.Event(), []
+    thread = threading.Thread(target=writer, args=(db_path, stop, samples, args.rows))
+    thread.start()
+    try:
+        with module.app.app_context():
+            result = module.compact_users(days=30, batch_size=args.batch_size)
+    finally:
+        stop.set()
+        thread.join()
+    report["compaction"] = dict(result._asdict())
+    report["concurrent_writes"] = latency_summary(samples)
+    report["after"] = time_pages(client, module, active, args.repeat)
+    report["after"].update(storage(db_path, table))
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Latency of GET /users/search against a LIKE '%term%' scan.
+
+Seeds both apps with synthetic names and emails (the triggers fill the
+FTS5 index as rows go in), then times one page of results for narrow and
+broad queries:
+
+    python benchmarks/user_search.py --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import statistics
+import time
+
+from _common import load_fastapi_app, load_flask_app, print_report, seed_users, sqlite_path
+
+NOW = "2025-01-01 00:00:00"
+SYLLABLES = ["ja", "mes", "ma", "ry", "jo", "hn", "pa", "tri", "ci", "ro", "bert", "jen", "ni", "fer",
+             "mi", "chael", "lin", "da", "wil", "li", "am", "el", "iza", "beth", "vid", "bar", "ra",
+             "chard", "su", "san", "se", "ph", "es", "si", "ca", "tho", "sar", "ah", "char", "les"]
+DOMAINS = ["example.com", "mail.com", "acme.io", "corp.net", "gmail.com", "proton.me"]
+
+
+def make_people(seed=1):
+    rng = random.Random(seed)
+    first = sorted({rng.choice(SYLLABLES) + rng.choice(SYLLABLES) for _ in range(600)})
+    last = sorted({rng.choice(SYLLABLES) + rng.choice(SYLLABLES) + rng.choice(SYLLABLES) for _ in range(3000)})
+    return first, last
+
+
+def person(i, first, last):
+    f, l = first[i * 7919 % len(first)], last[i * 104729 % len(last)]
+    return f"{f.title()} {l.title()}", f"{f}.{l}{i}@{DOMAINS[i % len(DOMAINS)]}"
+
+
+def queries(first, last, rows):
+    return {
+        "one_user": person(rows // 2, first, last)[1].split("@")[0],
+        "full_name": f"{first[3]} {last[5]}",
+        "two_prefixes": f"{first[3][:3]} {last[5][:3]}",
+        "name_prefix": first[3][:4],
+        "one_letter": first[3][0],
+        "domain": "gmail",
+    }
+
+
+def time_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+async def time_async_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def like_scan_ms(db_path, table, term, repeat):
+    """The only option before: a LIKE scan, which reads the whole table for a rare term"""
+    conn = sqlite3.connect(db_path)
+    try:
+        sql = f'SELECT * FROM "{table}" WHERE name LIKE ? OR email LIKE ? LIMIT 20'
+        pattern = f"%{term}%"
+        return time_calls(lambda: conn.execute(sql, (pattern, pattern)).fetchall(), repeat)
+    finally:
+        conn.close()
+
+
+async def bench_fastapi(rows, repeat, first, last):
+    import httpx
+
+    app = load_fastapi_app()
+    from app.auth import create_access_token
+    from app.database import async_engine
+
+    async with app.router.lifespan_context(app):
+        db_path = sqlite_path(str(async_engine.url))
+        started = time.perf_counter()
+        seed_users(
+            db_path, "users", rows,
+            ("id", "name", "email", "age", "hashed_password", "is_active", "created_at"),
+            lambda i: (i, *person(i, first, last), 30, "x", 1, NOW),
+        )
+        report = {"seed_s": round(time.perf_counter() - started, 1)}
+        token = create_access_token({"sub": person(1, first, last)[1]})
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for name, q in queries(first, last, rows).items():
+                async def search():
+                    response = await client.get("/users/search", params={"q": q, "limit": 20})
+                    assert response.status_code == 200, response.text
+
+                report[f"{name}_ms"] = await time_async_calls(search, repeat)
+        report["like_scan_ms"] = like_scan_ms(db_path, "users", queries(first, last, rows)["one_user"], repeat)
+        return report
+
+
+def bench_flask(rows, repeat, first, last):
+    module = load_flask_app()
+    with module.app.app_context():
+        db_path = module.db.engine.url.database
+    started = time.perf_counter()
+    seed_users(
+        db_path, module.User.__tablename__, rows,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        lambda i: (i, *person(i, first, last), NOW, NOW, 1),
+    )
+    report = {"seed_s": round(time.perf_counter() - started, 1)}
+    client = module.app.test_client()
+    for name, q in queries(first, last, rows).items():
+        def search():
+            response = client.get("/users/search", query_string={"q": q, "per_page": 20})
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+        report[f"{name}_ms"] = time_calls(search, repeat)
+    report["like_scan_ms"] = like_scan_ms(db_path, module.User.__tablename__, queries(first, last, rows)["one_user"], repeat)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=9)
+    args = parser.parse_args()
+
+    first, last = make_people()
+    report = {"rows": args.rows, "queries": queries(first, last, args.rows)}
+    report["fastapi"] = asyncio.run(bench_fastapi(args.rows, args.repeat, first, last))
+    report["flask"] = bench_flask(args.rows, args.repeat, first, last)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Throughput of the FastAPI app under serve.py as the worker count grows.
+
+Starts the pre-forked launcher on a local port for each worker count,
+then drives it over real HTTP from separate load-generator processes
+for a fixed time:
+
+    python benchmarks/worker_scaling.py --workers 1 2 4 --clients 4 --duration 10
+
+Workers and load generators share the machine's cores, so scaling
+flattens out once they add up to more than os.cpu_count().
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import FASTAPI_PROJECT, latency_summary, print_report
+
+PASSWORD = "benchpassword"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port):
+    """serve.py in a fresh directory (the app keeps ./app.db), once it answers /health"""
+    import httpx
+
+    workdir = tempfile.mkdtemp(prefix="bench-serve-")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(FASTAPI_PROJECT, "serve.py"),
+         "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"serve.py with {workers} workers did not start")
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=60)
+
+
+def login(base_url):
+    import httpx
+
+    httpx.post(f"{base_url}/auth/register", json={"name": "Bench", "email": "bench@example.com", "password": PASSWORD})
+    response = httpx.post(f"{base_url}/auth/login", data={"username": "bench@example.com", "password": PASSWORD})
+    return response.json()["access_token"]
+
+
+def load_generator(base_url, path, token, concurrency, duration, results):
+    """One client process: `concurrency` keep-alive connections for `duration` seconds"""
+    import httpx
+
+    async def run():
+        samples, errors = [], 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits) as client:
+            stop_at = time.monotonic() + duration
+
+            async def worker():
+                nonlocal errors
+                while time.monotonic() < stop_at:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    samples.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        errors += 1
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples, errors
+
+    results.put(asyncio.run(run()))
+
+
+def measure(workers, path, clients, concurrency, duration):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(workers, port)
+    try:
+        token = login(base_url)
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        generators = [
+            context.Process(target=load_generator, args=(base_url, path, token, concurrency, duration, results))
+            for _ in range(clients)
+        ]
+        for generator in generators:
+            generator.start()
+        samples, errors = [], 0
+        for _ in generators:
+            chunk, chunk_errors = results.get()
+            samples.extend(chunk)
+            errors += chunk_errors
+        for generator in generators:
+            generator.join()
+    finally:
+        stop_server(server)
+    summary = latency_summary(samples)
+    summary["throughput_rps"] = round(len(samples) / duration, 1)
+    summary["errors"] = errors
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/users/1")
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="connections per load generator")
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    report = {"cpus": os.cpu_count(), "path": args.path, "results": {}}
+    for workers in args.workers:
+        report["results"][workers] = measure(workers, args.path, args.clients, args.concurrency, args.duration)
+    base = report["results"][args.workers[0]]["throughput_rps"]
+    for workers, result in report["results"].items():
+        result["speedup"] = round(result["throughput_rps"] / base, 2) if base else None
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
+import os
+import sys
+
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
+# The repository root, for the shared package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.user_store import UserStore  # noqa: E402
+
 app = FastAPI()
 
 # Pydantic model
@@ -9,41 +16,49 @@ class User(BaseModel):
     age: int
     email: str | None = None
 
-# In-memory "database"
-users = {}
+# In-memory "database": thread-safe (these sync routes run in a thread pool).
+# USER_STORE_SNAPSHOT=users.json saves it there every
+# USER_STORE_SNAPSHOT_INTERVAL seconds and at exit, and loads it on start.
+users = UserStore(
+    User.model_fields,
+    snapshot_path=os.getenv("USER_STORE_SNAPSHOT") or None,
+    snapshot_interval=float(os.getenv("USER_STORE_SNAPSHOT_INTERVAL", "30")),
+)
+users.start_snapshots()
 
 # ✅ Create user
 @app.post("/users/{user_id}")
 def create_user(user_id: int, user: User):
-    if user_id in users:
+    try:
+        users.create(user.model_dump(), user_id)
+    except ValueError:
         raise HTTPException(status_code=400, detail="User ID already exists")
-    users[user_id] = user
     return {"message": "User created", "user": user}
 
 # ✅ Read user
 @app.get("/users/{user_id}")
 def read_user(user_id: int):
-    if user_id not in users:
+    user = users.get(user_id)
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return users[user_id]
+    return user.as_dict()
 
 # ✅ Update user
 @app.put("/users/{user_id}")
 def update_user(user_id: int, user: User):
-    if user_id not in users:
+    if users.replace(user_id, user.model_dump()) is None:
         raise HTTPException(status_code=404, detail="User not found")
-    users[user_id] = user
     return {"message": "User updated", "user": user}
 
 # ✅ Delete user
 @app.delete("/users/{user_id}")
 def delete_user(user_id: int):
-    if user_id not in users:
+    deleted_user = users.delete(user_id)
+    if deleted_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    deleted_user = users.pop(user_id)
-    return {"message": "User deleted", "user": deleted_user}
+    return {"message": "User deleted", "user": deleted_user.as_dict()}
 
 # ✅ List all users
 @app.get("/users/")
 def list_users():
-    return users
+    return {user.id: user.as_dict() for user in users.all()}
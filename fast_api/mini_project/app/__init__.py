@@ -1,3 +1,9 @@
-from .main import app
+import os
+import sys
 
-__all__ = ["app"]
\ No newline at end of file
+# The repository root, for the shared package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from .main import app  # noqa: E402
+
+__all__ = ["app"]
@@ -1,18 +1,35 @@
 from .security import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    get_password_hashes_async,
+    password_pool,
+    PasswordPoolFull,
     create_access_token,
+    decode_access_token,
+    revoke_access_token,
     verify_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from .cache import principal_cache, token_cache
 from .dependencies import get_current_user, get_current_active_user, oauth2_scheme
 
 __all__ = [
     "verify_password",
     "get_password_hash", 
+    "verify_password_async",
+    "get_password_hash_async",
+    "get_password_hashes_async",
+    "password_pool",
+    "PasswordPoolFull",
     "create_access_token",
+    "decode_access_token",
+    "revoke_access_token",
     "verify_token",
     "ACCESS_TOKEN_EXPIRE_MINUTES",
+    "principal_cache",
+    "token_cache",
     "get_current_user",
     "get_current_active_user",
     "oauth2_scheme"
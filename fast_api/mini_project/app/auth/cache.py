@@ -0,0 +1,21 @@
+import os
+
+from shared.auth_cache import InvalidationLog, PrincipalCache, TokenCache
+
+# Principal cache configuration (TTL 0 disables the cache)
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "1024"))
+# Verified JWT claims cache (0 disables the cache; revocation still applies)
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "4096"))
+# File through which every worker process on the host sees logouts and user changes
+AUTH_EVENTS_PATH = os.getenv("AUTH_EVENTS_PATH", "./auth-events.log")
+
+auth_events = InvalidationLog(AUTH_EVENTS_PATH)
+
+principal_cache = PrincipalCache(
+    ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=PRINCIPAL_CACHE_MAX_SIZE,
+    events=auth_events,
+)
+
+token_cache = TokenCache(max_size=TOKEN_CACHE_MAX_SIZE, events=auth_events)
@@ -2,7 +2,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
-from .security import verify_token
+from .security import decode_access_token
+from .cache import principal_cache
+from ..metrics import phase
 from ..models.schemas import TokenData
 
 # OAuth2 scheme
@@ -21,11 +23,20 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    email = verify_token(token, credentials_exception)
-    user = await UserCRUD.get_user_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user
+    with phase("auth"):
+        payload = decode_access_token(token, credentials_exception)
+        email = payload["sub"]
+        user = principal_cache.get(email)
+        if user is not None:
+            return user
+        
+        # Not cached if the user is invalidated while the query runs
+        generation = principal_cache.generation
+        user = await UserCRUD.get_user_by_email(db, email=email)
+        if user is None:
+            raise credentials_exception
+        principal_cache.set(email, user, token_expires_at=payload.get("exp"), generation=generation)
+        return user
 
 async def get_current_active_user(current_user = Depends(get_current_user)):
     """Get current active user (must be active)"""
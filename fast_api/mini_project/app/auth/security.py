@@ -1,24 +1,154 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
 import os
+import secrets
+
+from .cache import token_cache
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing pool configuration
+# PASSWORD_HASH_EXECUTOR: "thread" (bcrypt releases the GIL), "process" or "inline"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# passlib and python-jose (with cryptography) are imported on first use,
+# so importing the app stays cheap; the lifespan loads them before serving
+_pwd_context = None
+
+def get_pwd_context():
+    """The bcrypt CryptContext, created on first use"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+def load_password_backend() -> str:
+    """Import and self-test the bcrypt backend, which passlib otherwise does on first use"""
+    return get_pwd_context().handler("bcrypt").get_backend()
+
+def load_token_backend():
+    """Import python-jose ahead of the first token"""
+    from jose import jwt
+    return jwt
+
+class PasswordPoolFull(Exception):
+    """Raised when the password hashing pool has no free queue slots"""
+
+
+class PasswordHashPool:
+    """Bounded executor that keeps bcrypt work off the event loop"""
+
+    def __init__(self, kind: str = "thread", workers: int = 1, max_queue: int = 64):
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown password hash executor: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def capacity(self) -> int:
+        """Jobs allowed at once: one per worker plus the waiting queue"""
+        return self.workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, func, *args):
+        """Run a password function in the pool, rejecting work when it is full"""
+        if self.kind == "inline":
+            return func(*args)
+        # Only touched from the event loop thread, so a plain counter is enough
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise PasswordPoolFull("Password hashing queue is full")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def run_batch(self, func, items: list) -> list:
+        """Split items into one chunk per free worker and run func on each chunk"""
+        if not items:
+            return []
+        if self.kind == "inline":
+            return func(items)
+        chunks = min(self.workers, self.capacity - self.pending, len(items))
+        if chunks <= 0:
+            self.rejected += 1
+            raise PasswordPoolFull("Password hashing queue is full")
+        size = -(-len(items) // chunks)
+        results = await asyncio.gather(*(
+            self.run(func, items[start:start + size])
+            for start in range(0, len(items), size)
+        ))
+        return [value for chunk in results for value in chunk]
+
+    async def warm_up(self):
+        """Start every worker and load the bcrypt backend in each"""
+        load_password_backend()
+        if self.kind == "inline":
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, load_password_backend) for _ in range(self.workers)
+        ))
+
+    def shutdown(self):
+        """Stop the worker threads/processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_pool = PasswordHashPool(
+    kind=PASSWORD_HASH_EXECUTOR,
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing pool"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hashing pool"""
+    return await password_pool.run(get_password_hash, password)
+
+def _hash_passwords(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    """Hash many passwords in parallel across the pool's workers"""
+    return await password_pool.run_batch(_hash_passwords, passwords)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
@@ -28,17 +158,36 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # jti lets a single token be revoked
+    to_encode.update({"exp": expire, "jti": secrets.token_urlsafe(12)})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, credentials_exception):
-    """Verify and decode JWT token"""
+def decode_access_token(token: str, credentials_exception) -> dict:
+    """Verify a JWT token and return its claims
+    
+    Tokens seen before are answered from token_cache until their exp;
+    revoked tokens are rejected either way.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        return email
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+    if payload.get("sub") is None or token_cache.is_revoked(payload.get("jti")):
+        raise credentials_exception
+    token_cache.set(token, payload)
+    return payload
+
+def revoke_access_token(payload: dict):
+    """Reject a token from now until it expires"""
+    if payload.get("jti") is not None:
+        token_cache.revoke(payload["jti"], payload["exp"])
+
+def verify_token(token: str, credentials_exception):
+    """Verify and decode JWT token"""
+    return decode_access_token(token, credentials_exception)["sub"]
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Conditional request helpers for user resources.
+
+A user's version is its updated_at (created_at for rows never updated).
+The strong ETag is built from id and version, and Last-Modified from the
+version, so both can be checked from a primary-key lookup of the
+timestamps without loading or serializing the user.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional
+
+
+def user_version(updated_at: Optional[datetime], created_at: datetime) -> datetime:
+    return updated_at or created_at
+
+
+def user_etag(user_id: int, version: datetime) -> str:
+    return f'"{user_id}-{version.strftime("%Y%m%d%H%M%S%f")}"'
+
+
+def http_date(value: datetime) -> str:
+    """IMF-fixdate; naive datetimes are UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(user_id: int, version: datetime) -> Dict[str, str]:
+    return {"ETag": user_etag(user_id, version), "Last-Modified": http_date(version)}
+
+
+def _entity_tags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: str, etag: str, weak: bool = False) -> bool:
+    """Whether an If-Match/If-None-Match header matches etag
+
+    If-None-Match uses weak comparison (W/ prefixes ignored); If-Match
+    uses strong comparison, so weak tags never match.
+    """
+    for tag in _entity_tags(header):
+        if tag == "*":
+            return True
+        if weak and tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, version: datetime) -> bool:
+    """If-None-Match wins over If-Modified-Since, as in RFC 9110"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag, weak=True)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if version.tzinfo is None:
+        version = version.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return version.replace(microsecond=0) <= since
@@ -1,3 +1,4 @@
 from .connection import get_db, async_engine, Base
+from .write_queue import write_queue, WRITE_QUEUE_ENABLED
 
-__all__ = ["get_db", "async_engine", "Base"]
\ No newline at end of file
+__all__ = ["get_db", "async_engine", "Base", "write_queue", "WRITE_QUEUE_ENABLED"]
\ No newline at end of file
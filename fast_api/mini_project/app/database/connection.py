@@ -1,18 +1,69 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
+import os
 
 # Database URL for SQLite
-SQLITE_DATABASE_URL = "sqlite:///./app.db"
-ASYNC_SQLITE_DATABASE_URL = "sqlite+aiosqlite:///./app.db"
+SQLITE_DATABASE_URL = os.getenv("SQLITE_DATABASE_URL", "sqlite:///./app.db")
+ASYNC_SQLITE_DATABASE_URL = os.getenv("ASYNC_SQLITE_DATABASE_URL", "sqlite+aiosqlite:///./app.db")
+
+# Engine profile
+# DB_PROFILE: "performance" applies the pragmas below, "default" leaves SQLite as shipped
+DB_PROFILE = os.getenv("DB_PROFILE", "performance")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+# aiosqlite defaults to NullPool, which reopens the file (and reruns the
+# pragmas) on every checkout; a queue pool keeps connections warm
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer and vice versa
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # Safe with WAL; fsync only at checkpoints
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+} if DB_PROFILE == "performance" else {}
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the engine profile to every new SQLite connection"""
+    if not SQLITE_PRAGMAS:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
 
 # Create engines
-engine = create_engine(SQLITE_DATABASE_URL, connect_args={"check_same_thread": False})
-async_engine = create_async_engine(ASYNC_SQLITE_DATABASE_URL, echo=True)
+async_engine = create_async_engine(
+    ASYNC_SQLITE_DATABASE_URL,
+    echo=DB_ECHO,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+async def warm_up_pool(size: int = DB_POOL_SIZE):
+    """Open the pool's connections (and run their pragmas) before the first request"""
+    connections = [await async_engine.connect() for _ in range(max(1, size))]
+    try:
+        for connection in connections:
+            await connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            await connection.close()
 
 # Create session factories
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 AsyncSessionLocal = sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
@@ -31,10 +82,34 @@ async def get_db():
         finally:
             await session.close()
 
+# The app itself only uses the async engine; the sync engine and
+# SessionLocal are created on first access (scripts, shells)
+_sync = {}
+
+def get_sync_engine():
+    if "engine" not in _sync:
+        sync_engine = create_engine(SQLITE_DATABASE_URL, echo=DB_ECHO, connect_args={"check_same_thread": False})
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+        _sync["engine"] = sync_engine
+    return _sync["engine"]
+
+def get_sync_sessionmaker():
+    if "SessionLocal" not in _sync:
+        _sync["SessionLocal"] = sessionmaker(autocommit=False, autoflush=False, bind=get_sync_engine())
+    return _sync["SessionLocal"]
+
+def __getattr__(name):
+    # Keeps `from .connection import engine, SessionLocal` working
+    if name == "engine":
+        return get_sync_engine()
+    if name == "SessionLocal":
+        return get_sync_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Sync version for initial setup
 def get_sync_db():
-    db = SessionLocal()
+    db = get_sync_sessionmaker()()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,16 +1,43 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from ..models.user import User
 from ..models.schemas import UserCreate, UserUpdate
-from ..auth.security import get_password_hash
+from ..auth.security import get_password_hash_async, get_password_hashes_async
+from ..auth.cache import principal_cache
+from ..response_cache import response_cache
+from .loader import USER_LOADER_ENABLED, get_user_loader
+from .search import match_expression, users_search
+from .write_queue import write_queue
+
+# Columns written by the users export, in output order
+EXPORT_COLUMNS = (User.id, User.name, User.email, User.age, User.is_active, User.created_at, User.updated_at)
 
 class UserCRUD:
+    @staticmethod
+    async def _write(db: AsyncSession, operation):
+        """Run operation(session) and commit it
+        
+        When the group-commit queue is running the operation is batched with
+        other writers; otherwise (also once the queue is stopping) it runs in
+        the request's own session.
+        """
+        if write_queue.running:
+            return await write_queue.submit(operation)
+        try:
+            result = await operation(db)
+            await db.commit()
+            return result
+        except Exception:
+            await db.rollback()
+            raise
+    
     @staticmethod
     async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
         """Create a new user"""
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         db_user = User(
             name=user_data.name,
             email=user_data.email,
@@ -18,72 +45,212 @@ class UserCRUD:
             hashed_password=hashed_password
         )
         
-        try:
-            db.add(db_user)
-            await db.commit()
-            await db.refresh(db_user)
+        async def insert_user(session: AsyncSession) -> User:
+            session.add(db_user)
+            try:
+                await session.flush()
+            except IntegrityError:
+                raise ValueError("User with this email already exists")
+            await session.refresh(db_user)
             return db_user
+        
+        user = await UserCRUD._write(db, insert_user)
+        await response_cache.invalidate()
+        return user
+    
+    @staticmethod
+    async def create_users_bulk(db: AsyncSession, users_data: List[UserCreate]) -> List[Tuple[Optional[User], Optional[str]]]:
+        """Create many users in one transaction
+        
+        The insert is one write like any other, so it joins a write queue
+        batch when the queue is running. Returns one (user, error) pair per
+        input, in input order.
+        """
+        results: List[Tuple[Optional[User], Optional[str]]] = [(None, None)] * len(users_data)
+        
+        # One query for every email that is already taken
+        emails = [user_data.email for user_data in users_data]
+        existing = await db.execute(select(User.email).where(User.email.in_(set(emails))))
+        taken = set(existing.scalars().all())
+        
+        pending = []
+        for index, user_data in enumerate(users_data):
+            if user_data.email in taken:
+                results[index] = (None, "User with this email already exists")
+                continue
+            taken.add(user_data.email)
+            pending.append(index)
+        
+        if not pending:
+            return results
+        
+        hashed_passwords = await get_password_hashes_async(
+            [users_data[index].password for index in pending]
+        )
+        rows = [
+            {
+                "name": users_data[index].name,
+                "email": users_data[index].email,
+                "age": users_data[index].age,
+                "hashed_password": hashed_password,
+            }
+            for index, hashed_password in zip(pending, hashed_passwords)
+        ]
+        
+        async def insert_users(session: AsyncSession) -> Dict[str, User]:
+            # A single executemany; RETURNING would force row-at-a-time inserts on SQLite
+            await session.execute(insert(User), rows)
+            created = await session.execute(
+                select(User).where(User.email.in_([row["email"] for row in rows]))
+            )
+            return {user.email: user for user in created.scalars().all()}
+        
+        try:
+            created_users = await UserCRUD._write(db, insert_users)
         except IntegrityError:
-            await db.rollback()
-            raise ValueError("User with this email already exists")
+            raise ValueError("A user with one of these emails was created concurrently, retry the request")
+        
+        await response_cache.invalidate()
+        for index in pending:
+            results[index] = (created_users[users_data[index].email], None)
+        return results
     
     @staticmethod
     async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-        """Get user by ID"""
+        """Get user by ID
+        
+        With USER_LOADER_ENABLED, and no transaction open on db, concurrent
+        lookups are merged into one query by the event loop's UserLoader and
+        the user comes back detached.
+        """
+        if USER_LOADER_ENABLED and not db.in_transaction():
+            return await get_user_loader().load_by_id(user_id)
         result = await db.execute(select(User).where(User.id == user_id))
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_users_by_ids(db: AsyncSession, user_ids: Sequence[int]) -> List[User]:
+        """Users with these ids in one IN query, in the order asked for; missing ids are left out"""
+        if not user_ids:
+            return []
+        result = await db.execute(select(User).where(User.id.in_(set(user_ids))))
+        found = {user.id: user for user in result.scalars().all()}
+        return [found[user_id] for user_id in dict.fromkeys(user_ids) if user_id in found]
+    
+    @staticmethod
+    async def get_user_version(db: AsyncSession, user_id: int) -> Optional[Row]:
+        """(updated_at, created_at) by primary key, without loading the user"""
+        result = await db.execute(select(User.updated_at, User.created_at).where(User.id == user_id))
+        return result.one_or_none()
+    
     @staticmethod
     async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
-        """Get user by email"""
+        """Get user by email (merged like get_user_by_id)"""
+        if USER_LOADER_ENABLED and not db.in_transaction():
+            return await get_user_loader().load_by_email(email)
         result = await db.execute(select(User).where(User.email == email))
         return result.scalar_one_or_none()
     
     @staticmethod
     async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
         """Get list of users with pagination"""
-        result = await db.execute(select(User).offset(skip).limit(limit))
+        result = await db.execute(select(User).order_by(User.id).offset(skip).limit(limit))
         return result.scalars().all()
     
     @staticmethod
-    async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate) -> Optional[User]:
-        """Update user information"""
-        # First check if user exists
-        user = await UserCRUD.get_user_by_id(db, user_id)
-        if not user:
-            return None
+    async def get_users_after(db: AsyncSession, after_id: int = 0, limit: int = 100) -> Tuple[List[User], bool]:
+        """Get users with id greater than after_id (keyset pagination)"""
+        # Fetch one extra row to learn whether another page exists
+        result = await db.execute(
+            select(User).where(User.id > after_id).order_by(User.id).limit(limit + 1)
+        )
+        users = result.scalars().all()
+        return users[:limit], len(users) > limit
+    
+    @staticmethod
+    async def search_users(db: AsyncSession, q: str, skip: int = 0, limit: int = 20) -> Tuple[List[User], bool]:
+        """Users whose name or email words start with the words of q, best match first"""
+        match = match_expression(q)
+        if match is None:
+            return [], False
+        result = await db.execute(users_search.select(User, match, skip, limit + 1))
+        users = result.scalars().all()
+        return users[:limit], len(users) > limit
+    
+    @staticmethod
+    async def stream_users(db: AsyncSession, chunk_size: int = 1000) -> AsyncIterator[Sequence]:
+        """Yield every user as column tuples in chunks, using a server-side cursor"""
+        result = await db.stream(
+            select(*EXPORT_COLUMNS)
+            .order_by(User.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions():
+            yield rows
+    
+    @staticmethod
+    async def update_user(
+        db: AsyncSession,
+        user_id: int,
+        user_data: UserUpdate,
+        expected_version: Optional[Row] = None
+    ) -> Optional[User]:
+        """Update user information
         
+        With expected_version (from get_user_version) the update only applies
+        if the row has not changed since; otherwise None is returned.
+        """
         # Update only provided fields
         update_data = user_data.model_dump(exclude_unset=True)
-        if update_data:
-            await db.execute(
-                update(User)
-                .where(User.id == user_id)
-                .values(**update_data)
+        if not update_data:
+            return await UserCRUD.get_user_by_id(db, user_id)
+        
+        statement = update(User).where(User.id == user_id)
+        if expected_version is not None:
+            # Compare-and-set on the version the caller checked
+            expected = expected_version.updated_at
+            statement = statement.where(
+                User.updated_at.is_(None) if expected is None else User.updated_at == expected
             )
-            await db.commit()
-            # Refresh to get updated user
-            await db.refresh(user)
         
+        async def apply_update(session: AsyncSession) -> Optional[User]:
+            # One UPDATE ... RETURNING: no existence check or refresh needed
+            result = await session.scalars(
+                statement.values(**update_data).returning(User),
+                execution_options={"synchronize_session": False}
+            )
+            return result.one_or_none()
+        
+        user = await UserCRUD._write(db, apply_update)
+        if user is not None:
+            # By id, because the cached subject may be the old email
+            principal_cache.invalidate_user(user_id)
+            await response_cache.invalidate()
         return user
     
     @staticmethod
     async def delete_user(db: AsyncSession, user_id: int) -> bool:
         """Delete user by ID"""
-        user = await UserCRUD.get_user_by_id(db, user_id)
-        if not user:
-            return False
+        async def apply_delete(session: AsyncSession) -> Optional[str]:
+            # One DELETE ... RETURNING tells us whether the row existed
+            result = await session.execute(
+                delete(User).where(User.id == user_id).returning(User.email)
+            )
+            return result.scalar_one_or_none()
         
-        await db.execute(delete(User).where(User.id == user_id))
-        await db.commit()
+        email = await UserCRUD._write(db, apply_delete)
+        if email is None:
+            return False
+        principal_cache.invalidate(email)
+        await response_cache.invalidate()
         return True
     
     @staticmethod
     async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
         """Authenticate user with email and password"""
-        from ..auth.security import verify_password
+        from ..auth.security import verify_password_async
         
         user = await UserCRUD.get_user_by_email(db, email)
-        if not user or not verify_password(password, user.hashed_password):
+        if not user or not await verify_password_async(password, user.hashed_password):
             return None
         return user
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Coalesced user lookups by id or email (DataLoader style).
+
+Concurrent requests each look up a user (GET /users/{id}, and the auth
+dependency on a principal cache miss), and each lookup would be its own
+SELECT. A UserLoader collects the keys asked for while the event loop
+works through the callbacks that are ready, then loads all of them with
+one `IN` query per column on its own session and hands every caller its
+user (or None). Keys asked for twice in one batch share the result.
+
+Users come back detached with every column loaded, like the principal
+cache's, so UserCRUD only uses the loader when the caller's session has
+no transaction open (it would not see that transaction's state). The
+batch query runs in a task of its own; its statements and time are
+added to the query stats and "db" phase of every request waiting on it,
+so each request's query budget still sees the query it needed. Futures
+belong to one event loop, so there is one loader per loop (per worker).
+"""
+from sqlalchemy import select
+from typing import Any, Dict, List, Optional
+import asyncio
+import contextvars
+import os
+import weakref
+
+from ..metrics import RequestTimings, current_timings
+from ..models.user import User
+from .connection import AsyncSessionLocal
+from .profiling import QueryStats, current_query_stats, track_queries
+
+# Coalesce get_user_by_id / get_user_by_email calls across concurrent requests.
+# Off by default: a lookup made alone waits one extra loop iteration.
+USER_LOADER_ENABLED = os.getenv("USER_LOADER_ENABLED", "false").lower() in ("1", "true", "yes")
+# Wait this long for more keys before querying (0: only the current loop iteration)
+USER_LOADER_DELAY_MS = float(os.getenv("USER_LOADER_DELAY_MS", "0"))
+
+# Keys per IN (...) list, well under SQLite's 32766 bound parameters
+MAX_BATCH_SIZE = 500
+
+COLUMNS = {"id": User.id, "email": User.email}
+
+
+class UserLoader:
+    """Batches user lookups made in the same event loop iteration"""
+
+    def __init__(self, session_factory, delay_ms: float = 0):
+        self.session_factory = session_factory
+        self.delay = max(0.0, delay_ms) / 1000
+        self.loads = 0
+        self.batches = 0
+        self.queries = 0
+        self._pending: Dict[str, Dict[Any, asyncio.Future]] = {name: {} for name in COLUMNS}
+        # Query stats and request timings of the requests waiting on the pending batch
+        self._query_stats: Dict[int, QueryStats] = {}
+        self._timings: Dict[int, RequestTimings] = {}
+        self._scheduled = False
+        self._tasks = set()
+
+    async def load(self, column: str, key) -> Optional[User]:
+        """The user whose column equals key, or None"""
+        loop = asyncio.get_running_loop()
+        pending = self._pending[column]
+        future = pending.get(key)
+        if future is None:
+            future = pending[key] = loop.create_future()
+        self.loads += 1
+        stats, timings = current_query_stats(), current_timings()
+        if stats is not None:
+            self._query_stats[id(stats)] = stats
+        if timings is not None:
+            self._timings[id(timings)] = timings
+        if not self._scheduled:
+            self._scheduled = True
+            # An empty context, so the query is not charged to this caller alone
+            context = contextvars.Context()
+            if self.delay:
+                loop.call_later(self.delay, self._dispatch, context=context)
+            else:
+                loop.call_soon(self._dispatch, context=context)
+        # Shielded: one caller going away must not cancel the others' result
+        return await asyncio.shield(future)
+
+    async def load_by_id(self, user_id: int) -> Optional[User]:
+        return await self.load("id", user_id)
+
+    async def load_by_email(self, email: str) -> Optional[User]:
+        return await self.load("email", email)
+
+    def _dispatch(self):
+        batch = {column: keys for column, keys in self._pending.items() if keys}
+        waiters = (list(self._query_stats.values()), list(self._timings.values()))
+        self._pending = {name: {} for name in COLUMNS}
+        self._query_stats, self._timings = {}, {}
+        self._scheduled = False
+        task = asyncio.create_task(self._run(batch, *waiters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(
+        self,
+        batch: Dict[str, Dict[Any, asyncio.Future]],
+        query_stats: List[QueryStats],
+        timings: List[RequestTimings],
+    ):
+        self.batches += 1
+        results: Dict[str, Dict[Any, User]] = {}
+        error = None
+        with track_queries() as stats:
+            try:
+                async with self.session_factory() as session:
+                    for column, futures in batch.items():
+                        keys = list(futures)
+                        found = results[column] = {}
+                        for start in range(0, len(keys), MAX_BATCH_SIZE):
+                            chunk = keys[start:start + MAX_BATCH_SIZE]
+                            result = await session.execute(select(User).where(COLUMNS[column].in_(chunk)))
+                            self.queries += 1
+                            found.update((getattr(user, column), user) for user in result.scalars())
+            except Exception as exc:
+                error = exc
+        # Charged before any waiter resumes, so its response headers and budget check include it
+        for waiting in query_stats:
+            waiting.count += stats.count
+            waiting.duration += stats.duration
+        for waiting in timings:
+            waiting.add("db", stats.duration)
+        for column, futures in batch.items():
+            for key, future in futures.items():
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[column].get(key))
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "batches": self.batches,
+            "queries": self.queries,
+            "average_batch": round(self.loads / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+_loaders: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, UserLoader]" = weakref.WeakKeyDictionary()
+
+
+def get_user_loader() -> UserLoader:
+    """The running event loop's loader"""
+    loop = asyncio.get_running_loop()
+    loader = _loaders.get(loop)
+    if loader is None:
+        loader = _loaders[loop] = UserLoader(AsyncSessionLocal, delay_ms=USER_LOADER_DELAY_MS)
+    return loader
+
+
+def user_loader_stats() -> dict:
+    """Counters summed over every loop's loader"""
+    totals = {"loads": 0, "batches": 0, "queries": 0}
+    for loader in list(_loaders.values()):
+        for name in totals:
+            totals[name] += getattr(loader, name)
+    return totals
@@ -0,0 +1,27 @@
+import base64
+from typing import Optional
+
+CURSOR_PREFIX = "id:"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Build an opaque cursor pointing after the given user id"""
+    raw = f"{CURSOR_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Return the id a cursor points after (an empty cursor starts at the beginning)"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith(CURSOR_PREFIX):
+            raise ValueError
+        last_id = int(raw[len(CURSOR_PREFIX):])
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if last_id < 0:
+        raise ValueError("Invalid cursor")
+    return last_id
@@ -0,0 +1,164 @@
+"""
+Per-request SQL query accounting.
+
+QueryAccountingMiddleware gives each request a QueryStats that the
+engine's cursor events fill in: how many statements ran and how long
+they took. Statements slower than SLOW_QUERY_MS are written to the
+"app.database.slow_query" logger as one JSON object each, with a sampled
+EXPLAIN QUERY PLAN. Routes declare how many statements they should need
+with query_budget(); going over is logged, or raised when
+QUERY_BUDGET_STRICT is set so tests fail loudly.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Optional
+import json
+import logging
+import os
+import random
+
+# Debug mode: report X-DB-Query-Count and X-DB-Time-Ms on every response
+DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Fraction of slow queries logged with their query plan
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+# Test mode: raise QueryBudgetExceeded instead of logging it
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() in ("1", "true", "yes")
+
+# Transaction control is not counted
+IGNORED_PREFIXES = ("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK", "COMMIT")
+EXPLAINABLE_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+logger = logging.getLogger("app.database.slow_query")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its route allows"""
+
+
+class QueryStats:
+    """Statements run and time spent in the database for one request"""
+    __slots__ = ("path", "count", "duration", "budget")
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.count = 0
+        self.duration = 0.0
+        self.budget: Optional[int] = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(path: str = ""):
+    """Count the statements run inside the block"""
+    stats = QueryStats(path)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """Fail if the block runs more than max_queries statements"""
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(f"{stats.count} queries run, budget is {max_queries}")
+
+
+def query_budget(max_queries: int):
+    """Route dependency declaring how many statements the request may run"""
+    def dependency():
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return dependency
+
+
+def _explain(conn, statement, parameters):
+    """Query plan rows for statement, run on the same connection"""
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed, stats):
+    entry = {
+        "event": "slow_query",
+        "duration_ms": round(elapsed * 1000, 3),
+        "statement": " ".join(statement.split()),
+        "path": stats.path if stats is not None else None,
+    }
+    if (not executemany and random.random() < SLOW_QUERY_EXPLAIN_RATE
+            and statement.lstrip().upper().startswith(EXPLAINABLE_PREFIXES)):
+        try:
+            entry["plan"] = _explain(conn, statement, parameters)
+        except Exception as e:
+            entry["plan_error"] = str(e)
+    logger.warning(json.dumps(entry))
+
+
+def instrument_queries(sync_engine):
+    """Count statements per request and log the slow ones"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_accounting_started", []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["query_accounting_started"].pop()
+        stats = _current_stats.get()
+        if stats is not None and not statement.lstrip().upper().startswith(IGNORED_PREFIXES):
+            stats.count += 1
+            stats.duration += elapsed
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            _log_slow_query(conn, statement, parameters, executemany, elapsed, stats)
+
+
+class QueryAccountingMiddleware:
+    """Pure ASGI middleware giving each request its own QueryStats"""
+
+    def __init__(self, app, debug_headers: bool = DEBUG, strict: bool = QUERY_BUDGET_STRICT):
+        self.app = app
+        self.debug_headers = debug_headers
+        self.strict = strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                if stats.over_budget:
+                    detail = f"{scope['method']} {scope['path']} ran {stats.count} queries, budget is {stats.budget}"
+                    if self.strict:
+                        raise QueryBudgetExceeded(detail)
+                    logger.warning(json.dumps({"event": "query_budget_exceeded", "detail": detail}))
+                if self.debug_headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.duration * 1000:.3f}".encode()),
+                    ]
+            await send(message)
+
+        with track_queries(scope["path"]) as stats:
+            await self.app(scope, receive, send_with_stats)
@@ -0,0 +1,104 @@
+"""
+Schema setup at startup, skipped when the database is already current.
+
+create_all() reflects every table and the search index and column checks
+add a few more queries, on every worker boot. Instead the schema's
+fingerprint (a hash of the CREATE statements for the models and the
+search index) is kept in SQLite's PRAGMA user_version; when it matches,
+the database was set up by this same code and nothing needs to run.
+Any model or index change alters the fingerprint, so the next boot does
+the full setup again and stores the new value.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+import logging
+import zlib
+
+from .search import users_search
+
+logger = logging.getLogger("app.database.schema")
+
+# Indexes sync_indexes has created, so it never drops one it didn't
+MANAGED_INDEXES = "schema_indexes"
+
+# Declared by earlier models (index=True on users.id and users.name) and
+# created by create_all before schema_indexes existed; dropped as managed
+RETIRED_INDEXES = ("ix_users_id", "ix_users_name")
+
+
+def schema_version(metadata) -> int:
+    """Fingerprint of the models and the search index, as a positive 31-bit int"""
+    dialect = sqlite.dialect()
+    statements = []
+    for table in metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        statements.extend(
+            str(CreateIndex(index).compile(dialect=dialect))
+            for index in sorted(table.indexes, key=lambda index: index.name or "")
+        )
+    statements.extend(users_search.ddl())
+    statements.append(users_search.rank)
+    # So databases already marked current are synced again and lose them
+    statements.extend(f"DROP INDEX {name}" for name in RETIRED_INDEXES)
+    # 0 is what a fresh database reports
+    return zlib.crc32("\n".join(statements).encode()) & 0x7FFFFFFF or 1
+
+
+def check_schema(connection, metadata):
+    """Fail fast when existing tables lack columns the models expect
+
+    create_all() creates missing tables but never adds columns to old ones.
+    """
+    inspector = inspect(connection)
+    missing = []
+    for table in metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing)
+    if missing:
+        raise RuntimeError(f"Database schema is out of date, missing columns: {', '.join(missing)}")
+
+
+def sync_indexes(connection, metadata):
+    """Make the model tables' indexes match the declared ones
+
+    create_all() skips tables that exist, indexes included, so declared
+    indexes missing from them are created here. Declared indexes are
+    recorded in schema_indexes, and only recorded ones (and
+    RETIRED_INDEXES) are dropped once no longer declared; other
+    undeclared indexes (added by hand, say) are logged and left alone.
+    """
+    connection.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {MANAGED_INDEXES} (name TEXT PRIMARY KEY)")
+    managed = set(connection.exec_driver_sql(f"SELECT name FROM {MANAGED_INDEXES}").scalars())
+    managed.update(RETIRED_INDEXES)
+    inspector = inspect(connection)
+    for table in metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+            if index.name not in managed:
+                connection.exec_driver_sql(f"INSERT INTO {MANAGED_INDEXES} (name) VALUES (?)", (index.name,))
+        declared = {index.name for index in table.indexes}
+        for name in sorted(existing - declared):
+            if name in managed:
+                connection.exec_driver_sql(f'DROP INDEX "{name}"')
+                connection.exec_driver_sql(f"DELETE FROM {MANAGED_INDEXES} WHERE name = ?", (name,))
+            else:
+                logger.warning("Index %s on %s is not declared by the models; leaving it in place", name, table.name)
+
+
+def ensure_schema(connection, metadata) -> bool:
+    """Create tables and the search index unless the stored version matches
+
+    Returns True when the setup ran.
+    """
+    version = schema_version(metadata)
+    if connection.exec_driver_sql("PRAGMA user_version").scalar() == version:
+        return False
+    metadata.create_all(connection)
+    sync_indexes(connection, metadata)
+    users_search.create(connection)
+    check_schema(connection, metadata)
+    connection.exec_driver_sql(f"PRAGMA user_version = {version}")
+    return True
@@ -0,0 +1,17 @@
+"""
+Full-text user search over users_fts (see shared/search.py).
+
+users_fts indexes every user's name and email; triggers on users keep it
+in sync. schema.ensure_schema() creates it at startup and fills it from
+existing rows the first time.
+"""
+import os
+
+from shared.search import SearchIndex, match_expression
+
+__all__ = ["SEARCH_RANK_WINDOW", "match_expression", "users_search"]
+
+# Searches matching more users rank only this many of them, by id
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "2000"))
+
+users_search = SearchIndex("users_fts", "users", rank_window=SEARCH_RANK_WINDOW)
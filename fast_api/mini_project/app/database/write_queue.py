@@ -0,0 +1,146 @@
+from sqlalchemy import text
+from typing import Awaitable, Callable, Optional
+import asyncio
+import os
+
+from .connection import AsyncSessionLocal
+
+# Group-commit configuration
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes")
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "256"))
+WRITE_QUEUE_MAX_DELAY_MS = float(os.getenv("WRITE_QUEUE_MAX_DELAY_MS", "2"))
+
+
+class WriteQueue:
+    """Single writer task that applies queued mutations in one transaction
+    
+    SQLite allows one writer at a time, so instead of every request taking
+    the lock and committing on its own, mutations are collected for a few
+    milliseconds and committed together. Each mutation runs in its own
+    SAVEPOINT, so a failing one only fails its own caller.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 256, max_delay_ms: float = 2):
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay_ms) / 1000
+        self.batches = 0
+        self.writes = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        """Whether submit() accepts operations (False once stop() is called)"""
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Apply everything already queued, then stop the writer
+        
+        submit() refuses operations from the moment stop() is called, and
+        anything still queued once the writer is gone fails instead of
+        waiting forever.
+        """
+        if self._task is None or self._stopping:
+            return
+        self._stopping = True
+        try:
+            if not self._task.done():
+                await self._queue.put(None)
+            await self._task
+        finally:
+            self._task = None
+            self._fail_queued(RuntimeError("Write queue stopped before applying this write"))
+
+    async def submit(self, operation: Callable[..., Awaitable]):
+        """Queue operation(session) and wait for its own result or error"""
+        if not self.running:
+            raise RuntimeError("Write queue is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    def _fail_queued(self, exc: Exception):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if item is not None and not item[1].done():
+                item[1].set_exception(exc)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            if self.max_delay:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._apply(batch)
+
+    async def _apply(self, batch):
+        outcomes = []
+        try:
+            async with self.session_factory() as session:
+                # Take the write lock up front; SAVEPOINTs then nest inside
+                # this transaction instead of committing on release
+                await session.execute(text("BEGIN IMMEDIATE"))
+                for operation, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            result = await operation(session)
+                    except Exception as exc:
+                        outcomes.append((future, exc, True))
+                    else:
+                        outcomes.append((future, result, False))
+                await session.commit()
+        except Exception as exc:
+            # The commit itself failed, so nothing in the batch was written
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for future, value, failed in outcomes:
+            if future.done():
+                continue
+            if failed:
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "batches": self.batches,
+            "writes": self.writes,
+            "average_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+write_queue = WriteQueue(
+    AsyncSessionLocal,
+    max_batch=WRITE_QUEUE_MAX_BATCH,
+    max_delay_ms=WRITE_QUEUE_MAX_DELAY_MS,
+)
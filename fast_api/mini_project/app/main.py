@@ -1,20 +1,47 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
-from .database import async_engine
+from .auth.cache import principal_cache, token_cache
+from .auth.security import load_token_backend, password_pool, PasswordPoolFull
+from .database import async_engine, write_queue, WRITE_QUEUE_ENABLED
+from .database.connection import warm_up_pool
+from .database.loader import user_loader_stats
+from .database.profiling import QueryAccountingMiddleware, instrument_queries
+from .database.schema import ensure_schema
+from .metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, registry
 from .models.user import Base
+from .rate_limit import rate_limiter
+from .response_cache import response_cache
 from .routers import auth_router, users_router, general_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan - setup and cleanup"""
-    # Create database tables
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield
-    # Cleanup if needed
-    await async_engine.dispose()
+    try:
+        # Create database tables, unless this schema version is already in place
+        async with async_engine.begin() as conn:
+            await conn.run_sync(ensure_schema, Base.metadata)
+        # Warm up before the first request rather than during it
+        await warm_up_pool()
+        await password_pool.warm_up()
+        load_token_backend()
+    except Exception:
+        # Pooled aiosqlite connections run non-daemon threads that would keep the process alive
+        await async_engine.dispose()
+        password_pool.shutdown()
+        raise
+    if WRITE_QUEUE_ENABLED:
+        await write_queue.start()
+    try:
+        yield
+    finally:
+        # Also when an error is thrown into the lifespan (tests), for the same reason
+        await write_queue.stop()
+        password_pool.shutdown()
+        await response_cache.close()
+        await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -33,6 +60,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(PasswordPoolFull)
+async def password_pool_full_handler(request: Request, exc: PasswordPoolFull):
+    """Shed password work when the hashing pool is saturated"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+# Per-request query counts and the slow-query log
+app.add_middleware(QueryAccountingMiddleware)
+instrument_queries(async_engine.sync_engine)
+
+# Request timing, exposed at /metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(async_engine.sync_engine)
+
+def _component_metrics():
+    """Counters kept by the caches and pools, in Prometheus text format"""
+    cache = principal_cache.stats()
+    tokens = token_cache.stats()
+    responses = response_cache.stats()
+    queue = write_queue.stats()
+    loader = user_loader_stats()
+    return [
+        "# TYPE token_cache_hits_total counter",
+        f"token_cache_hits_total {tokens['hits']}",
+        "# TYPE token_cache_misses_total counter",
+        f"token_cache_misses_total {tokens['misses']}",
+        "# TYPE principal_cache_hits_total counter",
+        f"principal_cache_hits_total {cache['hits']}",
+        "# TYPE principal_cache_misses_total counter",
+        f"principal_cache_misses_total {cache['misses']}",
+        "# TYPE password_pool_pending gauge",
+        f"password_pool_pending {password_pool.pending}",
+        "# TYPE password_pool_rejected_total counter",
+        f"password_pool_rejected_total {password_pool.rejected}",
+        "# TYPE response_cache_hits_total counter",
+        f"response_cache_hits_total {responses['hits']}",
+        "# TYPE response_cache_misses_total counter",
+        f"response_cache_misses_total {responses['misses']}",
+        "# TYPE response_cache_errors_total counter",
+        f"response_cache_errors_total {responses['errors']}",
+        "# TYPE write_queue_batches_total counter",
+        f"write_queue_batches_total {queue['batches']}",
+        "# TYPE write_queue_writes_total counter",
+        f"write_queue_writes_total {queue['writes']}",
+        "# TYPE user_loader_loads_total counter",
+        f"user_loader_loads_total {loader['loads']}",
+        "# TYPE user_loader_queries_total counter",
+        f"user_loader_queries_total {loader['queries']}",
+        "# TYPE rate_limit_buckets gauge",
+        f"rate_limit_buckets {len(rate_limiter)}",
+        "# TYPE rate_limit_rejected_total counter",
+        f"rate_limit_rejected_total {rate_limiter.rejected}",
+    ]
+
+registry.collectors.append(_component_metrics)
+
 # Include routers
 app.include_router(general_router)
 app.include_router(auth_router)
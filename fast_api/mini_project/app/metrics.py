@@ -0,0 +1,100 @@
+"""
+Request timing and Prometheus text exposition.
+
+MetricsMiddleware times every request and keeps an in-flight gauge.
+TimedRoute labels requests with their route template and marks when the
+endpoint returned, so the time spent turning its result into a response
+is recorded as the "serialization" phase. The "auth" and "db" phases are
+recorded by get_current_user and the engine's cursor events. The metric
+types and phase timers live in shared/metrics.py.
+"""
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+from time import perf_counter
+from typing import Callable, Optional, Tuple
+import functools
+import inspect
+import os
+
+from shared.metrics import PhaseTimings, Registry, RequestMetrics, current_timings, instrument_engine, phase, request_timings
+
+__all__ = [
+    "METRICS_ENABLED", "MetricsMiddleware", "RequestTimings", "TimedRoute",
+    "current_timings", "instrument_engine", "phase", "registry",
+]
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+registry = Registry()
+request_metrics = RequestMetrics(registry)
+
+
+class RequestTimings(PhaseTimings):
+    """Phase timers plus the route label and when the endpoint returned"""
+    __slots__ = ("route", "endpoint_finished")
+
+    def __init__(self):
+        super().__init__()
+        self.route = "unmatched"
+        self.endpoint_finished: Optional[float] = None
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that labels the request with its template and marks when the endpoint returned"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if METRICS_ENABLED and inspect.iscoroutinefunction(endpoint):
+            original = endpoint
+
+            @functools.wraps(original)
+            async def endpoint(*args, **kw):
+                timings = request_timings.get()
+                result = await original(*args, **kw)
+                if timings is not None:
+                    timings.endpoint_finished = perf_counter()
+                return result
+
+        super().__init__(path, endpoint, **kwargs)
+
+    def matches(self, scope):
+        match, child_scope = super().matches(scope)
+        # Label the full template (prefix included) as soon as the route matches
+        timings = request_timings.get()
+        if timings is not None and match == Match.FULL:
+            timings.route = self.path
+        return match, child_scope
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and phase timings"""
+
+    def __init__(self, app, exclude_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timings.endpoint_finished is not None:
+                    timings.add("serialization", perf_counter() - timings.endpoint_finished)
+            await send(message)
+
+        request_metrics.in_flight.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = perf_counter() - started
+            request_metrics.in_flight.dec()
+            request_timings.reset(token)
+            request_metrics.record(scope["method"], timings.route, status_code, elapsed, timings.phases)
@@ -1,6 +1,10 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from datetime import datetime
+import os
+
+# Maximum users accepted by one POST /users/bulk request
+BULK_CREATE_MAX_USERS = int(os.getenv("BULK_CREATE_MAX_USERS", "1000"))
 
 class UserBase(BaseModel):
     name: str
@@ -25,6 +29,24 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserBulkCreate(BaseModel):
+    users: List[UserCreate] = Field(..., min_length=1, max_length=BULK_CREATE_MAX_USERS)
+
+class UserBulkResult(BaseModel):
+    index: int
+    status_code: int
+    user: Optional[UserResponse] = None
+    detail: Optional[str] = None
+
+class UserBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[UserBulkResult]
+
+class UserBatchResponse(BaseModel):
+    users: List[UserResponse]
+    missing: List[int]
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -1,17 +1,23 @@
 from sqlalchemy import Boolean, Column, Integer, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from datetime import datetime
 
 Base = declarative_base()
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True, nullable=False)
+    # Indexes are kept to what queries use: id is the rowid, email has its
+    # unique index (login, lookups, bulk checks), name search goes through
+    # users_fts. The old ix_users_id and ix_users_name are dropped at startup
+    # (schema.RETIRED_INDEXES).
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     age = Column(Integer, nullable=True)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    # Set in Python for microsecond precision: it doubles as the ETag version
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
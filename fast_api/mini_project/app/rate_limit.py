@@ -0,0 +1,58 @@
+"""
+Per-client rate limiting with token buckets.
+
+A client is its verified JWT subject, or its IP address when there is no
+valid token (so forged or garbage tokens do not get buckets of their
+own). Buckets live in the TokenBucketStore from shared/rate_limit.py.
+
+Routes opt in with dependencies=[Depends(rate_limit("users.list", "120/minute"))];
+RATE_LIMIT_OVERRIDES="users.list=30/minute,auth.login=5/minute" changes
+limits by name without touching code.
+"""
+from fastapi import HTTPException, Request, status
+import math
+import os
+
+from shared.rate_limit import RateLimit, TokenBucketStore, parse_limit, parse_overrides
+
+from .auth.security import decode_access_token
+
+__all__ = ["RateLimit", "TokenBucketStore", "client_key", "rate_limit", "rate_limiter"]
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+
+RATE_LIMIT_OVERRIDES = parse_overrides(os.getenv("RATE_LIMIT_OVERRIDES", ""))
+
+rate_limiter = TokenBucketStore(shards=RATE_LIMIT_SHARDS)
+
+_invalid_token = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+
+def client_key(request: Request) -> str:
+    """Verified JWT subject, else the client IP"""
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        try:
+            # Served from the verified-claims cache after the first request
+            return "sub:" + decode_access_token(authorization[7:], _invalid_token)["sub"]
+        except HTTPException:
+            pass
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def rate_limit(name: str, default: str):
+    """Route dependency limiting each client to the named limit"""
+    limit = RATE_LIMIT_OVERRIDES.get(name) or parse_limit(default)
+
+    async def dependency(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+        retry_after = rate_limiter.hit(f"{name}:{client_key(request)}", limit)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    return dependency
@@ -0,0 +1,204 @@
+"""
+Server-side cache of serialized list responses.
+
+Entries are keyed by route and query string and hold the exact bytes
+sent to the client, plus the few headers that go with them. Every key
+embeds a generation number that UserCRUD bumps after each write, so one
+increment invalidates every cached page. A request reads the generation
+before it queries, so a page built while a write lands is filed under
+the old generation and never served.
+
+Backends (RESPONSE_CACHE_BACKEND):
+  none    caching off (default)
+  memory  in-process LRU, one per worker
+  socket  cache server on a Unix socket, shared by every worker:
+          python ../../shared/cache_server.py --socket /tmp/users-cache.sock
+"""
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+import asyncio
+import hashlib
+import json
+import os
+
+from shared.cache_server import CacheUnavailable, LRUStore
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "none")
+RESPONSE_CACHE_SOCKET = os.getenv("RESPONSE_CACHE_SOCKET", "/tmp/users-cache.sock")
+# Upper bound on staleness if an invalidation is lost (e.g. the server was unreachable)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TIMEOUT = float(os.getenv("RESPONSE_CACHE_TIMEOUT", "0.05"))
+
+
+class MemoryBackend:
+    """Per-process backend; invalidation only reaches this worker"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.store = LRUStore(max_entries)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.store.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        self.store.set(key, value, ttl_seconds)
+
+    async def generation(self, namespace: str) -> int:
+        return self.store.generation(namespace)
+
+    async def bump(self, namespace: str) -> int:
+        return self.store.bump(namespace)
+
+    async def close(self):
+        pass
+
+
+class SocketBackend:
+    """Client for shared/cache_server.py, over one connection per process"""
+
+    def __init__(self, path: str, timeout: float = 0.05):
+        self.path = path
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _exchange(self, request: bytes):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._writer.write(request)
+        await self._writer.drain()
+        line = await self._reader.readline()
+        kind, value = line[:1], line[1:].strip()
+        if kind == b"$":
+            length = int(value)
+            return None if length < 0 else await self._reader.readexactly(length)
+        if kind == b":":
+            return int(value)
+        if kind == b"+":
+            return None
+        raise ValueError(f"Unexpected cache server reply: {line!r}")
+
+    async def _call(self, request: bytes):
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._exchange(request), self.timeout)
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                # The stream may be mid-reply; start over on the next call
+                await self._disconnect()
+                raise CacheUnavailable(str(e)) from e
+
+    async def _disconnect(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._call(b"GET %s\n" % key.encode())
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await self._call(b"SET %s %f %d\n" % (key.encode(), ttl_seconds, len(value)) + value)
+
+    async def generation(self, namespace: str) -> int:
+        return await self._call(b"GEN %s\n" % namespace.encode())
+
+    async def bump(self, namespace: str) -> int:
+        return await self._call(b"BUMP %s\n" % namespace.encode())
+
+    async def close(self):
+        async with self._lock:
+            await self._disconnect()
+
+
+class ResponseCache:
+    """Serialized responses filed under the current write generation"""
+
+    def __init__(self, backend=None, ttl_seconds: float = 30, namespace: str = "users"):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl_seconds > 0
+
+    async def lookup(self, request_key: str) -> Tuple[Optional[str], Optional[Tuple[bytes, Dict[str, str]]]]:
+        """Return (cache key, (body, headers) or None)
+
+        A None cache key means the response must not be stored.
+        """
+        if not self.enabled:
+            return None, None
+        try:
+            generation = await self.backend.generation(self.namespace)
+            digest = hashlib.sha1(request_key.encode()).hexdigest()
+            key = f"{self.namespace}:{generation}:{digest}"
+            value = await self.backend.get(key)
+        except CacheUnavailable:
+            self.errors += 1
+            return None, None
+        if value is None:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        headers, body = value.split(b"\n", 1)
+        return key, (body, json.loads(headers))
+
+    async def store(self, key: Optional[str], body: bytes, headers: Optional[Dict[str, str]] = None):
+        if key is None:
+            return
+        value = json.dumps(headers or {}).encode() + b"\n" + body
+        try:
+            await self.backend.set(key, value, self.ttl_seconds)
+        except CacheUnavailable:
+            self.errors += 1
+
+    async def invalidate(self):
+        """Retire every cached page after a write"""
+        if not self.enabled:
+            return
+        try:
+            await self.backend.bump(self.namespace)
+        except CacheUnavailable:
+            # Pages already cached elsewhere stay valid until their TTL
+            self.errors += 1
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": RESPONSE_CACHE_BACKEND if self.enabled else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def request_cache_key(request) -> str:
+    """Route plus query parameters in a stable order"""
+    return request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+
+
+def _build_backend(kind: str):
+    if kind == "memory":
+        return MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES)
+    if kind == "socket":
+        return SocketBackend(RESPONSE_CACHE_SOCKET, RESPONSE_CACHE_TIMEOUT)
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown response cache backend: {kind}")
+
+
+response_cache = ResponseCache(
+    backend=_build_backend(RESPONSE_CACHE_BACKEND),
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    namespace="fastapi-users",
+)
+
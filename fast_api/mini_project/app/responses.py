@@ -0,0 +1,54 @@
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from typing import Any, Iterable, List
+import json
+import os
+
+from .models.schemas import UserResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Opt in to serializing user lists straight from ORM rows
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+# Same fields and order as UserResponse
+USER_RESPONSE_FIELDS = ("name", "email", "age", "id", "is_active", "created_at", "updated_at")
+
+
+def _default(value: Any):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON with orjson when installed, otherwise the stdlib"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def user_rows(users: Iterable) -> List[dict]:
+    """Plain dicts for trusted ORM users, skipping Pydantic validation"""
+    return [{field: getattr(user, field) for field in USER_RESPONSE_FIELDS} for user in users]
+
+
+_user_list_adapter = TypeAdapter(List[UserResponse])
+
+
+def user_list_json(users: Iterable) -> bytes:
+    """Encode a user list exactly as the response body will be sent"""
+    if FAST_JSON_RESPONSES:
+        return dumps(user_rows(users))
+    return _user_list_adapter.dump_json(_user_list_adapter.validate_python(list(users), from_attributes=True))
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered by orjson (or the stdlib when it is missing)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
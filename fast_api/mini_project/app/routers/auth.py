@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
@@ -6,12 +6,23 @@ from typing import List
 
 from ..database import get_db
 from ..database.crud import UserCRUD
+from ..database.profiling import query_budget
 from ..models.schemas import UserCreate, UserResponse, UserUpdate, Token, UserLogin
-from ..auth import create_access_token, get_current_active_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..auth import (
+    create_access_token,
+    decode_access_token,
+    revoke_access_token,
+    get_current_active_user,
+    oauth2_scheme,
+    ACCESS_TOKEN_EXPIRE_MINUTES
+)
+from ..metrics import TimedRoute
+from ..rate_limit import rate_limit
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=TimedRoute)
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("auth.register", "10/minute")), Depends(query_budget(2))])
 async def register_user(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
@@ -26,7 +37,8 @@ async def register_user(
             detail=str(e)
         )
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token,
+             dependencies=[Depends(rate_limit("auth.login", "10/minute")), Depends(query_budget(1))])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
@@ -47,7 +59,18 @@ async def login(
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/me", response_model=UserResponse)
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(query_budget(1))])
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    current_user = Depends(get_current_active_user)
+):
+    """Revoke the current access token"""
+    # Already verified by get_current_active_user, so this is a cache hit
+    payload = decode_access_token(token, HTTPException(status_code=status.HTTP_401_UNAUTHORIZED))
+    revoke_access_token(payload)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(query_budget(1))])
 async def get_current_user_info(
     current_user = Depends(get_current_active_user)
 ):
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
 from datetime import datetime
-from ..auth import get_current_active_user
+from ..auth import get_current_active_user, principal_cache
+from ..metrics import TimedRoute, registry
 
-router = APIRouter(tags=["General"])
+router = APIRouter(tags=["General"], route_class=TimedRoute)
 
 @router.get("/")
 async def root():
@@ -60,5 +62,11 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow(),
-        "service": "FastAPI Mini Project"
-    }
\ No newline at end of file
+        "service": "FastAPI Mini Project",
+        "principal_cache": principal_cache.stats()
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
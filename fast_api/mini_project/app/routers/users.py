@@ -1,48 +1,254 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
+import csv
+import io
+import json
+import os
 
 from ..database import get_db
-from ..database.crud import UserCRUD
-from ..models.schemas import UserResponse, UserUpdate
+from ..database.connection import AsyncSessionLocal
+from ..database.crud import UserCRUD, EXPORT_COLUMNS
+from ..database.pagination import encode_cursor, decode_cursor
+from ..database.profiling import query_budget
+from ..models.schemas import UserResponse, UserUpdate, UserBulkCreate, UserBulkResponse, UserBatchResponse
+from ..responses import FAST_JSON_RESPONSES, FastJSONResponse, user_list_json, user_rows
+from ..response_cache import request_cache_key, response_cache
 from ..auth import get_current_active_user
+from ..conditional import etag_matches, is_not_modified, user_etag, user_version, validator_headers
+from ..metrics import TimedRoute
+from ..rate_limit import rate_limit
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=TimedRoute)
 
-@router.get("/", response_model=List[UserResponse])
+@router.get("/", response_model=List[UserResponse],
+            dependencies=[Depends(rate_limit("users.list", "120/minute")), Depends(query_budget(2))])
 async def get_users(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of users to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of users to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; send it empty to start keyset paging"),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Get list of users (requires authentication)"""
-    users = await UserCRUD.get_users(db, skip=skip, limit=limit)
+    """Get list of users (requires authentication)
+    
+    The X-Next-Cursor response header points at the next page. Passing it
+    back as `cursor` seeks by id instead of skipping rows, so deep pages
+    cost the same as the first one.
+    """
+    # Pages are cached as sent, after authentication
+    cache_key, cached = await response_cache.lookup(request_cache_key(request))
+    if cached is not None:
+        body, headers = cached
+        return Response(body, media_type="application/json", headers=headers)
+    
+    if cursor is not None:
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        users, has_next = await UserCRUD.get_users_after(db, after_id=after_id, limit=limit)
+    else:
+        users = await UserCRUD.get_users(db, skip=skip, limit=limit)
+        has_next = len(users) == limit
+    
+    headers = {}
+    if has_next and users:
+        headers["X-Next-Cursor"] = encode_cursor(users[-1].id)
+    
+    if cache_key is not None:
+        body = user_list_json(users)
+        await response_cache.store(cache_key, body, headers)
+        return Response(body, media_type="application/json", headers=headers)
+    
+    if FAST_JSON_RESPONSES:
+        # Rows come straight from the database, so skip per-row validation
+        return FastJSONResponse(user_rows(users), headers=headers)
+    response.headers.update(headers)
     return users
 
-@router.get("/{user_id}", response_model=UserResponse)
+@router.post("/bulk", response_model=UserBulkResponse,
+             dependencies=[Depends(rate_limit("users.bulk", "10/minute")), Depends(query_budget(4))])
+async def create_users_bulk(
+    payload: UserBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Create many users at once with a result per item"""
+    try:
+        outcomes = await UserCRUD.create_users_bulk(db, payload.users)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    results = []
+    for index, (user, error) in enumerate(outcomes):
+        if user is not None:
+            results.append({"index": index, "status_code": status.HTTP_201_CREATED, "user": user})
+        else:
+            results.append({"index": index, "status_code": status.HTTP_400_BAD_REQUEST, "detail": error})
+    created = sum(1 for user, _ in outcomes if user is not None)
+    return {"created": created, "failed": len(outcomes) - created, "results": results}
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _export_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(
+        json.dumps({field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)}) + "\n"
+        for row in rows
+    )
+
+def _csv_chunk(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+async def _export_users(export_format: str):
+    # The generator outlives the request dependencies, so it owns its session
+    async with AsyncSessionLocal() as db:
+        if export_format == "csv":
+            yield _csv_chunk([], header=True)
+        async for rows in UserCRUD.stream_users(db, chunk_size=EXPORT_CHUNK_SIZE):
+            yield _csv_chunk(rows) if export_format == "csv" else _ndjson_chunk(rows)
+
+@router.get("/export",
+            dependencies=[Depends(rate_limit("users.export", "5/minute")), Depends(query_budget(1))])
+async def export_users(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    current_user = Depends(get_current_active_user)
+):
+    """Stream every user as NDJSON or CSV with flat memory use"""
+    return StreamingResponse(
+        _export_users(export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'}
+    )
+
+@router.get("/search", response_model=List[UserResponse],
+            dependencies=[Depends(rate_limit("users.search", "120/minute")), Depends(query_budget(2))])
+async def search_users(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words, or starts of words, from the name or email"),
+    skip: int = Query(0, ge=0, description="Number of matches to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Number of matches to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Search users by name or email, best matches first (requires authentication)
+
+    Every word of q must start a word of the user's name or email. The
+    X-Next-Skip response header is the skip value of the next page.
+    """
+    users, has_next = await UserCRUD.search_users(db, q, skip=skip, limit=limit)
+    headers = {"X-Next-Skip": str(skip + limit)} if has_next else {}
+    if FAST_JSON_RESPONSES:
+        return FastJSONResponse(user_rows(users), headers=headers)
+    response.headers.update(headers)
+    return users
+
+# Most ids one GET /users/batch request may ask for
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", "100"))
+
+def parse_user_ids(value: str) -> List[int]:
+    """Ids from "1,2,3", duplicates dropped, in order"""
+    try:
+        user_ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated integers"
+        )
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids or len(user_ids) > BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids must list 1 to {BATCH_GET_MAX_IDS} users"
+        )
+    return user_ids
+
+@router.get("/batch", response_model=UserBatchResponse,
+            dependencies=[Depends(rate_limit("users.batch", "120/minute")), Depends(query_budget(2))])
+async def get_users_batch(
+    ids: str = Query(..., description="Comma-separated user ids, e.g. 1,2,3"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get several users by ID with one query (requires authentication)
+    
+    Users come back in the order asked for; ids with no user are listed
+    in `missing`.
+    """
+    user_ids = parse_user_ids(ids)
+    users = await UserCRUD.get_users_by_ids(db, user_ids)
+    found = {user.id for user in users}
+    return {"users": users, "missing": [user_id for user_id in user_ids if user_id not in found]}
+
+@router.get("/{user_id}", response_model=UserResponse,
+            dependencies=[Depends(rate_limit("users.read", "300/minute")), Depends(query_budget(3))])
 async def get_user(
     user_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Get a specific user by ID"""
+    """Get a specific user by ID
+    
+    Responses carry ETag and Last-Modified. A matching If-None-Match or
+    If-Modified-Since gets 304 after a primary-key timestamp lookup,
+    without loading or serializing the user.
+    """
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        row = await UserCRUD.get_user_version(db, user_id)
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        version = user_version(row.updated_at, row.created_at)
+        if is_not_modified(request.headers, user_etag(user_id, version), version):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(user_id, version))
+    
     user = await UserCRUD.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    response.headers.update(validator_headers(user.id, user_version(user.updated_at, user.created_at)))
     return user
 
-@router.put("/{user_id}", response_model=UserResponse)
+@router.put("/{user_id}", response_model=UserResponse,
+            dependencies=[Depends(rate_limit("users.write", "60/minute")), Depends(query_budget(3))])
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Update user information (users can only update their own profile)"""
+    """Update user information (users can only update their own profile)
+    
+    With If-Match the update only applies if the user still has that
+    ETag; otherwise 412 Precondition Failed.
+    """
     # Users can only update their own profile
     if current_user.id != user_id:
         raise HTTPException(
@@ -50,15 +256,39 @@ async def update_user(
             detail="You can only update your own profile"
         )
     
-    updated_user = await UserCRUD.update_user(db, user_id, user_data)
+    expected_version = None
+    if_match = request.headers.get("if-match")
+    if if_match is not None:
+        expected_version = await UserCRUD.get_user_version(db, user_id)
+        if expected_version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        version = user_version(expected_version.updated_at, expected_version.created_at)
+        if not etag_matches(if_match, user_etag(user_id, version)):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="User has been modified"
+            )
+    
+    updated_user = await UserCRUD.update_user(db, user_id, user_data, expected_version=expected_version)
     if not updated_user:
+        if expected_version is not None:
+            # Changed between the check and the update
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="User has been modified"
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    response.headers.update(validator_headers(updated_user.id, user_version(updated_user.updated_at, updated_user.created_at)))
     return updated_user
 
-@router.delete("/{user_id}")
+@router.delete("/{user_id}",
+               dependencies=[Depends(rate_limit("users.write", "60/minute")), Depends(query_budget(2))])
 async def delete_user(
     user_id: int,
     db: AsyncSession = Depends(get_db),
@@ -0,0 +1,264 @@
+"""
+Production launcher: pre-forked uvicorn workers sharing one port
+
+    python serve.py --workers 4 --port 8000
+
+Each worker binds its own SO_REUSEPORT socket, so the kernel spreads
+connections across workers without a shared accept lock. A worker runs
+the app lifespan first (tables, search index, schema check, connection
+pool and bcrypt warm-up) and only then opens its socket, so it gets no
+traffic until it is ready.
+
+The supervisor restarts workers that exit and handles:
+  SIGHUP           graceful reload: start new workers, wait until they
+                   are ready, then stop the old ones
+  SIGTERM, SIGINT  graceful shutdown: workers finish in-flight requests
+                   for up to GRACEFUL_TIMEOUT seconds
+
+Workers are forked before the app is imported, so a reload picks up new
+code, and every setting reaches them through the environment:
+WEB_CONCURRENCY, HOST, PORT and GRACEFUL_TIMEOUT here (the options below
+override them), and every app setting. With RESPONSE_CACHE_BACKEND=socket
+the supervisor also runs the shared response cache server.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(PROJECT_DIR))
+sys.path.insert(0, PROJECT_DIR)
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# How long a new worker may take to warm up before it counts as failed
+WORKER_READY_TIMEOUT = float(os.getenv("WORKER_READY_TIMEOUT", "60"))
+# Workers that die sooner than this after starting are restarted with a delay
+MIN_WORKER_UPTIME = 5.0
+
+logger = logging.getLogger("serve")
+
+
+def reuseport_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def run_worker(host: str, port: int, ready_fd: int):
+    """Worker process: warm up, open the socket, report ready, serve until SIGTERM"""
+    import uvicorn
+    from app.main import app
+
+    # The lifespan runs here, around the server, so warm-up finishes before the socket exists
+    config = uvicorn.Config(app, lifespan="off", timeout_graceful_shutdown=GRACEFUL_TIMEOUT)
+    server = uvicorn.Server(config)
+
+    async def serve():
+        async with app.router.lifespan_context(app):
+            sock = reuseport_socket(host, port)
+            try:
+                os.write(ready_fd, b"1")
+            except BrokenPipeError:
+                pass  # a restarted worker; the supervisor is not waiting on it
+            os.close(ready_fd)
+            await server.serve(sockets=[sock])
+
+    asyncio.run(serve())
+
+
+class Supervisor:
+    """Keeps `workers` workers of the current generation running"""
+
+    def __init__(self, workers: int, host: str, port: int):
+        self.size = workers
+        self.host = host
+        self.port = port
+        self.generation = 0
+        # pid -> (generation, started_at)
+        self.workers = {}
+        self.cache_server = None
+        self.pending_signals = []
+        self.restart_at = []
+
+    # Processes
+
+    def spawn_worker(self) -> tuple:
+        """Fork a worker; returns (pid, fd that becomes readable when it is ready)"""
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.host, self.port, ready_write)
+            except BaseException:
+                logger.exception("Worker %d failed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(ready_write)
+        self.workers[pid] = (self.generation, time.monotonic())
+        return pid, ready_read
+
+    def spawn_generation(self) -> bool:
+        """Start a full set of workers and wait until each is ready
+
+        The first worker starts alone, so creating tables and the search
+        index never races between workers.
+        """
+        self.generation += 1
+        if not self._wait_ready([self.spawn_worker()]):
+            return False
+        if self.size > 1 and not self._wait_ready([self.spawn_worker() for _ in range(self.size - 1)]):
+            return False
+        logger.info("Generation %d ready: %d workers on %s:%d", self.generation, self.size, self.host, self.port)
+        return True
+
+    @staticmethod
+    def _wait_ready(started) -> bool:
+        # ready fd -> pid
+        pending = {ready_fd: pid for pid, ready_fd in started}
+        deadline = time.monotonic() + WORKER_READY_TIMEOUT
+        try:
+            while pending and time.monotonic() < deadline:
+                readable, _, _ = select.select(list(pending), [], [], max(0.0, deadline - time.monotonic()))
+                for fd in readable:
+                    pid = pending.pop(fd)
+                    ready = os.read(fd, 1) == b"1"
+                    os.close(fd)
+                    if not ready:
+                        # Closed without a byte: the worker died while warming up
+                        logger.error("Worker %d exited during startup", pid)
+                        return False
+        finally:
+            for fd in pending:
+                os.close(fd)
+        if pending:
+            logger.error("%d workers were not ready after %.0fs", len(pending), WORKER_READY_TIMEOUT)
+            return False
+        return True
+
+    def stop_workers(self, generations=None):
+        for pid, (generation, _) in list(self.workers.items()):
+            if generations is None or generation in generations:
+                self._signal(pid, signal.SIGTERM)
+
+    def start_cache_server(self):
+        """Run shared/cache_server.py, which does not import the app"""
+        path = os.getenv("RESPONSE_CACHE_SOCKET", "/tmp/users-cache.sock")
+        self.cache_server = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, "shared", "cache_server.py"), "--socket", path]
+        )
+
+    @staticmethod
+    def _signal(pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    # Main loop
+
+    def _on_signal(self, signum, frame):
+        self.pending_signals.append(signum)
+
+    def run(self) -> int:
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+        if os.getenv("RESPONSE_CACHE_BACKEND") == "socket":
+            self.start_cache_server()
+        if not self.spawn_generation():
+            self.shutdown()
+            return 1
+
+        while True:
+            while self.pending_signals:
+                signum = self.pending_signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.shutdown()
+                    return 0
+                if signum == signal.SIGHUP:
+                    self.reload()
+            self.reap()
+            now = time.monotonic()
+            for due in [due for due in self.restart_at if due <= now]:
+                self.restart_at.remove(due)
+                os.close(self.spawn_worker()[1])
+            time.sleep(0.5)
+
+    def reload(self):
+        old = self.generation
+        logger.info("Reloading: starting generation %d", old + 1)
+        if self.spawn_generation():
+            self.stop_workers(generations=range(old + 1))
+        else:
+            logger.error("Reload failed; keeping generation %d", old)
+            self.stop_workers(generations=[self.generation])
+            self.generation = old
+
+    def reap(self):
+        """Collect exited children and schedule replacements for crashed workers"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.cache_server is not None and pid == self.cache_server.pid:
+                logger.warning("Response cache server exited, restarting it")
+                self.start_cache_server()
+                continue
+            generation, started_at = self.workers.pop(pid, (None, 0.0))
+            if generation != self.generation:
+                continue  # retired by a reload
+            code = os.waitstatus_to_exitcode(status)
+            uptime = time.monotonic() - started_at
+            logger.warning("Worker %d exited with %d after %.1fs, restarting", pid, code, uptime)
+            delay = 1.0 if uptime < MIN_WORKER_UPTIME else 0.0
+            self.restart_at.append(time.monotonic() + delay)
+
+    def shutdown(self):
+        """Stop every worker gracefully, then force the stragglers"""
+        logger.info("Shutting down %d workers", len(self.workers))
+        self.generation = -1  # nothing gets restarted from here on
+        self.stop_workers()
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.workers:
+            self._signal(pid, signal.SIGKILL)
+        if self.cache_server is not None:
+            self.cache_server.terminate()
+            self.cache_server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API in pre-forked uvicorn workers")
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [serve] %(message)s")
+    sys.exit(Supervisor(max(1, args.workers), args.host, args.port).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import os
+import sys
+
 from flask import Flask, jsonify, request
 
+# The repository root, for the shared package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.user_store import UserStore  # noqa: E402
+
 app = Flask(__name__)
 
 @app.route("/")
@@ -7,13 +14,25 @@ def home():
     return "Flask REST API is running 🚀"
 
 
-# In-memory "database"
-users = {}
+# In-memory "database": thread-safe, ids are never reused after a delete.
+# USER_STORE_SNAPSHOT=users.json saves it there every
+# USER_STORE_SNAPSHOT_INTERVAL seconds and at exit, and loads it on start.
+users = UserStore(
+    ("name", "email", "age"),
+    snapshot_path=os.getenv("USER_STORE_SNAPSHOT") or None,
+    snapshot_interval=float(os.getenv("USER_STORE_SNAPSHOT_INTERVAL", "30")),
+)
+users.start_snapshots()
+
+
+def get_user_data():
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
 
 # GET all users
 @app.route("/users", methods=["GET"])
 def get_users():
-    return jsonify(users)
+    return jsonify({user.id: user.as_dict() for user in users.all()})
 
 # GET one user
 @app.route("/users/<int:user_id>", methods=["GET"])
@@ -21,32 +40,35 @@ def get_user(user_id):
     user = users.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
-    return jsonify(user)
+    return jsonify(user.as_dict())
 
 # POST create user
 @app.route("/users", methods=["POST"])
 def create_user():
-    data = request.get_json()
-    user_id = len(users) + 1
-    users[user_id] = data
-    return jsonify({"id": user_id, "user": data}), 201
+    data = get_user_data()
+    if data is None:
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    user = users.create(data)
+    return jsonify({"id": user.id, "user": user.as_dict()}), 201
 
 # PUT update user
 @app.route("/users/<int:user_id>", methods=["PUT"])
 def update_user(user_id):
-    if user_id not in users:
+    data = get_user_data()
+    if data is None:
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    user = users.replace(user_id, data)
+    if user is None:
         return jsonify({"error": "User not found"}), 404
-    data = request.get_json()
-    users[user_id] = data
-    return jsonify({"message": "User updated", "user": data})
+    return jsonify({"message": "User updated", "user": user.as_dict()})
 
 # DELETE user
 @app.route("/users/<int:user_id>", methods=["DELETE"])
 def delete_user(user_id):
-    if user_id not in users:
+    deleted = users.delete(user_id)
+    if deleted is None:
         return jsonify({"error": "User not found"}), 404
-    deleted = users.pop(user_id)
-    return jsonify({"message": "User deleted", "user": deleted})
+    return jsonify({"message": "User deleted", "user": deleted.as_dict()})
 
 if __name__ == "__main__":
     app.run(debug=True)
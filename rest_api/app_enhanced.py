@@ -1,33 +1,114 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt, get_jwt_identity
+from sqlalchemy import delete, event, func, insert, inspect, literal, select
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import base64
+import click
+import csv
+import hashlib
+import hmac
+import io
+import json
+import math
+import os
 import re
+import sys
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# The repository root, for the shared package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from archive import CompactionJob, archive_table, compact, restore
+from metrics import init_metrics, phase, registry
+from response_cache import ResponseCache, build_backend, request_cache_key
+from shared.auth_cache import InvalidationLog, PrincipalCache, TokenCache
+from shared.rate_limit import TokenBucketStore, parse_limit, parse_overrides
+from shared.search import SearchIndex, match_expression
 
 app = Flask(__name__)
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///users.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = 'jwt-secret-string-change-in-production'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+# Keep a running active-user total instead of counting rows on every listing
+# (off by default: every user write also updates the one counter row)
+app.config['ACTIVE_USER_COUNTER'] = os.getenv('ACTIVE_USER_COUNTER', '0') == '1'
+app.config['BULK_CREATE_MAX_USERS'] = int(os.getenv('BULK_CREATE_MAX_USERS', '1000'))
+# Most ids one GET /users/batch request may ask for
+app.config['BATCH_GET_MAX_IDS'] = int(os.getenv('BATCH_GET_MAX_IDS', '100'))
+# Serialize user lists straight to bytes (orjson when installed)
+app.config['FAST_JSON_RESPONSES'] = os.getenv('FAST_JSON_RESPONSES', '0') == '1'
+# API keys are stored as HMAC-SHA256 digests under this secret
+app.config['API_KEY_DIGEST_SECRET'] = os.getenv('API_KEY_DIGEST_SECRET', app.config['SECRET_KEY'])
+# Resolved API-key callers are reused for this long (0 disables the cache)
+app.config['API_KEY_CACHE_TTL'] = float(os.getenv('API_KEY_CACHE_TTL', '60'))
+app.config['API_KEY_CACHE_MAX_SIZE'] = int(os.getenv('API_KEY_CACHE_MAX_SIZE', '1024'))
+# Verified bearer tokens remembered until their exp (0 disables; revocation still applies)
+app.config['JWT_CLAIMS_CACHE_MAX_SIZE'] = int(os.getenv('JWT_CLAIMS_CACHE_MAX_SIZE', '4096'))
+# File through which every worker process on the host sees logouts and key changes
+app.config['AUTH_EVENTS_PATH'] = os.getenv('AUTH_EVENTS_PATH', os.path.join(app.instance_path, 'auth-events.log'))
+# Cache serialized GET /users pages: none, memory (per worker) or socket (shared)
+app.config['RESPONSE_CACHE_BACKEND'] = os.getenv('RESPONSE_CACHE_BACKEND', 'none')
+app.config['RESPONSE_CACHE_SOCKET'] = os.getenv('RESPONSE_CACHE_SOCKET', '/tmp/users-cache.sock')
+app.config['RESPONSE_CACHE_TTL_SECONDS'] = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '30'))
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+# Per-client token buckets on the routes marked with @rate_limit (429 when empty)
+app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', '0') == '1'
+app.config['RATE_LIMIT_OVERRIDES'] = parse_overrides(os.getenv('RATE_LIMIT_OVERRIDES', ''))
+app.config['RATE_LIMIT_SHARDS'] = int(os.getenv('RATE_LIMIT_SHARDS', '16'))
+# Broad searches rank only this many matches (by id) to bound their cost; the rest follow by id
+app.config['SEARCH_RANK_WINDOW'] = int(os.getenv('SEARCH_RANK_WINDOW', '2000'))
+# Soft-deleted users are moved to users_archive after this many days
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', '30'))
+app.config['ARCHIVE_BATCH_SIZE'] = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+# Run that archival every N seconds in the background (0: only through `flask compact-users`)
+app.config['ARCHIVE_INTERVAL_SECONDS'] = float(os.getenv('ARCHIVE_INTERVAL_SECONDS', '0'))
+# Per-route latency histograms and phase timers at /metrics
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1') == '1'
 
 # Initialize extensions
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
+if app.config['METRICS_ENABLED']:
+    init_metrics(app, db)
+response_cache = ResponseCache(
+    build_backend(
+        app.config['RESPONSE_CACHE_BACKEND'],
+        app.config['RESPONSE_CACHE_SOCKET'],
+        app.config['RESPONSE_CACHE_MAX_ENTRIES']
+    ),
+    ttl_seconds=app.config['RESPONSE_CACHE_TTL_SECONDS'],
+    namespace='flask-users'
+)
 
 # ========================
 # MODELS
 # ========================
 
 class User(db.Model):
+    __table_args__ = (
+        # Active users in id order: listings (offset and cursor), export and
+        # the active count. email and api_key lookups use their unique indexes.
+        db.Index('ix_user_active_id', 'is_active', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=True)  # For JWT auth
-    api_key = db.Column(db.String(64), unique=True, nullable=True)  # For API key auth
+    # For API key auth: HMAC digest of the key (the key itself is never stored)
+    api_key_digest = db.Column('api_key', db.String(64), unique=True, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
@@ -42,12 +123,60 @@ class User(db.Model):
             'is_active': self.is_active
         }
 
+    def to_row(self):
+        """Like to_dict() but leaves datetimes for the JSON encoder"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'is_active': self.is_active
+        }
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+# Full-text index over user names and emails, created by db.create_all()
+# and by init_search_index() on databases whose user table came first
+user_search = SearchIndex('user_fts', User.__tablename__, rank_window=app.config['SEARCH_RANK_WINDOW'])
+user_search.install(db.metadata)
+
+def init_search_index():
+    """Create the search index and fill it from existing users when it is missing
+
+    Runs at import, so search also works under flask run or a WSGI
+    server on a database made before the index existed. A database
+    without the user table gets the index from db.create_all().
+    """
+    with app.app_context():
+        if inspect(db.engine).has_table(User.__tablename__):
+            with db.engine.begin() as connection:
+                user_search.create(connection)
+
+init_search_index()
+
+class UserStats(db.Model):
+    """Maintained user aggregates (a single row with id 1)"""
+    id = db.Column(db.Integer, primary_key=True)
+    active_users = db.Column(db.Integer, nullable=False, default=0)
+
+# Soft-deleted users moved out of the user table (see ARCHIVAL below)
+user_archive = archive_table(db.metadata, User.__table__, 'users_archive')
+
+@event.listens_for(db.metadata, 'after_create')
+def create_missing_indexes(target, connection, **kw):
+    """Add declared indexes to tables that already existed
+
+    create_all() skips existing tables along with their indexes.
+    """
+    for table in target.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
 # ========================
 # ERROR HANDLERS
 # ========================
@@ -119,6 +248,39 @@ def validate_user_data(data, required_fields=None):
     
     return errors
 
+def encode_cursor(last_id):
+    """Build an opaque pagination cursor pointing after the given user id"""
+    raw = f"id:{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return the user id a cursor points after (empty cursor means start)"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith('id:'):
+            raise ValueError
+        last_id = int(raw[3:])
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if last_id < 0:
+        raise ValueError("Invalid cursor")
+    return last_id
+
+def parse_user_ids(value):
+    """Ids from "1,2,3", duplicates dropped, in order"""
+    try:
+        user_ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError("ids must be comma-separated integers")
+    user_ids = list(dict.fromkeys(user_ids))
+    max_ids = app.config['BATCH_GET_MAX_IDS']
+    if not user_ids or len(user_ids) > max_ids:
+        raise ValueError(f"ids must list 1 to {max_ids} users")
+    return user_ids
+
 def create_error_response(message, status_code=400, errors=None):
     """Create standardized error response"""
     response = {
@@ -142,7 +304,116 @@ def create_success_response(data=None, message=None, status_code=200, meta=None)
         response['data'] = data
     if meta:
         response['meta'] = meta
-    return jsonify(response), status_code
+    with phase('serialization'):
+        return jsonify(response), status_code
+
+def init_active_user_counter():
+    """Create the counter's table when it is on, and forget a total kept earlier when it is off
+
+    Runs at import, so the app also works under flask run or a WSGI
+    server on a database created before the table existed.
+    """
+    with app.app_context():
+        if app.config['ACTIVE_USER_COUNTER']:
+            UserStats.__table__.create(db.engine, checkfirst=True)
+        elif inspect(db.engine).has_table(UserStats.__tablename__):
+            # Writes don't keep the total while the counter is off; it is recounted when turned back on
+            db.session.execute(delete(UserStats))
+            db.session.commit()
+
+init_active_user_counter()
+
+def get_active_user_count():
+    """Return the active user total, counting rows only the first time"""
+    stats = db.session.get(UserStats, 1)
+    if stats is None:
+        # Counted and stored in one statement, so a user registered meanwhile
+        # is either in the count or adjusts the stored row afterwards
+        db.session.execute(
+            insert(UserStats)
+            .prefix_with('OR IGNORE')
+            .from_select(
+                ['id', 'active_users'],
+                select(literal(1), func.count()).select_from(User).where(User.is_active.is_(True))
+            )
+        )
+        db.session.commit()
+        stats = db.session.get(UserStats, 1)
+    return stats.active_users
+
+def adjust_active_user_count(delta):
+    """Update the maintained total in the caller's transaction"""
+    if not app.config['ACTIVE_USER_COUNTER']:
+        return
+    # No-op until the row exists; it is initialised from a full count
+    UserStats.query.filter_by(id=1).update(
+        {UserStats.active_users: UserStats.active_users + delta},
+        synchronize_session=False
+    )
+
+_password_executor = None
+
+def hash_passwords(passwords):
+    """Hash many passwords in parallel (hashlib releases the GIL while hashing)"""
+    global _password_executor
+    if len(passwords) < 2:
+        return [generate_password_hash(password) for password in passwords]
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            thread_name_prefix='password-hash'
+        )
+    return list(_password_executor.map(generate_password_hash, passwords))
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def json_bytes(obj):
+    """Encode JSON with sorted keys like jsonify, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, default=_json_default, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+def create_users_response(users, meta):
+    """Success response for a list of users
+    
+    With FAST_JSON_RESPONSES the rows are encoded in one pass, without a
+    per-row isoformat() or going through jsonify.
+    """
+    if not app.config['FAST_JSON_RESPONSES']:
+        with phase('serialization'):
+            data = [user.to_dict() for user in users]
+        # Times its own jsonify
+        return create_success_response(data=data, meta=meta)
+    
+    with phase('serialization'):
+        body = {
+            'error': False,
+            'status_code': 200,
+            'data': [user.to_row() for user in users],
+            'meta': meta
+        }
+        return app.response_class(json_bytes(body) + b'\n', mimetype='application/json'), 200
+
+def user_etag(user_id, updated_at):
+    """Strong validator for one version of a user (set_etag adds the quotes)"""
+    return f"{user_id}-{updated_at.strftime('%Y%m%d%H%M%S%f')}"
+
+def set_user_validators(response, user_id, updated_at):
+    response.set_etag(user_etag(user_id, updated_at))
+    response.last_modified = updated_at
+    return response
+
+def is_not_modified(etag, updated_at):
+    """If-None-Match (weak comparison) wins over If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        # HTTP dates have one-second resolution
+        return updated_at.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
 
 # ========================
 # AUTHENTICATION HELPERS
@@ -154,14 +425,227 @@ def generate_api_key():
     """Generate a secure API key"""
     return secrets.token_urlsafe(32)
 
+def hash_api_key(api_key):
+    """Keyed digest stored and looked up in place of the key"""
+    secret = app.config['API_KEY_DIGEST_SECRET'].encode()
+    return hmac.new(secret, api_key.encode(), hashlib.sha256).hexdigest()
+
+ApiKeyPrincipal = namedtuple('ApiKeyPrincipal', ['id', 'email'])
+
+# Digest of a presented key -> the ApiKeyPrincipal it resolved to
+auth_events = InvalidationLog(app.config['AUTH_EVENTS_PATH'])
+api_key_cache = PrincipalCache(app.config['API_KEY_CACHE_TTL'], app.config['API_KEY_CACHE_MAX_SIZE'], auth_events)
+
+def _api_key_cache_metrics():
+    return [
+        "# TYPE api_key_cache_hits_total counter",
+        f"api_key_cache_hits_total {api_key_cache.hits}",
+        "# TYPE api_key_cache_misses_total counter",
+        f"api_key_cache_misses_total {api_key_cache.misses}",
+        "# TYPE jwt_claims_cache_hits_total counter",
+        f"jwt_claims_cache_hits_total {jwt_claims_cache.hits}",
+        "# TYPE jwt_claims_cache_misses_total counter",
+        f"jwt_claims_cache_misses_total {jwt_claims_cache.misses}",
+        "# TYPE response_cache_hits_total counter",
+        f"response_cache_hits_total {response_cache.hits}",
+        "# TYPE response_cache_misses_total counter",
+        f"response_cache_misses_total {response_cache.misses}",
+        "# TYPE response_cache_errors_total counter",
+        f"response_cache_errors_total {response_cache.errors}",
+    ]
+
+registry.collectors.append(_api_key_cache_metrics)
+
+jwt_claims_cache = TokenCache(app.config['JWT_CLAIMS_CACHE_MAX_SIZE'], auth_events)
+
+@jwt.token_in_blocklist_loader
+def is_token_revoked(jwt_header, jwt_payload):
+    return jwt_claims_cache.is_revoked(jwt_payload.get('jti'))
+
+def get_optional_jwt_identity():
+    """Identity from a valid bearer token, or None; each token is verified once"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    token = auth_header[len('Bearer '):]
+    claims = jwt_claims_cache.get(token)
+    if claims is None:
+        from flask_jwt_extended import verify_jwt_in_request
+        verify_jwt_in_request(optional=True)
+        claims = get_jwt()
+        if not claims:
+            return None
+        jwt_claims_cache.set(token, claims)
+    return claims.get(app.config['JWT_IDENTITY_CLAIM'])
+
 def check_api_key():
-    """Check API key from headers"""
+    """Resolve the X-API-Key header to an ApiKeyPrincipal, or None"""
     api_key = request.headers.get('X-API-Key')
     if not api_key:
         return None
     
-    user = User.query.filter_by(api_key=api_key, is_active=True).first()
-    return user
+    digest = hash_api_key(api_key)
+    principal = api_key_cache.get(digest)
+    if principal is not None:
+        return principal
+    
+    # Unique index on the digest column; not cached if the user is invalidated meanwhile
+    generation = api_key_cache.generation
+    user = User.query.filter_by(api_key_digest=digest, is_active=True).first()
+    if user is None:
+        return None
+    principal = ApiKeyPrincipal(user.id, user.email)
+    api_key_cache.set(digest, principal, generation=generation)
+    return principal
+
+def get_request_user():
+    """Resolve the caller from a JWT or, failing that, an API key"""
+    with phase('auth'):
+        auth_user = None
+        
+        # Check JWT token
+        try:
+            user_id = get_optional_jwt_identity()
+            if user_id:
+                auth_user = User.query.get(user_id)
+        except:
+            pass
+        
+        # Check API key if no JWT
+        if not auth_user:
+            auth_user = check_api_key()
+        return auth_user
+
+# ========================
+# RATE LIMITING
+# ========================
+
+rate_limiter = TokenBucketStore(shards=app.config['RATE_LIMIT_SHARDS'])
+
+def rate_limit_client():
+    """Bucket owner: the verified JWT or API-key user, else the client IP
+    
+    Invalid credentials fall back to the IP, so made-up tokens or keys
+    cannot each get a fresh bucket.
+    """
+    try:
+        user_id = get_optional_jwt_identity()
+    except Exception:
+        user_id = None
+    if user_id is None:
+        principal = check_api_key()
+        user_id = principal.id if principal is not None else None
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+def rate_limit(name, default):
+    """Limit each client to the named limit on this route
+    
+    Goes below @app.route and above @jwt_required, so rejected requests
+    never reach token verification or the database.
+    """
+    limit = app.config['RATE_LIMIT_OVERRIDES'].get(name) or parse_limit(default)
+    
+    def decorator(view):
+        if not app.config['RATE_LIMIT_ENABLED']:
+            return view
+        
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            retry_after = rate_limiter.hit(f"{name}:{rate_limit_client()}", limit)
+            if retry_after:
+                response, status_code = create_error_response("Rate limit exceeded", 429)
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response, status_code
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _rate_limit_metrics():
+    return [
+        "# TYPE rate_limit_buckets gauge",
+        f"rate_limit_buckets {len(rate_limiter)}",
+        "# TYPE rate_limit_rejected_total counter",
+        f"rate_limit_rejected_total {rate_limiter.rejected}",
+    ]
+
+registry.collectors.append(_rate_limit_metrics)
+
+# ========================
+# ARCHIVAL
+# ========================
+
+def compact_users(days=None, batch_size=None, max_batches=None):
+    """Move users soft-deleted more than `days` days ago to users_archive"""
+    days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    db.create_all()
+    return compact(
+        db.session, User.__table__, user_archive,
+        cutoff=datetime.utcnow() - timedelta(days=days),
+        batch_size=batch_size or app.config['ARCHIVE_BATCH_SIZE'],
+        max_batches=max_batches
+    )
+
+def restore_users(user_ids, activate=False):
+    """Move archived users back (soft-deleted, or active with activate)
+
+    Returns (restored ids, ids not restored).
+    """
+    db.create_all()
+    restored, skipped = restore(db.session, User.__table__, user_archive, user_ids)
+    if activate and restored:
+        User.query.filter(User.id.in_(restored)).update(
+            {User.is_active: True, User.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        adjust_active_user_count(len(restored))
+        db.session.commit()
+        response_cache.invalidate()
+    return restored, skipped
+
+def _run_compaction():
+    with app.app_context():
+        return compact_users()
+
+# Every process that imports the app runs its own job; batches are short
+# transactions, so overlapping runs only make one of them fail and retry later
+compaction_job = CompactionJob(app.config['ARCHIVE_INTERVAL_SECONDS'], _run_compaction)
+compaction_job.start()
+
+@app.cli.command('compact-users')
+@click.option('--days', type=int, default=None, help='Archive users inactive longer than this (default ARCHIVE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Rows per transaction (default ARCHIVE_BATCH_SIZE)')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches')
+def compact_users_command(days, batch_size, max_batches):
+    """Move long soft-deleted users into users_archive"""
+    result = compact_users(days, batch_size, max_batches)
+    click.echo(
+        f"Archived {result.moved} users in {result.batches} batches, "
+        f"{result.seconds:.2f}s (longest batch {result.longest_batch_ms:.1f} ms)"
+    )
+
+@app.cli.command('restore-users')
+@click.argument('user_ids', nargs=-1, type=int, required=True)
+@click.option('--activate', is_flag=True, help='Reactivate them instead of restoring them soft-deleted')
+def restore_users_command(user_ids, activate):
+    """Move archived users back into the user table"""
+    restored, skipped = restore_users(user_ids, activate)
+    click.echo(f"Restored {len(restored)} users")
+    if skipped:
+        click.echo(f"Not restored (not archived, or id/email in use): {' '.join(map(str, skipped))}")
+
+def _archive_metrics():
+    return [
+        "# TYPE archive_runs_total counter",
+        f"archive_runs_total {compaction_job.runs}",
+        "# TYPE archive_errors_total counter",
+        f"archive_errors_total {compaction_job.errors}",
+        "# TYPE archive_users_moved_total counter",
+        f"archive_users_moved_total {compaction_job.moved}",
+    ]
+
+registry.collectors.append(_archive_metrics)
 
 # ========================
 # ROUTES
@@ -185,11 +669,15 @@ def home():
             'auth': {
                 'register': 'POST /auth/register',
                 'login': 'POST /auth/login',
+                'logout': 'POST /auth/logout',
                 'generate_api_key': 'POST /auth/api-key'
             },
+            'metrics': 'GET /metrics',
             'users': {
                 'list': 'GET /users',
                 'create': 'POST /users',
+                'bulk_create': 'POST /users/bulk',
+                'export': 'GET /users/export?format=ndjson|csv',
                 'get': 'GET /users/<id>',
                 'update': 'PUT /users/<id>',
                 'delete': 'DELETE /users/<id>'
@@ -202,6 +690,7 @@ def home():
 # ========================
 
 @app.route("/auth/register", methods=["POST"])
+@rate_limit("auth.register", "10/minute")
 def register():
     """Register a new user with password"""
     try:
@@ -234,7 +723,9 @@ def register():
         user.set_password(data['password'])
         
         db.session.add(user)
+        adjust_active_user_count(1)
         db.session.commit()
+        response_cache.invalidate()
         
         return create_success_response(
             data={
@@ -252,6 +743,7 @@ def register():
         return create_error_response("Failed to register user", 500)
 
 @app.route("/auth/login", methods=["POST"])
+@rate_limit("auth.login", "10/minute")
 def login():
     """Login user and return JWT token"""
     try:
@@ -290,7 +782,16 @@ def login():
     except Exception as e:
         return create_error_response("Failed to login", 500)
 
+@app.route("/auth/logout", methods=["POST"])
+@jwt_required()
+def logout():
+    """Revoke the current access token"""
+    claims = get_jwt()
+    jwt_claims_cache.revoke(claims['jti'], claims['exp'])
+    return create_success_response(message="Logged out successfully")
+
 @app.route("/auth/api-key", methods=["POST"])
+@rate_limit("auth.api_key", "10/minute")
 @jwt_required()
 def generate_user_api_key():
     """Generate API key for authenticated user"""
@@ -301,11 +802,13 @@ def generate_user_api_key():
         if not user or not user.is_active:
             return create_error_response("User not found", 404)
         
-        # Generate new API key
+        # Generate new API key; only its digest is kept
         api_key = generate_api_key()
-        user.api_key = api_key
+        user.api_key_digest = hash_api_key(api_key)
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        api_key_cache.invalidate_user(user.id)
+        response_cache.invalidate()
         
         return create_success_response(
             data={
@@ -373,6 +876,7 @@ def update_profile():
         
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        response_cache.invalidate()
         
         return create_success_response(
             data=user.to_dict(),
@@ -385,80 +889,255 @@ def update_profile():
 
 # GET all users with pagination (supports both JWT and API key auth)
 @app.route("/users", methods=["GET"])
+@rate_limit("users.list", "120/minute")
 def get_users():
     try:
         # Optional authentication - works for both authenticated and unauthenticated requests
-        auth_user = None
+        auth_user = get_request_user()
         
-        # Check JWT token
+        # Pages are cached as sent; meta.authenticated is part of the body
+        cache_key, cached = response_cache.lookup(request_cache_key(request, auth_user is not None))
+        if cached is not None:
+            return app.response_class(cached, mimetype='application/json')
+        
+        response, status_code = list_users_page(auth_user)
+        if status_code == 200:
+            response_cache.store(cache_key, response.get_data())
+        return response, status_code
+        
+    except Exception as e:
+        return create_error_response("Failed to retrieve users", 500)
+
+def list_users_page(auth_user):
+    """One page of active users as (response, status), offset or cursor paged"""
+    # Get pagination parameters
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
+    
+    # Validate pagination parameters
+    if page < 1:
+        return create_error_response("Page must be greater than 0", 400)
+    if per_page < 1 or per_page > 100:
+        return create_error_response("Per page must be between 1 and 100", 400)
+    
+    users_query = User.query.filter_by(is_active=True).order_by(User.id)
+    
+    # Keyset pagination - seek past the last seen id instead of counting
+    # and skipping rows, so deep pages cost the same as the first one
+    if cursor is not None:
         try:
-            from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-            verify_jwt_in_request(optional=True)
-            user_id = get_jwt_identity()
-            if user_id:
-                auth_user = User.query.get(user_id)
-        except:
-            pass
+            after_id = decode_cursor(cursor)
+        except ValueError as e:
+            return create_error_response(str(e), 400)
         
-        # Check API key if no JWT
-        if not auth_user:
-            auth_user = check_api_key()
+        users = users_query.filter(User.id > after_id).limit(per_page + 1).all()
+        has_next = len(users) > per_page
+        users = users[:per_page]
+        
+        meta = {
+            'per_page': per_page,
+            'has_next': has_next,
+            'next_cursor': encode_cursor(users[-1].id) if has_next else None,
+            'authenticated': auth_user is not None
+        }
+        return create_users_response(users, meta)
+    
+    # Offset pagination without a total - fetch one extra row to find
+    # out whether there is a next page instead of counting
+    if not include_total:
+        users = users_query.offset((page - 1) * per_page).limit(per_page + 1).all()
+        has_next = len(users) > per_page
+        users = users[:per_page]
         
-        # Get pagination parameters
+        meta = {
+            'page': page,
+            'per_page': per_page,
+            'total': None,
+            'pages': None,
+            'has_next': has_next,
+            'has_prev': page > 1,
+            'next_page': page + 1 if has_next else None,
+            'prev_page': page - 1 if page > 1 else None,
+            'next_cursor': encode_cursor(users[-1].id) if has_next else None,
+            'authenticated': auth_user is not None
+        }
+        return create_users_response(users, meta)
+    
+    # Offset pagination - at most one count per request, none when the
+    # maintained total is enabled
+    total = get_active_user_count() if app.config['ACTIVE_USER_COUNTER'] else None
+    users = users_query.paginate(
+        page=page,
+        per_page=per_page,
+        error_out=False,
+        count=total is None
+    )
+    if total is not None:
+        users.total = total
+    
+    # Create pagination metadata
+    meta = {
+        'page': page,
+        'per_page': per_page,
+        'total': users.total,
+        'pages': users.pages,
+        'has_next': users.has_next,
+        'has_prev': users.has_prev,
+        'next_page': users.next_num if users.has_next else None,
+        'prev_page': users.prev_num if users.has_prev else None,
+        'next_cursor': encode_cursor(users.items[-1].id) if users.has_next and users.items else None,
+        'authenticated': auth_user is not None
+    }
+    
+    return create_users_response(users.items, meta)
+
+@app.route("/users/search", methods=["GET"])
+@rate_limit("users.search", "120/minute")
+def search_users():
+    """Search active users by name or email, best matches first"""
+    try:
+        auth_user = get_request_user()
+        
+        q = request.args.get('q', '').strip()
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        # Validate pagination parameters
+        if not q or len(q) > 200:
+            return create_error_response("Query parameter q must be 1 to 200 characters", 400)
         if page < 1:
             return create_error_response("Page must be greater than 0", 400)
         if per_page < 1 or per_page > 100:
             return create_error_response("Per page must be between 1 and 100", 400)
         
-        # Query with pagination
-        users_query = User.query.filter_by(is_active=True)
-        total = users_query.count()
-        users = users_query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        # Every word of q must start a word of the name or email
+        match = match_expression(q)
+        users = []
+        if match is not None:
+            users = db.session.scalars(user_search.select(
+                User, match, (page - 1) * per_page, per_page + 1, User.is_active.is_(True)
+            )).all()
+        has_next = len(users) > per_page
+        users = users[:per_page]
         
-        # Create pagination metadata
         meta = {
+            'query': q,
             'page': page,
             'per_page': per_page,
-            'total': total,
-            'pages': users.pages,
-            'has_next': users.has_next,
-            'has_prev': users.has_prev,
-            'next_page': users.next_num if users.has_next else None,
-            'prev_page': users.prev_num if users.has_prev else None,
+            'has_next': has_next,
+            'has_prev': page > 1,
+            'next_page': page + 1 if has_next else None,
+            'prev_page': page - 1 if page > 1 else None,
             'authenticated': auth_user is not None
         }
+        return create_users_response(users, meta)
         
-        return create_success_response(
-            data=[user.to_dict() for user in users.items],
-            meta=meta
+    except Exception as e:
+        return create_error_response("Failed to search users", 500)
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = ['id', 'name', 'email', 'created_at', 'updated_at', 'is_active']
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _export_chunk(rows, export_format, header=False):
+    """Serialize a chunk of user rows as NDJSON lines or CSV records"""
+    if export_format == 'ndjson':
+        return ''.join(
+            json.dumps({field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)}) + '\n'
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+# GET export all active users (streamed, JWT or API key required)
+@app.route("/users/export", methods=["GET"])
+@rate_limit("users.export", "5/minute")
+def export_users():
+    if not get_request_user():
+        return create_error_response("Authentication required", 401)
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_MEDIA_TYPES:
+        return create_error_response("Format must be 'ndjson' or 'csv'", 400)
+    
+    def generate():
+        if export_format == 'csv':
+            yield _export_chunk([], export_format, header=True)
+        # yield_per keeps a server-side cursor open and only holds one chunk in memory
+        result = db.session.execute(
+            db.select(*(getattr(User, field) for field in EXPORT_FIELDS))
+            .filter_by(is_active=True)
+            .order_by(User.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
         )
+        for rows in result.partitions():
+            yield _export_chunk(rows, export_format)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename=users.{export_format}'}
+    )
+
+# GET several users by id
+@app.route("/users/batch", methods=["GET"])
+@rate_limit("users.batch", "120/minute")
+def get_users_batch():
+    """Active users for ?ids=1,2,3 with one IN query, in the order asked for"""
+    try:
+        user_ids = parse_user_ids(request.args.get('ids', ''))
+    except ValueError as e:
+        return create_error_response(str(e), 400)
+    
+    try:
+        found = {
+            user.id: user
+            for user in User.query.filter_by(is_active=True).filter(User.id.in_(user_ids))
+        }
+        users = [found[user_id] for user_id in user_ids if user_id in found]
+        meta = {
+            'requested': len(user_ids),
+            'missing': [user_id for user_id in user_ids if user_id not in found]
+        }
+        return create_users_response(users, meta)
         
     except Exception as e:
         return create_error_response("Failed to retrieve users", 500)
 
 # GET single user
 @app.route("/users/<int:user_id>", methods=["GET"])
+@rate_limit("users.read", "300/minute")
 def get_user(user_id):
     try:
+        # Conditional requests only need the timestamp (primary-key lookup)
+        if request.if_none_match or request.if_modified_since:
+            updated_at = db.session.query(User.updated_at).filter_by(id=user_id, is_active=True).scalar()
+            if updated_at is None:
+                return create_error_response("User not found", 404)
+            if is_not_modified(user_etag(user_id, updated_at), updated_at):
+                return set_user_validators(app.response_class(status=304), user_id, updated_at)
+        
         user = User.query.get(user_id)
         if not user or not user.is_active:
             return create_error_response("User not found", 404)
         
-        return create_success_response(data=user.to_dict())
+        response, status_code = create_success_response(data=user.to_dict())
+        return set_user_validators(response, user.id, user.updated_at), status_code
         
     except Exception as e:
         return create_error_response("Failed to retrieve user", 500)
 
 # POST create user
 @app.route("/users", methods=["POST"])
+@rate_limit("users.write", "60/minute")
 def create_user():
     try:
         data = request.get_json()
@@ -483,7 +1162,9 @@ def create_user():
         )
         
         db.session.add(user)
+        adjust_active_user_count(1)
         db.session.commit()
+        response_cache.invalidate()
         
         return create_success_response(
             data=user.to_dict(),
@@ -495,14 +1176,110 @@ def create_user():
         db.session.rollback()
         return create_error_response("Failed to create user", 500)
 
+# POST create many users in one transaction
+@app.route("/users/bulk", methods=["POST"])
+@rate_limit("users.bulk", "10/minute")
+def create_users_bulk():
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('users'), list) or not data['users']:
+            return create_error_response("Request body must be JSON with a non-empty 'users' list", 400)
+        
+        items = data['users']
+        max_users = app.config['BULK_CREATE_MAX_USERS']
+        if len(items) > max_users:
+            return create_error_response(f"At most {max_users} users can be created per request", 422)
+        
+        # Validate every item before touching the database
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'status_code': 422, 'errors': ["Item must be an object"]}
+                continue
+            errors = validate_user_data(item)
+            if 'password' in item and len(str(item['password'])) < 6:
+                errors.append("Password must be at least 6 characters long")
+            if errors:
+                results[index] = {'index': index, 'status_code': 422, 'errors': errors}
+                continue
+            valid.append((index, item, item['email'].lower().strip()))
+        
+        # One query for every email that is already taken
+        emails = {email for _, _, email in valid}
+        taken = set()
+        if emails:
+            taken = {email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))}
+        
+        pending = []
+        for index, item, email in valid:
+            if email in taken:
+                results[index] = {'index': index, 'status_code': 422, 'errors': ["Email must be unique"]}
+                continue
+            taken.add(email)
+            pending.append((index, item, email))
+        
+        if pending:
+            with_password = [(index, item) for index, item, _ in pending if item.get('password')]
+            hashes = dict(zip(
+                (index for index, _ in with_password),
+                hash_passwords([str(item['password']) for _, item in with_password])
+            ))
+            now = datetime.utcnow()
+            rows = [
+                {
+                    'name': item['name'].strip(),
+                    'email': email,
+                    'password_hash': hashes.get(index),
+                    'created_at': now,
+                    'updated_at': now,
+                    'is_active': True
+                }
+                for index, item, email in pending
+            ]
+            
+            # A single executemany, then one indexed read to return the new rows
+            db.session.execute(db.insert(User), rows)
+            created = User.query.filter(User.email.in_([row['email'] for row in rows])).all()
+            adjust_active_user_count(len(rows))
+            db.session.commit()
+            response_cache.invalidate()
+            
+            created_by_email = {user.email: user for user in created}
+            for index, _, email in pending:
+                results[index] = {
+                    'index': index,
+                    'status_code': 201,
+                    'data': created_by_email[email].to_dict()
+                }
+        
+        created_count = len(pending)
+        return create_success_response(
+            data={
+                'created': created_count,
+                'failed': len(items) - created_count,
+                'results': results
+            },
+            message=f"{created_count} of {len(items)} users created"
+        )
+        
+    except Exception as e:
+        db.session.rollback()
+        return create_error_response("Failed to create users", 500)
+
 # PUT update user
 @app.route("/users/<int:user_id>", methods=["PUT"])
+@rate_limit("users.write", "60/minute")
 def update_user(user_id):
     try:
         user = User.query.get(user_id)
         if not user or not user.is_active:
             return create_error_response("User not found", 404)
         
+        # Optimistic concurrency: the client must still have the current version
+        if request.if_match and not request.if_match.contains(user_etag(user.id, user.updated_at)):
+            return create_error_response("User has been modified", 412)
+        
         data = request.get_json()
         if not data:
             return create_error_response("Request body must be JSON", 400)
@@ -519,18 +1296,29 @@ def update_user(user_id):
                 return create_error_response("Email already exists", 422, ["Email must be unique"])
         
         # Update user fields
+        changes = {'updated_at': datetime.utcnow()}
         if 'name' in data:
-            user.name = data['name'].strip()
+            changes['name'] = data['name'].strip()
         if 'email' in data:
-            user.email = data['email'].lower().strip()
+            changes['email'] = data['email'].lower().strip()
         
-        user.updated_at = datetime.utcnow()
+        if request.if_match:
+            # Compare-and-set, in case the user changed after the check above
+            updated = User.query.filter_by(id=user.id, updated_at=user.updated_at).update(changes)
+            if not updated:
+                db.session.rollback()
+                return create_error_response("User has been modified", 412)
+        else:
+            for field, value in changes.items():
+                setattr(user, field, value)
         db.session.commit()
+        response_cache.invalidate()
         
-        return create_success_response(
+        response, status_code = create_success_response(
             data=user.to_dict(),
             message="User updated successfully"
         )
+        return set_user_validators(response, user.id, user.updated_at), status_code
         
     except Exception as e:
         db.session.rollback()
@@ -538,6 +1326,7 @@ def update_user(user_id):
 
 # DELETE user (soft delete)
 @app.route("/users/<int:user_id>", methods=["DELETE"])
+@rate_limit("users.write", "60/minute")
 def delete_user(user_id):
     try:
         user = User.query.get(user_id)
@@ -547,7 +1336,10 @@ def delete_user(user_id):
         # Soft delete - mark as inactive instead of removing
         user.is_active = False
         user.updated_at = datetime.utcnow()
+        adjust_active_user_count(-1)
         db.session.commit()
+        api_key_cache.invalidate_user(user.id)
+        response_cache.invalidate()
         
         return create_success_response(
             message="User deleted successfully",
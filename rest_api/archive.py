@@ -0,0 +1,165 @@
+"""
+Archival compaction of soft-deleted users for the Flask app.
+
+Deleting a user only clears is_active, so inactive rows would stay in
+the user table for good and every active-user query would step over
+them. compact() moves rows inactive for longer than a cutoff into an
+archive table with the same columns plus archived_at, and restore()
+moves them back.
+
+Rows move in batches, one short transaction each (select ids, copy,
+delete, commit), with a pause between batches so request writers get
+the lock in between. The row with the highest id is never archived:
+SQLite hands out max(id) + 1 to new rows, so archived ids are never
+reused by a new user, and old tokens or restores can't collide with one.
+"""
+from collections import namedtuple
+from datetime import datetime
+import logging
+import threading
+import time
+
+from sqlalchemy import Column, DateTime, Table, delete, false, func, insert, literal, or_, select
+
+logger = logging.getLogger(__name__)
+
+# Ids go into IN (...) lists, well under SQLite's 32766 bound parameters
+MAX_BATCH_SIZE = 10000
+
+CompactionResult = namedtuple('CompactionResult', 'moved batches seconds longest_batch_ms')
+
+
+def archive_table(metadata, source, name):
+    """Table with source's columns (no unique constraints or indexes) plus archived_at"""
+    columns = [
+        Column(column.name, column.type, key=column.key, primary_key=column.primary_key, autoincrement=False)
+        for column in source.columns
+    ]
+    return Table(name, metadata, *columns, Column('archived_at', DateTime, nullable=False))
+
+
+def _copy(session, keys, from_table, to_table, ids, extra=None):
+    """INSERT INTO to_table these columns (plus extra literals) of from_table's rows with these ids"""
+    targets = [to_table.c[key] for key in keys]
+    values = [from_table.c[key] for key in keys]
+    for key, value in (extra or {}).items():
+        targets.append(to_table.c[key])
+        values.append(literal(value))
+    session.execute(insert(to_table).from_select(targets, select(*values).where(from_table.c.id.in_(ids))))
+
+
+def compact(session, source, archive, cutoff, batch_size=500, pause=0.05, max_batches=None):
+    """Move rows inactive since before cutoff into archive, batch by batch
+
+    Inactive since means updated_at (set by the soft delete) is older
+    than cutoff. Returns a CompactionResult.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    keys = [column.key for column in source.columns]
+    started = time.perf_counter()
+    moved = batches = 0
+    longest = 0.0
+    newest = select(func.max(source.c.id)).scalar_subquery()
+    candidates = (
+        select(source.c.id)
+        .where(
+            source.c.is_active == false(),
+            func.coalesce(source.c.updated_at, source.c.created_at) < cutoff,
+            source.c.id < newest,
+        )
+        .order_by(source.c.id)
+        .limit(batch_size)
+    )
+    while max_batches is None or batches < max_batches:
+        batch_started = time.perf_counter()
+        try:
+            ids = session.execute(candidates).scalars().all()
+            if not ids:
+                session.rollback()
+                break
+            _copy(session, keys, source, archive, ids, {'archived_at': datetime.utcnow()})
+            session.execute(delete(source).where(source.c.id.in_(ids)))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        longest = max(longest, time.perf_counter() - batch_started)
+        moved += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return CompactionResult(moved, batches, round(time.perf_counter() - started, 3), round(longest * 1000, 1))
+
+
+def restore(session, source, archive, ids, batch_size=500):
+    """Move archived rows back into source, still inactive
+
+    Returns (restored ids, ids left in the archive because their id or
+    email is taken in source, or that were not archived).
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    keys = [column.key for column in source.columns]
+    restored, skipped = [], []
+    ids = list(dict.fromkeys(ids))
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        try:
+            rows = session.execute(select(archive.c.id, archive.c.email).where(archive.c.id.in_(chunk))).all()
+            emails = [email for _, email in rows]
+            taken = session.execute(
+                select(source.c.id, source.c.email).where(or_(source.c.id.in_(chunk), source.c.email.in_(emails)))
+            ).all()
+            taken_ids = {row_id for row_id, _ in taken}
+            taken_emails = {email for _, email in taken}
+            movable = [row_id for row_id, email in rows if row_id not in taken_ids and email not in taken_emails]
+            if movable:
+                _copy(session, keys, archive, source, movable)
+                session.execute(delete(archive).where(archive.c.id.in_(movable)))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        restored.extend(movable)
+        moved = set(movable)
+        skipped.extend(row_id for row_id in chunk if row_id not in moved)
+    return restored, skipped
+
+
+class CompactionJob:
+    """Runs a compaction function every interval seconds on a daemon thread"""
+
+    def __init__(self, interval, run):
+        self.interval = interval
+        self.run = run
+        self.runs = 0
+        self.errors = 0
+        self.moved = 0
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name='user-compaction', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                result = self.run()
+            except Exception:
+                self.errors += 1
+                logger.exception("User compaction failed")
+                continue
+            self.runs += 1
+            self.moved += result.moved
+            self.last_result = result
+            if result.moved:
+                logger.info(
+                    "Archived %d users in %d batches, %.2fs (longest batch %.1f ms)",
+                    result.moved, result.batches, result.seconds, result.longest_batch_ms
+                )
@@ -0,0 +1,66 @@
+"""
+Request timing and Prometheus text exposition for the Flask app.
+
+init_metrics() registers request hooks that time every request and keep
+an in-flight gauge, listens to the SQLAlchemy engine for the "db" phase,
+and serves everything at /metrics. The app marks the "auth" and
+"serialization" phases with the phase() context manager. The metric
+types live in shared/metrics.py.
+"""
+from time import perf_counter
+
+from flask import Response, request
+
+from shared.metrics import PhaseTimings, Registry, RequestMetrics, instrument_engine, phase, request_timings
+
+__all__ = ["init_metrics", "phase", "registry"]
+
+registry = Registry()
+request_metrics = RequestMetrics(registry)
+
+
+class RequestTimings(PhaseTimings):
+    """Phase timers plus what the teardown hook needs"""
+    __slots__ = ("started", "status", "token")
+
+    def __init__(self):
+        super().__init__()
+        self.started = perf_counter()
+        self.status = 500
+        self.token = None
+
+
+def init_metrics(app, db, path="/metrics"):
+    """Time every request and serve the registry at path"""
+    with app.app_context():
+        instrument_engine(db.engine)
+
+    @app.before_request
+    def _start_timer():
+        if request.path == path:
+            return
+        timings = RequestTimings()
+        timings.token = request_timings.set(timings)
+        request_metrics.in_flight.inc()
+
+    @app.after_request
+    def _record_status(response):
+        timings = request_timings.get()
+        if timings is not None:
+            timings.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        timings = request_timings.get()
+        if timings is None:
+            return
+        elapsed = perf_counter() - timings.started
+        request_metrics.in_flight.dec()
+        request_timings.reset(timings.token)
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        request_metrics.record(request.method, route, timings.status, elapsed, timings.phases)
+
+    @app.route(path, methods=["GET"])
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
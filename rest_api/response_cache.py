@@ -0,0 +1,169 @@
+"""
+Server-side cache of serialized list responses for the Flask app.
+
+Entries are keyed by route and query string and hold the exact bytes
+sent to the client. Every key embeds a generation number that the write
+routes bump, so one increment invalidates every cached page. A request
+reads the generation before it queries, so a page built while a write
+lands is filed under the old generation and never served.
+
+Backends (RESPONSE_CACHE_BACKEND):
+  none    caching off (default)
+  memory  in-process LRU, one per worker
+  socket  cache server on a Unix socket, shared by every worker:
+          python ../shared/cache_server.py --socket /tmp/users-cache.sock
+"""
+from urllib.parse import urlencode
+import hashlib
+import socket
+import threading
+
+from shared.cache_server import CacheUnavailable, LRUStore
+
+
+class MemoryBackend:
+    """Per-process backend; invalidation only reaches this worker"""
+
+    def __init__(self, max_entries=1024):
+        self.store = LRUStore(max_entries)
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ttl_seconds):
+        self.store.set(key, value, ttl_seconds)
+
+    def generation(self, namespace):
+        return self.store.generation(namespace)
+
+    def bump(self, namespace):
+        return self.store.bump(namespace)
+
+
+class SocketBackend:
+    """Client for shared/cache_server.py, one connection per thread"""
+
+    def __init__(self, path, timeout=0.05):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            conn = self._local.conn = (sock, sock.makefile('rb'))
+        return conn
+
+    def _call(self, request):
+        try:
+            sock, reader = self._connection()
+            sock.sendall(request)
+            line = reader.readline()
+            kind, value = line[:1], line[1:].strip()
+            if kind == b'$':
+                length = int(value)
+                if length < 0:
+                    return None
+                data = reader.read(length)
+                if len(data) != length:
+                    raise EOFError('Short read from cache server')
+                return data
+            if kind == b':':
+                return int(value)
+            if kind == b'+':
+                return None
+            raise ValueError(f'Unexpected cache server reply: {line!r}')
+        except (OSError, EOFError, ValueError) as e:
+            # The stream may be mid-reply; start over on the next call
+            self._disconnect()
+            raise CacheUnavailable(str(e)) from e
+
+    def _disconnect(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def get(self, key):
+        return self._call(b'GET %s\n' % key.encode())
+
+    def set(self, key, value, ttl_seconds):
+        self._call(b'SET %s %f %d\n' % (key.encode(), ttl_seconds, len(value)) + value)
+
+    def generation(self, namespace):
+        return self._call(b'GEN %s\n' % namespace.encode())
+
+    def bump(self, namespace):
+        return self._call(b'BUMP %s\n' % namespace.encode())
+
+
+class ResponseCache:
+    """Serialized responses filed under the current write generation"""
+
+    def __init__(self, backend=None, ttl_seconds=30, namespace='users'):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None and self.ttl_seconds > 0
+
+    def lookup(self, request_key):
+        """Return (cache key, body or None); a None cache key means do not store"""
+        if not self.enabled:
+            return None, None
+        try:
+            generation = self.backend.generation(self.namespace)
+            key = f'{self.namespace}:{generation}:{hashlib.sha1(request_key.encode()).hexdigest()}'
+            value = self.backend.get(key)
+        except CacheUnavailable:
+            self.errors += 1
+            return None, None
+        if value is None:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        return key, value
+
+    def store(self, key, body):
+        if key is None:
+            return
+        try:
+            self.backend.set(key, body, self.ttl_seconds)
+        except CacheUnavailable:
+            self.errors += 1
+
+    def invalidate(self):
+        """Retire every cached page after a write"""
+        if not self.enabled:
+            return
+        try:
+            self.backend.bump(self.namespace)
+        except CacheUnavailable:
+            # Pages already cached elsewhere stay valid until their TTL
+            self.errors += 1
+
+
+def request_cache_key(request, *extra):
+    """Route plus query parameters in a stable order, plus anything else the body depends on"""
+    key = request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+    return '|'.join([key, *map(str, extra)])
+
+
+def build_backend(kind, socket_path, max_entries, timeout=0.05):
+    if kind == 'memory':
+        return MemoryBackend(max_entries)
+    if kind == 'socket':
+        return SocketBackend(socket_path, timeout)
+    if kind == 'none':
+        return None
+    raise ValueError(f'Unknown response cache backend: {kind}')
+
@@ -0,0 +1,6 @@
+"""
+Code used by both the Flask and the FastAPI apps.
+
+The apps are not installed packages; each one puts the repository root
+on sys.path before importing from here.
+"""
@@ -0,0 +1,329 @@
+"""
+Authentication caches shared by the Flask and FastAPI apps.
+
+PrincipalCache remembers who a credential resolved to, so a repeated
+bearer token or API key does not cost a user lookup. The FastAPI app
+keys it by token subject (app/auth/cache.py), the Flask app by API key
+digest (rest_api/app_enhanced.py).
+
+TokenCache remembers the claims of verified JWTs until they expire, so a
+repeated token is verified once, and the ids of revoked tokens. Both
+apps use it for their bearer tokens.
+
+Every worker process has its own caches. An InvalidationLog carries
+what one worker revokes to all the others: it is an append-only file
+that each worker checks with one stat() per lookup and reads only when
+it has grown.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import fcntl
+import hashlib
+import os
+import threading
+import time
+
+
+class InvalidationLog:
+    """Append-only file of cache events shared by every worker on the host
+
+    Each line is "<kind> <expires_at> <argument>"; an event is ignored
+    once expires_at has passed. Caches subscribe a handler per kind,
+    publish() appends an event and poll() applies the events other
+    processes appended since the last call. When the file passes
+    max_bytes, the writer replaces it with only the live events; readers
+    notice the new inode and read it again from the start.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1 << 20):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self._handlers: Dict[str, Callable[[str, float], None]] = {}
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._partial = b""
+        self._lock = threading.Lock()
+
+    def subscribe(self, kind: str, handler: Callable[[str, float], None]):
+        self._handlers[kind] = handler
+
+    def publish(self, kind: str, argument: str, expires_at: float):
+        """Append an event for every worker, this one included"""
+        line = f"{kind} {expires_at:.3f} {argument}\n".encode()
+        while True:
+            with open(self.path, "ab") as log:
+                fcntl.flock(log, fcntl.LOCK_EX)
+                # Compaction may have replaced the file while this one waited for the lock
+                try:
+                    current = os.stat(self.path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current != os.fstat(log.fileno()).st_ino:
+                    continue
+                log.write(line)
+                log.flush()
+                if log.tell() > self.max_bytes:
+                    self._compact()
+                break
+        self.poll()
+
+    def _compact(self):
+        """Rewrite the file with only the live events (called under its lock)"""
+        now = time.time()
+        lines = []
+        with open(self.path, "rb") as log:
+            for line in log:
+                event = self._parse(line)
+                if event is not None and event[1] > now:
+                    lines.append(line)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as log:
+            log.writelines(lines)
+        os.replace(temporary, self.path)
+
+    @staticmethod
+    def _parse(line: bytes):
+        try:
+            kind, expires_at, argument = line.decode().rstrip("\n").split(" ", 2)
+            return kind, float(expires_at), argument
+        except ValueError:
+            return None
+
+    def poll(self):
+        """Apply the events appended since the last call"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino == self._inode and stat.st_size == self._offset:
+            return
+        with self._lock:
+            try:
+                log = open(self.path, "rb")
+            except FileNotFoundError:
+                return
+            with log:
+                inode = os.fstat(log.fileno()).st_ino
+                if inode != self._inode:
+                    self._inode, self._offset, self._partial = inode, 0, b""
+                log.seek(self._offset)
+                data = log.read()
+            self._offset += len(data)
+            lines = (self._partial + data).split(b"\n")
+            # A line still being written is finished on a later call
+            self._partial = lines.pop()
+            now = time.time()
+            for line in lines:
+                event = self._parse(line)
+                if event is not None and event[1] > now and event[0] in self._handlers:
+                    self._handlers[event[0]](event[2], event[1])
+
+
+class PrincipalCache:
+    """LRU/TTL cache of resolved callers, keyed by token subject or API key digest
+
+    generation changes whenever entries are dropped. A caller that reads
+    it before looking the user up and passes it to set() never caches a
+    user that was invalidated while the lookup ran. With an
+    InvalidationLog, invalidations reach every worker before its next
+    lookup.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_size: int = 1024, events: Optional[InvalidationLog] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.events = events
+        if events is not None:
+            events.subscribe("subject", lambda subject, expires_at: self._drop_subject(subject))
+            events.subscribe("user", lambda user_id, expires_at: self._drop_user(int(user_id)))
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, subject: str):
+        """Return the cached caller for a subject, or None"""
+        if not self.enabled:
+            return None
+        if self.events is not None:
+            self.events.poll()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, subject: str, user, token_expires_at: Optional[float] = None, generation: Optional[int] = None):
+        """Cache a caller until the TTL or the token expiry, whichever is sooner
+
+        With generation (read before the user was looked up), nothing is
+        cached if an invalidation has landed since.
+        """
+        if not self.enabled:
+            return
+        if self.events is not None:
+            self.events.poll()
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[subject] = (user, expires_at)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: Optional[str]):
+        """Drop a subject after its user row changed, in every worker"""
+        if subject is None:
+            return
+        self._drop_subject(subject)
+        self._publish("subject", subject)
+
+    def invalidate_user(self, user_id: int):
+        """Drop every subject resolved to this user id (e.g. after an email change or key rotation), in every worker"""
+        self._drop_user(user_id)
+        self._publish("user", str(user_id))
+
+    def _publish(self, kind: str, argument: str):
+        # Entries elsewhere are gone by the time the event expires
+        if self.events is not None and self.enabled:
+            self.events.publish(kind, argument, time.time() + self.ttl_seconds)
+
+    def _drop_subject(self, subject: str):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(subject, None)
+
+    def _drop_user(self, user_id: int):
+        with self._lock:
+            self.generation += 1
+            stale = [subject for subject, (user, _) in self._entries.items()
+                     if getattr(user, "id", None) == user_id]
+            for subject in stale:
+                del self._entries[subject]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters; every hit is one database round trip saved"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TokenCache:
+    """LRU cache of verified JWT claims keyed by token digest, valid until the token's exp
+
+    Also holds the revoked token ids, which are checked on every lookup
+    and kept only until the token would have expired anyway. With an
+    InvalidationLog, a revocation reaches every worker before its next
+    lookup.
+    """
+
+    def __init__(self, max_size: int = 4096, events: Optional[InvalidationLog] = None):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, dict]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.events = events
+        if events is not None:
+            events.subscribe("revoke", self._add_revoked)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return the claims of a previously verified token, or None"""
+        if not self.enabled:
+            return None
+        if self.events is not None:
+            self.events.poll()
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is None or claims["exp"] <= now or claims.get("jti") in self._revoked:
+                if claims is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def set(self, token: str, claims: dict):
+        """Cache claims that were just verified; tokens without exp are not cached"""
+        if not self.enabled or not isinstance(claims.get("exp"), (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def revoke(self, jti: str, expires_at: float):
+        """Reject the token with this id until it expires, in every worker"""
+        self._add_revoked(jti, expires_at)
+        if self.events is not None:
+            self.events.publish("revoke", jti, expires_at)
+
+    def _add_revoked(self, jti: str, expires_at: float):
+        now = time.time()
+        with self._lock:
+            for stale in [key for key, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[stale]
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None:
+            return False
+        if self.events is not None:
+            self.events.poll()
+        with self._lock:
+            expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def clear(self):
+        """Drop cached claims; revocations are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "revoked": len(self._revoked),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,122 @@
+"""
+Response cache server shared by every worker of both apps.
+
+Each app keeps its own client (rest_api/response_cache.py and
+fast_api/mini_project/app/response_cache.py); this module holds the LRU
+store behind the memory backend and the Unix socket server behind the
+socket backend. Both apps can use one server, as their namespaces differ.
+
+Run it as its own process; it imports nothing from either app:
+
+    python shared/cache_server.py --socket /tmp/users-cache.sock
+
+Protocol, one command per line:
+  GET <key>                      -> $<len>\\n<bytes>  or  $-1\\n
+  SET <key> <ttl> <len>\\n<bytes> -> +OK\\n
+  GEN <namespace>                -> :<generation>\\n
+  BUMP <namespace>               -> :<generation>\\n
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+
+class CacheUnavailable(Exception):
+    """The shared cache could not be reached; the request goes uncached"""
+
+
+class LRUStore:
+    """Thread-safe LRU of bytes with per-entry expiry, plus generation counters"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        # Kept apart from the LRU so a generation is never evicted
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace: str) -> int:
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            generation = self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            return generation
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _CacheRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        for line in self.rfile:
+            parts = line.split()
+            if not parts:
+                continue
+            command = parts[0]
+            try:
+                if command == b"GET":
+                    value = store.get(parts[1].decode())
+                    reply = b"$-1\n" if value is None else b"$%d\n" % len(value) + value
+                elif command == b"SET":
+                    value = self.rfile.read(int(parts[3]))
+                    store.set(parts[1].decode(), value, float(parts[2]))
+                    reply = b"+OK\n"
+                elif command == b"GEN":
+                    reply = b":%d\n" % store.generation(parts[1].decode())
+                elif command == b"BUMP":
+                    reply = b":%d\n" % store.bump(parts[1].decode())
+                else:
+                    reply = b"-ERR unknown command\n"
+            except (IndexError, ValueError):
+                reply = b"-ERR malformed command\n"
+            self.wfile.write(reply)
+
+
+class CacheServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _CacheRequestHandler)
+        self.store = LRUStore(max_entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared response cache for every app worker")
+    parser.add_argument("--socket", default=os.getenv("RESPONSE_CACHE_SOCKET", "/tmp/users-cache.sock"))
+    parser.add_argument("--max-entries", type=int, default=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")))
+    args = parser.parse_args()
+    with CacheServer(args.socket, args.max_entries) as server:
+        print(f"Response cache listening on {args.socket}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
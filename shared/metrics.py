@@ -0,0 +1,192 @@
+"""
+Prometheus metrics shared by the Flask and FastAPI apps.
+
+Histogram, Counter and Gauge render the text exposition format and a
+Registry renders them all, plus any collectors an app adds. Each app
+keeps its own Registry and hooks RequestMetrics into its request cycle
+(rest_api/metrics.py, fast_api/mini_project/app/metrics.py).
+
+Phase timers are shared too: the request hooks put a PhaseTimings in
+request_timings, phase() adds a block's time to it and
+instrument_engine() adds SQL execution time as the "db" phase.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (non-cumulative), then sum and count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        for label_values, counts, total, count in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labels, label_values, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            series_labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{series_labels} {total}")
+            lines.append(f"{self.name}_count{series_labels} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labels, labels)} {value}" for labels, value in items)
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """Latency, status and phase series for HTTP requests, registered on registry"""
+
+    def __init__(self, registry: Registry):
+        self.duration = registry.register(Histogram(
+            "http_request_duration_seconds", "Request latency by route",
+            ("method", "route"), REQUEST_BUCKETS))
+        self.phase_duration = registry.register(Histogram(
+            "http_request_phase_seconds", "Time spent in auth, db and serialization per request",
+            ("route", "phase"), PHASE_BUCKETS))
+        self.total = registry.register(Counter(
+            "http_requests_total", "Requests by route and status", ("method", "route", "status")))
+        self.in_flight = registry.register(Gauge(
+            "http_requests_in_flight", "Requests currently being handled"))
+
+    def record(self, method: str, route: str, status: int, elapsed: float, phases: Dict[str, float]):
+        self.duration.observe(elapsed, method, route)
+        self.total.inc(method, route, str(status))
+        for name, seconds in phases.items():
+            self.phase_duration.observe(seconds, route, name)
+
+
+class PhaseTimings:
+    """Per-request accumulator for phase timers"""
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+request_timings: ContextVar[Optional[PhaseTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[PhaseTimings]:
+    return request_timings.get()
+
+
+@contextmanager
+def phase(name: str):
+    """Add the time spent in the block to the current request's phase"""
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, perf_counter() - started)
+
+
+def instrument_engine(sync_engine):
+    """Record SQL execution time as the "db" phase"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add("db", perf_counter() - started)
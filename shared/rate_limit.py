@@ -0,0 +1,107 @@
+"""
+Token-bucket rate limiting shared by the Flask and FastAPI apps.
+
+Buckets live in a TokenBucketStore split into lock-sharded dicts, so
+request threads for different clients rarely wait on each other. Tokens
+are refilled lazily when a bucket is hit, and buckets that have refilled
+completely are idle and get swept out.
+
+Limits are written "20/second", "100/minute" and so on, and can be
+changed by name with RATE_LIMIT_OVERRIDES="users.list=30/minute,...".
+Each app decides who the client is and what to do with a rejection.
+"""
+from typing import Dict, NamedTuple
+import threading
+import time
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimit(NamedTuple):
+    """requests per period; also the bucket size, so a full period can be spent at once"""
+    requests: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.period
+
+
+def parse_limit(spec: str) -> RateLimit:
+    """Parse "20/second", "100/minute" and the like"""
+    requests, _, unit = spec.partition("/")
+    unit = unit.strip().lower().rstrip("s")
+    if unit not in PERIODS or not requests.strip().isdigit() or int(requests) < 1:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return RateLimit(int(requests), PERIODS[unit])
+
+
+def parse_overrides(value: str) -> Dict[str, RateLimit]:
+    """Parse "name=limit,name=limit" into a dict of RateLimit"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, spec = item.partition("=")
+        overrides[name.strip()] = parse_limit(spec)
+    return overrides
+
+
+class _Shard:
+    __slots__ = ("buckets", "lock", "ops")
+
+    def __init__(self):
+        # key -> [tokens, updated_at, full_at]
+        self.buckets: Dict[str, list] = {}
+        self.lock = threading.Lock()
+        self.ops = 0
+
+
+class TokenBucketStore:
+    """Token buckets keyed by string, one lock per shard
+
+    A hit is O(1). Each shard sweeps out idle (full) buckets once it has
+    seen as many hits as it holds buckets, so sweeping is O(1) amortized
+    and memory tracks the number of recently active clients.
+    """
+
+    MIN_SWEEP_INTERVAL = 256
+
+    def __init__(self, shards: int = 16):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self.rejected = 0
+
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        """Take cost tokens; returns 0.0 if allowed, else seconds until they are available"""
+        shard = self._shards[hash(key) % len(self._shards)]
+        rate, burst = limit.rate, limit.requests
+        now = time.monotonic()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                tokens = burst
+            else:
+                tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            else:
+                self.rejected += 1
+            shard.buckets[key] = [tokens, now, now + (burst - tokens) / rate]
+            shard.ops += 1
+            if shard.ops >= max(len(shard.buckets), self.MIN_SWEEP_INTERVAL):
+                self._sweep(shard, now)
+        return 0.0 if allowed else (cost - tokens) / rate
+
+    @staticmethod
+    def _sweep(shard: _Shard, now: float):
+        idle = [key for key, bucket in shard.buckets.items() if bucket[2] <= now]
+        for key in idle:
+            del shard.buckets[key]
+        shard.ops = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard.buckets) for shard in self._shards)
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
@@ -0,0 +1,129 @@
+"""
+Full-text search with SQLite FTS5, shared by the Flask and FastAPI apps.
+
+A SearchIndex indexes text columns of a table whose rows have an integer
+id. It is an external-content table: it stores only the index and reads
+rows from the source table, and triggers on the source keep it in sync.
+Prefix indexes on 1-4 characters make search-as-you-type queries ("jo",
+"smi") cheap. Emails are split into words at "." and "@", so the local
+part and the domain both match.
+
+Ranking runs bm25 over every match, about 2us a row, so a broad query
+(one letter, a mail domain) ranks only its first rank_window matches by
+id; the matches after them follow in id order.
+"""
+from sqlalchemy import column, event, func, literal, select, table, text, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
+from typing import List, Optional, Sequence
+import re
+
+SEARCH_MAX_TERMS = 8
+
+# One bm25 weight per column; name matches count double
+SEARCH_RANK = "bm25(10.0, 5.0)"
+
+
+def match_expression(q: str) -> Optional[str]:
+    """FTS5 query matching every word of q as a prefix, or None if q has no words
+
+    Words are quoted, so FTS5 operators in user input are matched literally.
+    """
+    terms = re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+class SearchIndex:
+    """FTS5 index name over columns of the source table, and its queries"""
+
+    def __init__(self, name: str, source: str, columns: Sequence[str] = ("name", "email"),
+                 rank: str = SEARCH_RANK, rank_window: int = 2000):
+        self.name = name
+        self.source = source
+        self.columns = tuple(columns)
+        self.rank = rank
+        self.rank_window = rank_window
+        self.table = table(name, column("rowid"), column("rank"))
+
+    def ddl(self) -> List[str]:
+        """Statements creating the index over the source table and its triggers"""
+        index, source = self.name, self.source
+        names = ", ".join(self.columns)
+        new = ", ".join(f"new.{name}" for name in self.columns)
+        old = ", ".join(f"old.{name}" for name in self.columns)
+        return [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {names}, content='{source}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4')""",
+            f"""CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON "{source}" BEGIN
+                INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON "{source}" BEGIN
+                INSERT INTO {index}({index}, rowid, {names}) VALUES ('delete', old.id, {old});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {names} ON "{source}" BEGIN
+                INSERT INTO {index}({index}, rowid, {names}) VALUES ('delete', old.id, {old});
+                INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new});
+            END""",
+        ]
+
+    def create(self, connection):
+        """Create the index if missing and fill it from the rows already there"""
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.name,)
+        ).first()
+        for statement in self.ddl():
+            connection.exec_driver_sql(statement)
+        if not exists:
+            connection.exec_driver_sql(f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')")
+            connection.exec_driver_sql(f"INSERT INTO {self.name}({self.name}, rank) VALUES ('rank', '{self.rank}')")
+
+    def install(self, metadata):
+        """Create the index every time metadata.create_all() runs"""
+        @event.listens_for(metadata, "after_create")
+        def _after_create(target, connection, **kw):
+            self.create(connection)
+
+    def select(self, entity, match: str, offset: int, limit: int, *criteria) -> Select:
+        """Page of entity rows whose words match, best match first
+
+        Matches within the rank window come first, by rank; the matches
+        after it follow by id, so every match can be paged to. Each part
+        is cut to offset + limit rows before they are combined, so a broad
+        query ranks at most rank_window rows and reads no more of the rest
+        than the page needs.
+        """
+        rowid = self.table.c.rowid
+        matches = text(f"{self.name} MATCH :match").bindparams(match=match)
+        window_end = func.coalesce(
+            select(rowid)
+            .where(matches)
+            .order_by(rowid)
+            .offset(self.rank_window - 1)
+            .limit(1)
+            .scalar_subquery(),
+            2 ** 63 - 1,
+        )
+
+        def part(number, bound, key):
+            return select(
+                select(entity, literal(number).label("search_part"), key.label("search_key"))
+                .join(self.table, rowid == entity.id)
+                .where(matches, bound, *criteria)
+                .order_by(key)
+                .limit(offset + limit)
+                .subquery()
+            )
+
+        hits = union_all(
+            part(0, rowid <= window_end, self.table.c.rank),
+            part(1, rowid > window_end, rowid),
+        ).subquery()
+        return (
+            select(aliased(entity, hits))
+            .order_by(hits.c.search_part, hits.c.search_key)
+            .offset(offset)
+            .limit(limit)
+        )
@@ -0,0 +1,275 @@
+"""
+Thread-safe in-memory user store for the plain Flask app (rest_api/app.py)
+and the FastAPI example (fast_api/main2.py).
+
+Users are slotted namedtuple records rather than dicts: a record holds
+its id, one item per known field and an `extra` dict only for keys
+outside them, so it takes a fraction of a dict's memory. Records are
+immutable; an update swaps in a new record, so readers always see a
+whole user and don't need a lock.
+
+Records live in lock-striped shards picked by id, so writers to
+different users rarely wait on each other. Ids come from a counter that
+only goes up, so a deleted user's id is never handed out again.
+
+With a snapshot path the store is saved there as one columnar JSON
+document (every snapshot_interval seconds when something changed, and
+at exit) and loaded back when the store is created.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import repeat
+from operator import itemgetter
+import atexit
+import gc
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Value of a known field the user doesn't have (None is a value)
+MISSING = object()
+
+
+class UserRecord:
+    """Methods of the (id, *fields, extra) record type each store builds"""
+    __slots__ = ()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The user's data without its id, as it was given"""
+        data = {field: value for field, value in zip(self._fields[1:-1], self[1:-1]) if value is not MISSING}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+def record_type(fields: Iterable[str]) -> type:
+    """Record class for these field names, e.g. UserRecord(id, name, email, extra)"""
+    return type("UserRecord", (namedtuple("UserRecord", ("id", *fields, "extra")), UserRecord), {"__slots__": ()})
+
+
+@contextmanager
+def _gc_paused():
+    """Hold off cyclic GC while building or copying many records at once
+
+    Every new record is a tracked container, so a million of them would
+    set off a collection pass every few hundred allocations.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class _Shard:
+    __slots__ = ("records", "lock", "changes")
+
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+        self.changes = 0
+
+
+class UserStore:
+    """Users keyed by integer id, in lock-striped shards"""
+
+    def __init__(
+        self,
+        fields: Iterable[str],
+        shards: int = 16,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: float = 0,
+    ):
+        self.fields = tuple(fields)
+        self.record_type = record_type(self.fields)
+        self._field_set = frozenset(self.fields)
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._id_lock = threading.Lock()
+        self._next_id = 1
+        self._saved_changes = 0
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._stop = threading.Event()
+        self._thread = None
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load(snapshot_path)
+
+    def _shard(self, user_id: int) -> _Shard:
+        return self._shards[user_id % len(self._shards)]
+
+    def _record(self, user_id: int, data: Dict[str, Any]) -> UserRecord:
+        extra = None
+        if not self._field_set.issuperset(data):
+            extra = {key: value for key, value in data.items() if key not in self._field_set}
+        # tuple.__new__ skips the namedtuple's Python-level __new__
+        return tuple.__new__(self.record_type, (user_id, *map(data.get, self.fields, repeat(MISSING)), extra))
+
+    def create(self, data: Dict[str, Any], user_id: Optional[int] = None) -> UserRecord:
+        """Add a user under the next id, or under user_id; ValueError if that id is taken"""
+        with self._id_lock:
+            if user_id is None:
+                user_id = self._next_id
+            self._next_id = max(self._next_id, user_id + 1)
+        record = self._record(user_id, data)
+        shard = self._shard(user_id)
+        with shard.lock:
+            if user_id in shard.records:
+                raise ValueError(f"User {user_id} already exists")
+            shard.records[user_id] = record
+            shard.changes += 1
+        return record
+
+    def get(self, user_id: int) -> Optional[UserRecord]:
+        # Lookups of immutable records need no lock
+        return self._shard(user_id).records.get(user_id)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._shard(user_id).records
+
+    def __len__(self) -> int:
+        return sum(len(shard.records) for shard in self._shards)
+
+    def replace(self, user_id: int, data: Dict[str, Any]) -> Optional[UserRecord]:
+        """Swap in new data for a user; None if there is no such user"""
+        record = self._record(user_id, data)
+        shard = self._shard(user_id)
+        with shard.lock:
+            if user_id not in shard.records:
+                return None
+            shard.records[user_id] = record
+            shard.changes += 1
+        return record
+
+    def update(self, user_id: int, changes: Dict[str, Any]) -> Optional[UserRecord]:
+        """Merge changes into a user's data; None if there is no such user"""
+        shard = self._shard(user_id)
+        with shard.lock:
+            current = shard.records.get(user_id)
+            if current is None:
+                return None
+            record = self._record(user_id, {**current.as_dict(), **changes})
+            shard.records[user_id] = record
+            shard.changes += 1
+        return record
+
+    def delete(self, user_id: int) -> Optional[UserRecord]:
+        """Remove a user and return its record; None if there is no such user"""
+        shard = self._shard(user_id)
+        with shard.lock:
+            record = shard.records.pop(user_id, None)
+            if record is not None:
+                shard.changes += 1
+        return record
+
+    def all(self) -> List[UserRecord]:
+        """Every record, by id"""
+        records = []
+        for shard in self._shards:
+            with shard.lock:
+                records.extend(shard.records.values())
+        # Records are tuples starting with their (unique) id
+        records.sort()
+        return records
+
+    # ========================================
+    # SNAPSHOTS
+    # ========================================
+
+    def _changes(self) -> int:
+        return sum(shard.changes for shard in self._shards)
+
+    def snapshot(self, path: Optional[str] = None) -> int:
+        """Write every user to path (default snapshot_path); returns the number written
+
+        Each shard is copied under its own lock, so a write racing the
+        snapshot may or may not be in it, but every user in it is whole.
+        The file is replaced atomically.
+        """
+        path = path or self.snapshot_path
+        changes = self._changes()
+        with _gc_paused():
+            records = self.all()
+            with self._id_lock:
+                next_id = self._next_id
+            columns, missing = {}, {}
+            for position, field in enumerate(self.fields, 1):
+                values = list(map(itemgetter(position), records))
+                absent = [i for i, value in enumerate(values) if value is MISSING]
+                for i in absent:
+                    values[i] = None
+                columns[field] = values
+                if absent:
+                    missing[field] = absent
+            document = {
+                "fields": list(self.fields),
+                "next_id": next_id,
+                "ids": list(map(itemgetter(0), records)),
+                "columns": columns,
+                "missing": missing,
+                "extra": {str(i): record.extra for i, record in enumerate(records) if record.extra},
+            }
+            data = json.dumps(document, separators=(",", ":"))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._saved_changes = changes
+        return len(records)
+
+    def load(self, path: Optional[str] = None) -> int:
+        """Replace the store's contents with a snapshot; returns the number of users"""
+        path = path or self.snapshot_path
+        with open(path, "rb") as f:
+            data = f.read()
+        with _gc_paused():
+            document = json.loads(data)
+            if tuple(document["fields"]) != self.fields:
+                raise ValueError(f"Snapshot {path} has fields {document['fields']}, expected {list(self.fields)}")
+            columns = [document["columns"][field] for field in self.fields]
+            for field, absent in document["missing"].items():
+                values = document["columns"][field]
+                for i in absent:
+                    values[i] = MISSING
+            ids = document["ids"]
+            extras = [None] * len(ids)
+            for i, extra in document["extra"].items():
+                extras[int(i)] = extra
+            shards = [_Shard() for _ in self._shards]
+            for record in map(tuple.__new__, repeat(self.record_type), zip(ids, *columns, extras)):
+                shards[record.id % len(shards)].records[record.id] = record
+        with self._id_lock:
+            self._next_id = document["next_id"]
+        self._shards = shards
+        self._saved_changes = 0
+        return len(ids)
+
+    def start_snapshots(self):
+        """Snapshot at exit, and every snapshot_interval seconds (if > 0) when something changed"""
+        if self._thread is not None or not self.snapshot_path:
+            return
+        if self.snapshot_interval > 0:
+            self._thread = threading.Thread(target=self._loop, name="user-store-snapshot", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        self._stop.set()
+        if self.snapshot_path and self._changes() != self._saved_changes:
+            self.snapshot()
+
+    def _loop(self):
+        while not self._stop.wait(self.snapshot_interval):
+            if self._changes() == self._saved_changes:
+                continue
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("User store snapshot failed")
@@ -0,0 +1,33 @@
+"""
+Fixtures shared by the checks on both apps.
+
+The apps are loaded the way the benchmarks load them (benchmarks/_common.py):
+from their project folders, on throwaway SQLite files. Each FastAPI test
+module runs its whole scenario in one event loop, lifespan included.
+The FastAPI engine binds its database file when it is created, so every
+module shares that one; a module that seeds users empties the table first.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(ROOT, "benchmarks")
+# The repository root for the shared package, and the benchmark helpers
+for path in (ROOT, BENCHMARKS):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from _common import load_fastapi_app, load_flask_app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fastapi_app(tmp_path_factory):
+    return load_fastapi_app(str(tmp_path_factory.mktemp("fastapi")))
+
+
+@pytest.fixture(scope="session")
+def flask_module(tmp_path_factory):
+    """The app_enhanced module, on an empty database"""
+    return load_flask_app(str(tmp_path_factory.mktemp("flask")))
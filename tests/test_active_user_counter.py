@@ -0,0 +1,104 @@
+"""
+The Flask app's maintained active-user total (ACTIVE_USER_COUNTER).
+"""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from _common import clear_users, seed_users
+
+NOW = "2025-01-01 00:00:00"
+ROWS = 50
+
+
+@pytest.fixture
+def counter(flask_module):
+    """The app with the counter on, on a database made before its table existed"""
+    app, db, User = flask_module.app, flask_module.db, flask_module.User
+    with app.app_context():
+        db_path = db.engine.url.database
+    clear_users(db_path, User.__tablename__)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE IF EXISTS user_stats")
+    conn.close()
+    # Every tenth user is inactive
+    seed_users(
+        db_path, User.__tablename__, ROWS,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        lambda i: (i, f"User {i}", f"user{i}@example.com", NOW, NOW, int(i % 10 != 0)),
+    )
+    app.config["ACTIVE_USER_COUNTER"] = True
+    flask_module.init_active_user_counter()
+    yield flask_module
+    app.config["ACTIVE_USER_COUNTER"] = False
+    flask_module.init_active_user_counter()
+    clear_users(db_path, User.__tablename__)
+
+
+def total(client):
+    response = client.get("/users?page=1&per_page=5")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()["meta"]["total"]
+
+
+def test_counter_table_is_created_at_setup(counter):
+    client = counter.app.test_client()
+    assert total(client) == ROWS - ROWS // 10
+
+
+def test_counter_follows_creates_and_deletes(counter):
+    client = counter.app.test_client()
+    assert total(client) == 45
+    created = client.post("/users", json={"name": "New", "email": "counted@example.com"})
+    assert created.status_code == 201, created.get_data(as_text=True)
+    assert total(client) == 46
+    assert client.delete(f"/users/{created.get_json()['data']['id']}").status_code == 204
+    assert total(client) == 45
+
+
+def test_counter_is_initialised_once(counter):
+    """A second initialisation (another worker) keeps the stored total"""
+    with counter.app.app_context():
+        assert counter.get_active_user_count() == 45
+        counter.UserStats.query.filter_by(id=1).update({counter.UserStats.active_users: 40})
+        counter.db.session.commit()
+        assert counter.get_active_user_count() == 40
+
+
+def test_initialisation_counts_a_concurrent_register(counter):
+    """A register whose counter update found no row yet is still counted"""
+    with counter.app.app_context():
+        db_path = counter.db.engine.url.database
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            'INSERT INTO "user" (id, name, email, created_at, updated_at, is_active) VALUES (?, ?, ?, ?, ?, 1)',
+            (ROWS + 1, "Racing", "racing@example.com", NOW, NOW),
+        )
+        conn.execute("UPDATE user_stats SET active_users = active_users + 1 WHERE id = 1")
+        counted = {}
+
+        def initialise():
+            with counter.app.app_context():
+                counted["total"] = counter.get_active_user_count()
+
+        thread = threading.Thread(target=initialise)
+        thread.start()
+        time.sleep(0.2)
+        conn.execute("COMMIT")
+        thread.join()
+    finally:
+        conn.close()
+    assert counted["total"] == 46
+
+
+def test_turning_the_counter_off_forgets_the_total(counter):
+    client = counter.app.test_client()
+    assert total(client) == 45
+    counter.app.config["ACTIVE_USER_COUNTER"] = False
+    counter.init_active_user_counter()
+    with counter.app.app_context():
+        assert counter.UserStats.query.count() == 0
@@ -0,0 +1,157 @@
+"""
+Auth cache invalidation across worker processes.
+
+Each worker has its own TokenCache and PrincipalCache; a logout or a
+user change in one worker reaches the others through the
+InvalidationLog file they share.
+"""
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import httpx
+
+from _common import sqlite_path
+from shared.auth_cache import InvalidationLog, PrincipalCache, TokenCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child: another worker process revoking a token id
+REVOKE_CHILD = """
+import sys
+sys.path.insert(0, {root!r})
+from shared.auth_cache import InvalidationLog, TokenCache
+
+TokenCache(events=InvalidationLog({path!r})).revoke({jti!r}, {expires_at!r})
+"""
+
+
+# Run in the child: another worker process invalidating a user it changed
+INVALIDATE_CHILD = """
+import sys
+sys.path.insert(0, {root!r})
+from shared.auth_cache import InvalidationLog, PrincipalCache
+
+PrincipalCache(events=InvalidationLog({path!r})).invalidate_user({user_id!r})
+"""
+
+
+def run_child(code):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+def revoke_in_another_process(path, jti, expires_at):
+    run_child(REVOKE_CHILD.format(root=ROOT, path=path, jti=jti, expires_at=expires_at))
+
+
+def invalidate_in_another_process(path, user_id):
+    run_child(INVALIDATE_CHILD.format(root=ROOT, path=path, user_id=user_id))
+
+
+class Principal:
+    def __init__(self, id):
+        self.id = id
+
+
+def test_revocation_reaches_a_worker_that_cached_the_token(tmp_path):
+    path = str(tmp_path / "auth-events.log")
+    cache = TokenCache(events=InvalidationLog(path))
+    claims = {"sub": "user@example.com", "jti": "abc", "exp": time.time() + 60}
+    cache.set("token", claims)
+    assert cache.get("token") == claims
+    revoke_in_another_process(path, "abc", claims["exp"])
+    assert cache.get("token") is None
+    assert cache.is_revoked("abc")
+
+
+def test_compaction_keeps_live_events(tmp_path):
+    path = str(tmp_path / "auth-events.log")
+    reader = TokenCache(events=InvalidationLog(path))
+    writer = TokenCache(events=InvalidationLog(path, max_bytes=200))
+    now = time.time()
+    writer.revoke("live", now + 60)
+    for i in range(10):
+        writer.revoke(f"expired{i}", now + 0.1)
+    assert reader.is_revoked("expired0")
+    time.sleep(0.2)
+    # Passes max_bytes: the file is rewritten without the expired events
+    writer.revoke("late", now + 60)
+    with open(path) as log:
+        assert [line.split()[2] for line in log] == ["live", "late"]
+    assert reader.is_revoked("live") and reader.is_revoked("late")
+
+
+def test_flask_logout_in_another_worker_rejects_the_token(flask_module):
+    client = flask_module.app.test_client()
+    client.post("/auth/register", json={"name": "Worker", "email": "worker@example.com", "password": "workerpassword"})
+    login = client.post("/auth/login", json={"email": "worker@example.com", "password": "workerpassword"})
+    token = login.get_json()["data"]["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/auth/profile", headers=headers).status_code == 200
+    # Verified claims are now cached by this worker
+    assert client.get("/users", headers=headers).status_code == 200
+    with flask_module.app.test_request_context(headers=headers):
+        from flask_jwt_extended import decode_token
+        claims = decode_token(token)
+    revoke_in_another_process(flask_module.app.config["AUTH_EVENTS_PATH"], claims["jti"], claims["exp"])
+    assert client.get("/auth/profile", headers=headers).status_code == 401
+    with flask_module.app.test_request_context(headers=headers):
+        assert flask_module.get_request_user() is None
+
+
+def test_user_invalidation_reaches_another_worker(tmp_path):
+    path = str(tmp_path / "auth-events.log")
+    cache = PrincipalCache(events=InvalidationLog(path))
+    cache.set("user@example.com", Principal(7))
+    cache.set("other@example.com", Principal(8))
+    invalidate_in_another_process(path, 7)
+    assert cache.get("user@example.com") is None
+    assert cache.get("other@example.com") is not None
+
+
+def test_user_invalidated_during_the_lookup_is_not_cached():
+    cache = PrincipalCache()
+    generation = cache.generation
+    # The row changes while the caller's query runs
+    cache.invalidate_user(7)
+    cache.set("user@example.com", Principal(7), generation=generation)
+    assert cache.get("user@example.com") is None
+    cache.set("user@example.com", Principal(7), generation=cache.generation)
+    assert cache.get("user@example.com") is not None
+
+
+async def deactivate_in_another_worker(app):
+    from app.auth.cache import AUTH_EVENTS_PATH
+    from app.database import async_engine
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.post("/auth/register", json={
+                "name": "Worker", "email": "deactivated@example.com", "password": "workerpassword",
+            })
+            login = await client.post("/auth/login", data={
+                "username": "deactivated@example.com", "password": "workerpassword",
+            })
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            me = await client.get("/auth/me", headers=headers)
+            user_id = me.json()["id"]
+            # Cached by this worker now; another worker deactivates the user
+            conn = sqlite3.connect(sqlite_path(str(async_engine.url)))
+            try:
+                conn.execute("UPDATE users SET is_active = 0 WHERE id = ?", (user_id,))
+                conn.commit()
+                invalidate_in_another_process(AUTH_EVENTS_PATH, user_id)
+                after = await client.get("/auth/me", headers=headers)
+                conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+                conn.commit()
+            finally:
+                conn.close()
+    return me.status_code, after.status_code
+
+
+def test_fastapi_user_deactivated_in_another_worker_loses_access(fastapi_app):
+    assert asyncio.run(deactivate_in_another_worker(fastapi_app)) == (200, 400)
@@ -0,0 +1,106 @@
+"""
+Per-route query budgets of the FastAPI endpoints, enforced.
+
+The app runs in a child process with QUERY_BUDGET_STRICT=true, the way
+a test environment would set it, since the middleware reads it at
+import. Every endpoint must stay within the budget its route declares
+with query_budget(); a route whose budget is tightened below what it
+needs must fail with QueryBudgetExceeded.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(ROOT, "benchmarks")
+
+# Run in the child: call each endpoint once, then one over its budget
+STRICT_CHILD = """
+import asyncio, json, sys
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {benchmarks!r})
+import httpx
+from _common import load_fastapi_app
+
+app = load_fastapi_app({workdir!r})
+from app.database.profiling import QUERY_BUDGET_STRICT, QueryBudgetExceeded, query_budget
+
+
+def budget_dependency(path, method):
+    \"\"\"The query_budget() dependency declared on a route\"\"\"
+    for route in app.routes:
+        if getattr(route, "path", None) == path and method in route.methods:
+            for dependency in route.dependant.dependencies:
+                if dependency.call.__qualname__.startswith("query_budget."):
+                    return dependency.call
+
+
+async def main():
+    statuses = {{}}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def call(name, method, url, **kwargs):
+                response = await client.request(method, url, **kwargs)
+                statuses[name] = response.status_code
+                return response
+
+            await call("register", "POST", "/auth/register", json={{
+                "name": "Budget", "email": "budget@example.com", "password": "budgetpassword"}})
+            login = await call("login", "POST", "/auth/login", data={{
+                "username": "budget@example.com", "password": "budgetpassword"}})
+            headers = {{"Authorization": "Bearer " + login.json()["access_token"]}}
+            me = await call("me", "GET", "/auth/me", headers=headers)
+            user_id = me.json()["id"]
+            bulk = await call("bulk", "POST", "/users/bulk", headers=headers, json={{"users": [
+                {{"name": "Budget " + str(i), "email": f"budget{{i}}@example.com", "password": "budgetpassword"}}
+                for i in range(3)]}})
+            other_ids = [result["user"]["id"] for result in bulk.json()["results"]]
+            await call("list", "GET", "/users/", headers=headers)
+            await call("export", "GET", "/users/export", headers=headers)
+            await call("search", "GET", "/users/search?q=budget", headers=headers)
+            await call("batch", "GET", "/users/batch?ids=" + ",".join(map(str, other_ids)), headers=headers)
+            await call("get", "GET", f"/users/{{user_id}}", headers=headers)
+            # Users may only change themselves
+            await call("update", "PUT", f"/users/{{user_id}}", headers=headers, json={{"name": "Budgeted"}})
+
+            # A user not read before, so the lookup has to query
+            app.dependency_overrides[budget_dependency("/users/{{user_id}}", "GET")] = query_budget(0)
+            try:
+                await client.get(f"/users/{{other_ids[1]}}", headers=headers)
+                over_budget = None
+            except QueryBudgetExceeded as e:
+                over_budget = str(e)
+            finally:
+                app.dependency_overrides.clear()
+
+            # Logs out a second session, so the first can still delete the user
+            second = await client.post("/auth/login", data={{
+                "username": "budget@example.com", "password": "budgetpassword"}})
+            await call("logout", "POST", "/auth/logout", headers={{
+                "Authorization": "Bearer " + second.json()["access_token"]}})
+            await call("delete", "DELETE", f"/users/{{user_id}}", headers=headers)
+    print(json.dumps({{"strict": QUERY_BUDGET_STRICT, "statuses": statuses, "over_budget": over_budget}}))
+
+
+asyncio.run(main())
+"""
+
+
+def test_endpoints_stay_within_their_query_budgets(tmp_path):
+    code = STRICT_CHILD.format(root=ROOT, benchmarks=BENCHMARKS, workdir=str(tmp_path))
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, "QUERY_BUDGET_STRICT": "true"},
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.splitlines()[-1])
+    assert report["strict"] is True
+    assert report["statuses"] == {
+        "register": 201, "login": 200, "me": 200, "bulk": 200, "list": 200, "export": 200,
+        "search": 200, "batch": 200, "get": 200, "update": 200, "logout": 204, "delete": 200,
+    }
+    assert report["over_budget"] is not None
+    assert report["over_budget"].startswith("GET /users/")
+    assert report["over_budget"].endswith("budget is 0")
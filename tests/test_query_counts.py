@@ -0,0 +1,65 @@
+"""
+SQL statements issued by each UserCRUD operation.
+
+Counted by the app's own query accounting (app.database.profiling), so
+transaction control statements are not included.
+"""
+import asyncio
+
+import pytest
+
+EXPECTED = {
+    "get_user_by_id": 1,
+    # Coalesced by the UserLoader, turned on for this one
+    "get_user_by_id_x10_concurrent": 1,
+    "get_users_by_ids": 1,
+    "update_user": 1,
+    "update_user_missing": 1,
+    "delete_user": 1,
+    "delete_user_missing": 1,
+}
+
+
+async def count_statements(app):
+    from app.database.connection import AsyncSessionLocal
+    import app.database.crud as crud
+    from app.database.crud import UserCRUD
+    from app.database.profiling import track_queries
+    from app.models.schemas import UserCreate, UserUpdate
+
+    async def measure(operation):
+        async with AsyncSessionLocal() as db:
+            with track_queries() as stats:
+                await operation(db)
+            return stats.count
+
+    async def coalesced(db):
+        crud.USER_LOADER_ENABLED = True
+        try:
+            await asyncio.gather(*(UserCRUD.get_user_by_id(db, user.id + i) for i in range(10)))
+        finally:
+            crud.USER_LOADER_ENABLED = False
+
+    async with app.router.lifespan_context(app):
+        async with AsyncSessionLocal() as db:
+            user = await UserCRUD.create_user(db, UserCreate(
+                name="Count", email="count@example.com", password="countpassword"))
+        return {
+            "get_user_by_id": await measure(lambda db: UserCRUD.get_user_by_id(db, user.id)),
+            "get_user_by_id_x10_concurrent": await measure(coalesced),
+            "get_users_by_ids": await measure(lambda db: UserCRUD.get_users_by_ids(db, [user.id, 999999])),
+            "update_user": await measure(lambda db: UserCRUD.update_user(db, user.id, UserUpdate(name="Counted"))),
+            "update_user_missing": await measure(lambda db: UserCRUD.update_user(db, 999999, UserUpdate(name="x"))),
+            "delete_user": await measure(lambda db: UserCRUD.delete_user(db, user.id)),
+            "delete_user_missing": await measure(lambda db: UserCRUD.delete_user(db, 999999)),
+        }
+
+
+@pytest.fixture(scope="module")
+def counts(fastapi_app):
+    return asyncio.run(count_statements(fastapi_app))
+
+
+@pytest.mark.parametrize("operation", sorted(EXPECTED))
+def test_query_count(counts, operation):
+    assert counts[operation] == EXPECTED[operation]
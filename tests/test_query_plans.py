@@ -0,0 +1,255 @@
+"""
+Query plans of the SQL both apps send.
+
+Seeds both apps, runs every UserCRUD method, every Flask route and the
+Flask archival jobs once while recording the SQL they send, then runs
+EXPLAIN QUERY PLAN for each statement (with its parameters) against the
+seeded database. No plan may scan a table unless its operation is listed
+in EXPECTED_SCANS, and the lookups in EXPECTED_PLANS must keep exactly
+the plan they have.
+"""
+import asyncio
+import re
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from _common import clear_users, seed_users, sqlite_path
+
+ROWS = 2000
+NOW = "2025-01-01 00:00:00"
+PASSWORD = "planpassword"
+
+# Operations whose plans may scan a table, and why that is expected
+EXPECTED_SCANS = {
+    "fastapi.get_users": "offset paging over all users walks the primary key up to skip + limit rows",
+    "fastapi.stream_users": "the export reads every user",
+}
+
+BY_ID = "SEARCH users USING INTEGER PRIMARY KEY (rowid=?)"
+BY_EMAIL = "SEARCH users USING INDEX ix_users_email (email=?)"
+FLASK_BY_ID = "SEARCH user USING INTEGER PRIMARY KEY (rowid=?)"
+FLASK_BY_EMAIL = "SEARCH user USING INDEX sqlite_autoindex_user_1 (email=?)"
+
+
+def search_plan(source):
+    """Ranked window (FTS5 sorts it by rank), then the rest in rowid order, each cut to the page"""
+    return [
+        "CO-ROUTINE anon_1",
+        "COMPOUND QUERY",
+        "LEFT-MOST SUBQUERY",
+        "CO-ROUTINE anon_2",
+        f"SCAN {source}_fts VIRTUAL TABLE INDEX 32:M2<",
+        "SCALAR SUBQUERY 1",
+        f"SCAN {source}_fts VIRTUAL TABLE INDEX 64:M2",
+        "REUSE SUBQUERY 1",
+        f"SEARCH {source} USING INTEGER PRIMARY KEY (rowid=?)",
+        "SCAN anon_2",
+        "UNION ALL",
+        "CO-ROUTINE anon_3",
+        f"SCAN {source}_fts VIRTUAL TABLE INDEX 64:M2>",
+        "SCALAR SUBQUERY 4",
+        f"SCAN {source}_fts VIRTUAL TABLE INDEX 64:M2",
+        "REUSE SUBQUERY 4",
+        f"SEARCH {source} USING INTEGER PRIMARY KEY (rowid=?)",
+        "SCAN anon_3",
+        "SCAN anon_1",
+        "USE TEMP B-TREE FOR ORDER BY",
+    ]
+
+
+# Every plan line of these operations, in order
+EXPECTED_PLANS = {
+    "fastapi.create_user": [BY_ID],
+    "fastapi.create_users_bulk": ["SEARCH users USING COVERING INDEX ix_users_email (email=?)", BY_EMAIL],
+    "fastapi.get_user_by_id": [BY_ID],
+    "fastapi.get_user_by_email": [BY_EMAIL],
+    "fastapi.get_users_by_ids": [BY_ID],
+    "fastapi.get_user_version": [BY_ID],
+    "fastapi.get_users_after": ["SEARCH users USING INTEGER PRIMARY KEY (rowid>?)"],
+    "fastapi.search_users": search_plan("users"),
+    "fastapi.update_user": [BY_ID],
+    "fastapi.authenticate_user": [BY_EMAIL],
+    "fastapi.delete_user": [BY_ID],
+    "flask.login": [FLASK_BY_EMAIL],
+    "flask.get_profile": [FLASK_BY_ID],
+    "flask.get_user": [FLASK_BY_ID],
+    "flask.get_user_conditional": [FLASK_BY_ID],
+    "flask.get_users_batch": [FLASK_BY_ID],
+    "flask.list_users_no_total": ["SEARCH user USING INDEX ix_user_active_id (is_active=?)"],
+    "flask.list_users_cursor": ["SEARCH user USING INDEX ix_user_active_id (is_active=? AND id>?)"],
+    "flask.search_users": search_plan("user"),
+    "flask.export_users": [FLASK_BY_ID, "SEARCH user USING INDEX ix_user_active_id (is_active=?)"],
+}
+
+# "SCAN users" or "SCAN user USING INDEX ..."; FTS5 lookups ("SCAN users_fts VIRTUAL TABLE ...")
+# and schema lookups ("SCAN sqlite_master") are not table scans
+SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(?!sqlite_)(?!\S+ VIRTUAL TABLE)(\S+)")
+# Subqueries a plan reads back ("CO-ROUTINE anon_1" ... "SCAN anon_1")
+SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\S+)")
+
+
+def table_scans(details):
+    """Plan lines that scan a table rather than a subquery of the same plan"""
+    subqueries = {match.group(1) for match in map(SUBQUERY.match, details) if match}
+    scans = []
+    for detail in details:
+        match = SCAN.match(detail)
+        if match and match.group(1) not in subqueries:
+            scans.append(detail)
+    return scans
+
+
+class StatementRecorder:
+    """Collects (operation, statement, parameters) from an engine's cursor events"""
+
+    def __init__(self, engine):
+        self.operation = None
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.operation is None or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+            return
+        if executemany:
+            parameters = parameters[0]
+        self.statements.append((self.operation, statement, tuple(parameters)))
+
+    @contextmanager
+    def label(self, operation):
+        self.operation = operation
+        try:
+            yield
+        finally:
+            self.operation = None
+
+
+def explain(db_path, statements, app_name):
+    """{operation: [plan lines]} for the statements run against db_path"""
+    plans = {}
+    conn = sqlite3.connect(db_path)
+    try:
+        for operation, statement, parameters in statements:
+            details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            plans.setdefault(f"{app_name}.{operation}", []).extend(details)
+    finally:
+        conn.close()
+    return plans
+
+
+async def fastapi_statements(app, rows):
+    from app.database import async_engine
+    from app.database.connection import AsyncSessionLocal
+    from app.database.crud import UserCRUD
+    from app.models.schemas import UserCreate, UserUpdate
+
+    recorder = StatementRecorder(async_engine.sync_engine)
+    async with app.router.lifespan_context(app):
+        db_path = sqlite_path(str(async_engine.url))
+        clear_users(db_path, "users")
+        seed_users(
+            db_path, "users", rows,
+            ("id", "name", "email", "age", "hashed_password", "is_active", "created_at"),
+            lambda i: (i, f"User {i}", f"user{i}@example.com", 30, "x", int(i % 10 != 0), NOW),
+        )
+
+        async def run(operation, call):
+            async with AsyncSessionLocal() as db:
+                with recorder.label(operation):
+                    return await call(db)
+
+        async def stream(db):
+            async for _ in UserCRUD.stream_users(db):
+                pass
+
+        user = await run("create_user", lambda db: UserCRUD.create_user(
+            db, UserCreate(name="Plan", email="plan@example.com", password=PASSWORD)))
+        await run("create_users_bulk", lambda db: UserCRUD.create_users_bulk(db, [
+            UserCreate(name="Bulk", email=f"bulk{i}@example.com", password=PASSWORD) for i in range(3)
+        ] + [UserCreate(name="Taken", email="user5@example.com", password=PASSWORD)]))
+        await run("get_user_by_id", lambda db: UserCRUD.get_user_by_id(db, rows // 2))
+        await run("get_user_by_email", lambda db: UserCRUD.get_user_by_email(db, "user7@example.com"))
+        await run("get_users_by_ids", lambda db: UserCRUD.get_users_by_ids(db, [1, rows // 2, rows + 100]))
+        version = await run("get_user_version", lambda db: UserCRUD.get_user_version(db, user.id))
+        await run("get_users", lambda db: UserCRUD.get_users(db, skip=rows // 2, limit=20))
+        await run("get_users_after", lambda db: UserCRUD.get_users_after(db, after_id=rows // 2, limit=20))
+        await run("search_users", lambda db: UserCRUD.search_users(db, "user 12", limit=20))
+        await run("stream_users", stream)
+        await run("update_user", lambda db: UserCRUD.update_user(db, user.id, UserUpdate(name="Planned"), version))
+        await run("authenticate_user", lambda db: UserCRUD.authenticate_user(db, "plan@example.com", PASSWORD))
+        await run("delete_user", lambda db: UserCRUD.delete_user(db, user.id))
+        return explain(db_path, recorder.statements, "fastapi")
+
+
+def flask_statements(module, rows):
+    app, db, User = module.app, module.db, module.User
+    with app.app_context():
+        db_path = db.engine.url.database
+        recorder = StatementRecorder(db.engine)
+    clear_users(db_path, User.__tablename__)
+    seed_users(
+        db_path, User.__tablename__, rows,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        lambda i: (i, f"User {i}", f"user{i}@example.com", NOW, NOW, int(i % 10 != 0)),
+    )
+    client = app.test_client()
+
+    def call(operation, method, path, **kwargs):
+        with recorder.label(operation):
+            response = client.open(path, method=method, **kwargs)
+        assert response.status_code < 500, (operation, response.get_data(as_text=True))
+        return response
+
+    call("register", "POST", "/auth/register", json={"name": "Plan", "email": "plan@example.com", "password": PASSWORD})
+    login = call("login", "POST", "/auth/login", json={"email": "plan@example.com", "password": PASSWORD})
+    headers = {"Authorization": f"Bearer {login.get_json()['data']['access_token']}"}
+    api_key = call("create_api_key", "POST", "/auth/api-key", headers=headers).get_json()["data"]["api_key"]
+    call("get_profile", "GET", "/auth/profile", headers=headers)
+    call("update_profile", "PUT", "/auth/profile", headers=headers, json={"email": "plan2@example.com"})
+    call("list_users_offset", "GET", f"/users?page={rows // 20}&per_page=10", headers={"X-API-Key": api_key})
+    call("list_users_no_total", "GET", f"/users?page={rows // 20}&per_page=10&include_total=false")
+    call("list_users_cursor", "GET", f"/users?cursor={module.encode_cursor(rows // 2)}&per_page=10")
+    call("search_users", "GET", "/users/search?q=user 12")
+    call("export_users", "GET", "/users/export", headers=headers)
+    call("get_users_batch", "GET", f"/users/batch?ids=1,{rows // 2 + 1},{rows + 100}")
+    response = call("get_user", "GET", f"/users/{rows // 2 + 1}")
+    call("get_user_conditional", "GET", f"/users/{rows // 2 + 1}", headers={"If-None-Match": response.headers["ETag"]})
+    created = call("create_user", "POST", "/users", json={"name": "New", "email": "new@example.com"})
+    call("create_users_bulk", "POST", "/users/bulk", json={"users": [
+        {"name": "Bulk", "email": f"bulk{i}@example.com"} for i in range(3)
+    ] + [{"name": "Taken", "email": "user5@example.com"}]})
+    user_id = created.get_json()["data"]["id"]
+    call("update_user", "PUT", f"/users/{user_id}", json={"name": "Renamed", "email": "renamed@example.com"})
+    call("delete_user", "DELETE", f"/users/{user_id}")
+    # Seeded rows are old enough; every tenth one is inactive
+    with app.app_context():
+        with recorder.label("compact_users"):
+            module.compact_users(batch_size=100, max_batches=1)
+        with recorder.label("restore_users"):
+            module.restore_users([10, 20, rows + 100], activate=True)
+    return explain(db_path, recorder.statements, "flask")
+
+
+@pytest.fixture(scope="module")
+def plans(fastapi_app, flask_module):
+    return {**asyncio.run(fastapi_statements(fastapi_app, ROWS)), **flask_statements(flask_module, ROWS)}
+
+
+def test_every_operation_ran(plans):
+    assert set(EXPECTED_PLANS) <= set(plans)
+    assert set(EXPECTED_SCANS) <= set(plans)
+
+
+def test_no_unexpected_table_scans(plans):
+    scans = {
+        operation: table_scans(details) for operation, details in plans.items()
+        if operation not in EXPECTED_SCANS and table_scans(details)
+    }
+    assert scans == {}
+
+
+@pytest.mark.parametrize("operation", sorted(EXPECTED_PLANS))
+def test_query_plan(plans, operation):
+    assert plans[operation] == EXPECTED_PLANS[operation]
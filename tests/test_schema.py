@@ -0,0 +1,65 @@
+"""
+Index syncing in the FastAPI app's startup schema setup.
+"""
+import logging
+
+import pytest
+from sqlalchemy import Column, Index, Integer, MetaData, Table, create_engine, inspect
+
+
+def model(*indexed):
+    """Metadata for a table "things" with an ix_things_<column> index on each indexed column"""
+    metadata = MetaData()
+    table = Table("things", metadata, Column("id", Integer, primary_key=True), Column("a", Integer), Column("b", Integer))
+    for name in indexed:
+        Index(f"ix_things_{name}", table.c[name])
+    return metadata
+
+
+def indexes(engine):
+    return sorted(index["name"] for index in inspect(engine).get_indexes("things"))
+
+
+@pytest.fixture
+def schema(fastapi_app):
+    from app.database import schema
+
+    return schema
+
+
+def test_declared_indexes_are_created_and_recorded(schema):
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        model().create_all(connection)
+        schema.sync_indexes(connection, model("a"))
+        recorded = connection.exec_driver_sql(f"SELECT name FROM {schema.MANAGED_INDEXES}").scalars().all()
+    assert indexes(engine) == ["ix_things_a"]
+    assert recorded == ["ix_things_a"]
+
+
+def test_only_recorded_indexes_are_dropped(schema, caplog):
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        model("a").create_all(connection)
+        schema.sync_indexes(connection, model("a"))
+        connection.exec_driver_sql("CREATE INDEX ix_things_b ON things (b)")
+        with caplog.at_level(logging.WARNING, logger="app.database.schema"):
+            # ix_things_a is no longer declared; ix_things_b was added by hand
+            schema.sync_indexes(connection, model())
+        recorded = connection.exec_driver_sql(f"SELECT name FROM {schema.MANAGED_INDEXES}").scalars().all()
+    assert indexes(engine) == ["ix_things_b"]
+    assert recorded == []
+    assert "ix_things_b" in caplog.text
+
+
+def test_indexes_declared_by_earlier_models_are_dropped(schema):
+    from app.models.user import Base
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        Base.metadata.create_all(connection)
+        # A database created while users.id and users.name had index=True
+        connection.exec_driver_sql("CREATE INDEX ix_users_id ON users (id)")
+        connection.exec_driver_sql("CREATE INDEX ix_users_name ON users (name)")
+        schema.sync_indexes(connection, Base.metadata)
+    assert sorted(index["name"] for index in inspect(engine).get_indexes("users")) == ["ix_users_email"]
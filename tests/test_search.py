@@ -0,0 +1,134 @@
+"""
+User search past the rank window.
+
+Broad queries rank only their first SEARCH_RANK_WINDOW matches by id;
+the matches after those must still come back, in id order, after the
+ranked ones. The Flask app must also build its index on a database
+that was made before the index existed.
+"""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from _common import FLASK_PROJECT, clear_users, seed_users, sqlite_path
+
+NOW = "2025-01-01 00:00:00"
+ROWS = 3000
+WINDOW = 2000
+# Better matches than every other user ("john" twice), inside and outside the window
+BEST_IN_WINDOW = 1501
+BEST_AFTER_WINDOW = 2501
+
+
+# Run in the child: import the Flask app the way a WSGI server does (no create_all) and search
+FLASK_SEARCH_CHILD = """
+import json, sys
+sys.path.insert(0, {project!r})
+from app_enhanced import app
+
+response = app.test_client().get("/users/search?q=john")
+print(json.dumps({{"status": response.status_code, "ids": [user["id"] for user in response.get_json().get("data", [])]}}))
+"""
+
+
+def name(i):
+    return "John John" if i in (BEST_IN_WINDOW, BEST_AFTER_WINDOW) else f"John Doe{i}"
+
+
+async def fastapi_pages(app, per_page):
+    from app.database import async_engine
+    from app.database.connection import AsyncSessionLocal
+    from app.database.crud import UserCRUD
+
+    async with app.router.lifespan_context(app):
+        db_path = sqlite_path(str(async_engine.url))
+        clear_users(db_path, "users")
+        seed_users(
+            db_path, "users", ROWS,
+            ("id", "name", "email", "age", "hashed_password", "is_active", "created_at"),
+            lambda i: (i, name(i), f"user{i}@example.com", 30, "x", 1, NOW),
+        )
+        pages, skip, more = [], 0, True
+        while more:
+            async with AsyncSessionLocal() as db:
+                users, more = await UserCRUD.search_users(db, "john", skip=skip, limit=per_page)
+            pages.append([user.id for user in users])
+            skip += per_page
+        clear_users(db_path, "users")
+    return pages
+
+
+def flask_pages(module, per_page):
+    app, db, User = module.app, module.db, module.User
+    with app.app_context():
+        db_path = db.engine.url.database
+    clear_users(db_path, User.__tablename__)
+    seed_users(
+        db_path, User.__tablename__, ROWS,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        # Inactive users are left out of the results, not of the window
+        lambda i: (i, name(i), f"user{i}@example.com", NOW, NOW, int(i % 100 != 0)),
+    )
+    client = app.test_client()
+    pages, page, more = [], 1, True
+    while more:
+        response = client.get("/users/search", query_string={"q": "john", "page": page, "per_page": per_page})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        body = response.get_json()
+        pages.append([user["id"] for user in body["data"]])
+        more = body["meta"]["has_next"]
+        page += 1
+    clear_users(db_path, User.__tablename__)
+    return pages
+
+
+@pytest.fixture(scope="module")
+def fastapi_results(fastapi_app):
+    return asyncio.run(fastapi_pages(fastapi_app, 100))
+
+
+@pytest.fixture(scope="module")
+def flask_results(flask_module):
+    assert flask_module.app.config["SEARCH_RANK_WINDOW"] == WINDOW
+    return flask_pages(flask_module, 100)
+
+
+def check_pages(pages, expected_ids):
+    ids = [user_id for page in pages for user_id in page]
+    in_window = [i for i in expected_ids if i <= WINDOW]
+    # The ranked window first, best match on top; then the rest by id
+    assert sorted(ids[:len(in_window)]) == in_window
+    assert ids[0] == BEST_IN_WINDOW
+    assert ids[len(in_window):] == [i for i in expected_ids if i > WINDOW]
+
+
+def test_fastapi_search_returns_every_match(fastapi_results):
+    check_pages(fastapi_results, list(range(1, ROWS + 1)))
+
+
+def test_flask_search_returns_every_active_match(flask_results):
+    check_pages(flask_results, [i for i in range(1, ROWS + 1) if i % 100 != 0])
+
+
+def test_flask_search_works_on_a_database_made_without_create_all(tmp_path):
+    """The committed instance database predates the index; importing the app creates and fills it"""
+    db_path = str(tmp_path / "users.db")
+    shutil.copy(os.path.join(FLASK_PROJECT, "instance", "users.db"), db_path)
+    clear_users(db_path, "user")
+    seed_users(
+        db_path, "user", 3,
+        ("id", "name", "email", "created_at", "updated_at", "is_active"),
+        lambda i: (i, name(i), f"user{i}@example.com", NOW, NOW, 1),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", FLASK_SEARCH_CHILD.format(project=FLASK_PROJECT)],
+        env={**os.environ, "DATABASE_URL": "sqlite:///" + db_path},
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.splitlines()[-1]) == {"status": 200, "ids": [1, 2, 3]}
@@ -0,0 +1,86 @@
+"""
+Stopping the FastAPI app's group-commit WriteQueue.
+"""
+import asyncio
+
+import pytest
+
+
+async def stop_while_writing(app):
+    from app.database.connection import AsyncSessionLocal
+    from app.database.write_queue import WriteQueue
+
+    async def write(session):
+        return "written"
+
+    async with app.router.lifespan_context(app):
+        queue = WriteQueue(AsyncSessionLocal, max_delay_ms=5)
+        await queue.start()
+        queued = [asyncio.create_task(queue.submit(write)) for _ in range(3)]
+        await asyncio.sleep(0)
+        stopping = asyncio.create_task(queue.stop())
+        await asyncio.sleep(0)
+        outcome = {"running_while_stopping": queue.running}
+        try:
+            await queue.submit(write)
+        except RuntimeError as exc:
+            outcome["late_submit"] = str(exc)
+        await asyncio.wait_for(stopping, timeout=5)
+        outcome["queued"] = await asyncio.wait_for(asyncio.gather(*queued), timeout=5)
+        # Something left behind the stop sentinel fails rather than waiting forever
+        await queue.start()
+        queue._queue.put_nowait(None)
+        stranded = asyncio.get_running_loop().create_future()
+        queue._queue.put_nowait((write, stranded))
+        await asyncio.wait_for(queue._task, timeout=5)
+        await queue.stop()
+        outcome["stranded"] = repr(stranded.exception())
+    return outcome
+
+
+async def bulk_create_through_queue(app):
+    from app.database.connection import AsyncSessionLocal
+    from app.database.crud import UserCRUD
+    from app.database.write_queue import write_queue
+    from app.models.schemas import UserCreate
+
+    async with app.router.lifespan_context(app):
+        await write_queue.start()
+        try:
+            writes = write_queue.writes
+            async with AsyncSessionLocal() as db:
+                results = await UserCRUD.create_users_bulk(db, [
+                    UserCreate(name="Queued", email=f"queued{i}@example.com", password="queuedpassword")
+                    for i in range(3)
+                ])
+            queued_writes = write_queue.writes - writes
+            async with AsyncSessionLocal() as db:
+                for user, _ in results:
+                    await UserCRUD.delete_user(db, user.id)
+        finally:
+            await write_queue.stop()
+    return [error for _, error in results], queued_writes
+
+
+@pytest.fixture(scope="module")
+def stop_outcome(fastapi_app):
+    return asyncio.run(stop_while_writing(fastapi_app))
+
+
+def test_writes_queued_before_stop_are_applied(stop_outcome):
+    assert stop_outcome["queued"] == ["written"] * 3
+
+
+def test_submit_is_refused_once_stopping(stop_outcome):
+    assert stop_outcome["running_while_stopping"] is False
+    assert stop_outcome["late_submit"] == "Write queue is not running"
+
+
+def test_writes_left_in_the_queue_fail(stop_outcome):
+    assert stop_outcome["stranded"] == "RuntimeError('Write queue stopped before applying this write')"
+
+
+def test_bulk_create_goes_through_the_queue(fastapi_app):
+    errors, queued_writes = asyncio.run(bulk_create_through_queue(fastapi_app))
+    assert errors == [None, None, None]
+    assert queued_writes == 1